@@ -0,0 +1,173 @@
+from modules.lexer import Lexer
+from modules.parser import Parser
+from modules.semantic import SemanticAnalyzer
+from modules.utilities import ensure_build_dir, get_output_filename
+from modules.tac_generator import TACGenerator
+from modules.tac_optimizer import TACOptimizer
+from modules.tac_nasm import write_nasm64_file, TARGETS, DEFAULT_TARGET
+from modules.codegen import CCodeGenerator
+from modules.tac_vm import BytecodeCompiler, VirtualMachine
+from modules.pycodegen import PythonBackend, run_code
+from modules.toolchain import Toolchain
+
+import subprocess
+import sys
+import time
+import os.path
+
+def parse_source(source_code):
+    lexer = Lexer().get_lexer()
+    parser = Parser().get_parser()
+    parse_tree = parser.parse(lexer.lex(source_code))
+    SemanticAnalyzer().visit(parse_tree)
+    return parse_tree
+
+def build_tac(source_code, optimize):
+    """Run the front end and return the TAC (optimized or not)"""
+    parse_tree = parse_source(source_code)
+    tac_code = TACGenerator().generate_tac(parse_tree)
+    if optimize:
+        tac_code = TACOptimizer().optimize(tac_code)
+    return tac_code
+
+def build_nasm_executable(tac_code, name, build_dir, allocate_registers=True, target=DEFAULT_TARGET, toolchain=None):
+    tac_file_path = build_dir / f"{name}_tac.txt"
+    with open(tac_file_path, "w") as f:
+        f.write("THREE ADDRESS CODE (TAC):\n")
+        for line in tac_code:
+            f.write(line + "\n")
+    return write_nasm64_file(tac_file_path, build_dir, allocate_registers, target, toolchain=toolchain)
+
+def time_executable(exe_path, runs):
+    """Best wall time of several runs (seconds)"""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([str(exe_path)], capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def build_c_executable(source_code, name, build_dir, toolchain=None, whole_program=False):
+    c_path = build_dir / f"{name}.c"
+    with open(c_path, "w") as f:
+        CCodeGenerator(whole_program, sink=f).visit(parse_source(source_code))
+    exe_path = build_dir / f"{name}.exe"
+    try:
+        (toolchain or Toolchain()).gcc([c_path], exe_path, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return exe_path
+
+def time_vm(tac_code, runs):
+    """Best time of several VM runs (seconds); the bytecode is compiled once, outside the timing"""
+    program = BytecodeCompiler().compile(tac_code)
+    best = None
+    for _ in range(runs):
+        vm = VirtualMachine(program)
+        start = time.perf_counter()
+        vm.run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def time_py(source_code, runs):
+    """Best time of several runs of the Python code object, compiled once outside the timing"""
+    code = PythonBackend().compile_source(source_code)
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        run_code(code)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def compare_backends(source_code, output_name, build_dir, runs, target, toolchain, whole_program=False):
+    """Run time of the bytecode VM and the Python code object against the C and assembly executables"""
+    results = [("vm", time_vm(build_tac(source_code, True), runs)), ("py", time_py(source_code, runs))]
+    exe_path = build_c_executable(source_code, f"{output_name}_bench_c", build_dir, toolchain, whole_program)
+    if exe_path:
+        results.append(("c", time_executable(exe_path, runs)))
+    else:
+        print("\n⚠ Could not build the C executable (is GCC installed?)")
+    exe_path = build_nasm_executable(build_tac(source_code, True), f"{output_name}_bench_asm", build_dir, True, target,
+                                     toolchain)
+    if exe_path and os.path.exists(exe_path) and not str(exe_path).endswith(".asm"):
+        results.append(("asm", time_executable(exe_path, runs)))
+    else:
+        print("\n⚠ Could not build the asm executable (are NASM and GCC installed?)")
+
+    # the executables' times include starting the process, the VM's does not
+    print(f"\n--- BACKENDS {output_name} [{target}] (best of {runs}) ---")
+    print(f"gcc flags: {' '.join(toolchain.flags()) or '(none)'}{'  (whole-program C)' if whole_program else ''}")
+    for label, seconds in results:
+        print(f"{label:>6}: {seconds * 1000:9.2f} ms")
+    for label, seconds in results[2:]:
+        if seconds:
+            print(f"vm / {label}: {results[0][1] / seconds:.2f}x  py / {label}: {results[1][1] / seconds:.2f}x")
+
+def main():
+    target = DEFAULT_TARGET
+    backends = False
+    whole_program = False
+    toolchain = Toolchain()
+    args = []
+    for arg in sys.argv[1:]:
+        try:
+            if toolchain.parse_arg(arg):
+                continue
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+        if arg.startswith("--target="):
+            target = arg[len("--target="):]
+        elif arg == "--backends":
+            backends = True
+        elif arg == "--whole-program":
+            whole_program = True
+        else:
+            args.append(arg)
+    if not args or target not in TARGETS:
+        print("Usage: python benchmark.py [--target=win64|linux-x86_64] [--backends] [--whole-program] "
+              "[-O<level>] [--march=CPU] [--lto] [--cflags=F] <sourceFile.go> [runs]")
+        sys.exit(1)
+
+    sourceFile = args[0].strip('"')
+    runs = int(args[1]) if len(args) > 1 else 5
+    if not os.path.isfile(sourceFile):
+        print(f"\nCould not find the file '{sourceFile}'")
+        sys.exit(1)
+
+    with open(sourceFile, "r", encoding="utf-8") as f:
+        source_code = f.read()
+
+    build_dir = ensure_build_dir()
+    output_name = get_output_filename(sourceFile)
+
+    if backends:
+        compare_backends(source_code, output_name, build_dir, runs, target, toolchain, whole_program)
+        return
+
+    # stack slots without TAC optimization, then each optimization layer on top
+    variants = (("noopt", False, False), ("opt", True, False), ("regs", True, True))
+    results = []
+    for label, optimize, allocate_registers in variants:
+        tac_code = build_tac(source_code, optimize)
+        exe_path = build_nasm_executable(tac_code, f"{output_name}_bench_{label}", build_dir, allocate_registers, target,
+                                         toolchain)
+        # write_nasm64_file hands back the .asm file when assembling or linking failed
+        if not exe_path or not os.path.exists(exe_path) or str(exe_path).endswith(".asm"):
+            print(f"\n⚠ Could not build the {label} executable (are NASM and GCC installed?)")
+            sys.exit(1)
+        results.append((label, len(tac_code), time_executable(exe_path, runs)))
+
+    print(f"\n--- BENCHMARK {output_name} [{target}] (best of {runs}) ---")
+    print(f"gcc flags: {' '.join(toolchain.flags()) or '(none)'}")
+    for label, tac_lines, seconds in results:
+        print(f"{label:>6}: {tac_lines:4d} TAC lines  {seconds * 1000:9.2f} ms")
+    for label, _, seconds in results[1:]:
+        if seconds:
+            print(f"speedup {label}: {results[0][2] / seconds:.2f}x")
+
+if __name__ == "__main__":
+    main()
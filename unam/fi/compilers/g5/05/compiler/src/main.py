@@ -1,23 +1,25 @@
-from modules.lexer import Lexer
-from modules.parser import Parser
-from modules.semantic import SemanticAnalyzer, SemanticError
 from modules.utilities import *
-from modules.codegen import CCodeGenerator
-from modules.tac_generator import TACGenerator
 from modules.tac_nasm import *
-from nltk.tree import Tree
+from modules.toolchain import Toolchain, is_toolchain_arg
+from modules.build_cache import BuildCache, RemoteCache, DEFAULT_MAX_BYTES
 
 import subprocess
 # ----------------------------------------
-from nltk import Tree as NLTKTree
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from copy import copy
 import os.path
 from pathlib import Path
 from rply import errors
 
+# native builds C and NASM executables; jit and vm run the program in process
+RUN_MODES = ('native', 'jit', 'vm', 'py')
+GCC_TIMEOUT = 60  # seconds for one gcc build of the generated C
+RUN_TIMEOUT = 30  # seconds for one run of a built executable
+
 def debug_ast_structure(ast, indent=0):
     """Debug function to print the structure of the AST."""
+    from nltk.tree import Tree
     if isinstance(ast, Tree):
         print("  " * indent + f"Tree: {ast.label()} (len: {len(ast)})")
         for i, child in enumerate(ast):
@@ -31,9 +33,77 @@ def debug_ast_structure(ast, indent=0):
     else:
         print("  " * indent + f"Value: {ast}")
 
+def run_executable(sourceFile, exe_path):
+    """Run a built executable, print its output and log the execution section"""
+    print(f"\n--- EXECUTING {exe_path.name} ---")
+    execution_messages = [f"--- EXECUTING {exe_path.name} ---"]
+
+    try:
+        result = subprocess.run([str(exe_path)], capture_output=True, text=True, timeout=RUN_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        exit_msg = f"--- KILLED AFTER {RUN_TIMEOUT} SECONDS ---"
+        execution_messages.append(exit_msg)
+        print(f"\n{exit_msg}")
+        write_output_log(sourceFile, "execution", execution_messages, is_error=True)
+        return
+
+    if result.stdout:
+        execution_messages.append("Program output:")
+        execution_messages.append(result.stdout)
+        print("\nProgram output:")
+        print(result.stdout)
+    if result.stderr:
+        execution_messages.append("Program errors:")
+        execution_messages.append(result.stderr)
+        print("\nProgram errors:")
+        print(result.stderr)
+
+    exit_msg = f"--- EXIT CODE {result.returncode} ---"
+    execution_messages.append(exit_msg)
+    print(f"\n{exit_msg}")
+
+    # save log
+    log_to_file_only(sourceFile, "execution", execution_messages)
+
+
+def run_python_code(sourceFile, code, execution_messages):
+    """Run a code object of the py backend, print its output and log the execution section"""
+    from modules.pycodegen import run_code
+
+    try:
+        output, exit_code = run_code(code)
+    except (ZeroDivisionError, RecursionError) as e:
+        execution_messages.append(f"PY error: {e}")
+        print(f"✗ PY error: {e}")
+        write_output_log(sourceFile, "execution", execution_messages, is_error=True)
+        return
+    if output:
+        execution_messages.append("Program output:")
+        execution_messages.extend(output)
+        print("\nProgram output:")
+        print('\n'.join(output))
+    exit_msg = f"--- EXIT CODE {exit_code} ---"
+    execution_messages.append(exit_msg)
+    print(f"\n{exit_msg}")
+    log_to_file_only(sourceFile, "execution", execution_messages)
+
 def main():
     generate_files = True  # Default: generate txt and c files
     debug_mode = False     # Flag detail debug
+    optimize_tac = True    # TAC optimization passes
+    target = DEFAULT_TARGET  # assembly target of the NASM backend
+    assembler = None         # how the object file is made (default: per target)
+    run_mode = 'native'      # how the program is run (see RUN_MODES)
+    toolchain = Toolchain()  # gcc flags of the C build and the NASM link
+    whole_program = False    # C emitted for whole-program optimization (prototypes, static, int64_t)
+    use_cache = True         # reuse the executables of an identical earlier build
+    cache_size = DEFAULT_MAX_BYTES
+    show_cache_stats = False
+    cache_remote = os.environ.get("BUILD_CACHE_REMOTE")  # URL of a shared cache server, if any
+    batch_pattern = None     # directory or glob of sources compiled in parallel (--batch)
+    jobs = None              # worker processes of a batch (default: one per CPU)
+    server_mode = False      # serve compile requests on a Unix socket (--server)
+    socket_path = None
     flags = []
     
     # Parse flags
@@ -43,6 +113,61 @@ def main():
             generate_files = True
         elif sys.argv[i] == "--debug":
             debug_mode = True
+        elif sys.argv[i] == "--noopt":
+            optimize_tac = False
+        elif sys.argv[i] == "--whole-program":
+            whole_program = True
+        elif sys.argv[i] == "--jit":
+            run_mode = 'jit'
+        elif sys.argv[i].startswith("--run="):
+            run_mode = sys.argv[i][len("--run="):]
+            if run_mode not in RUN_MODES:
+                print(f"Unknown run mode '{run_mode}'. Available modes: {', '.join(RUN_MODES)}")
+                sys.exit(1)
+        elif sys.argv[i].startswith("--target="):
+            target = sys.argv[i][len("--target="):]
+            if target not in TARGETS:
+                print(f"Unknown target '{target}'. Available targets: {', '.join(TARGETS)}")
+                sys.exit(1)
+        elif sys.argv[i].startswith("--assembler="):
+            assembler = sys.argv[i][len("--assembler="):]
+            if assembler not in ASSEMBLERS:
+                print(f"Unknown assembler '{assembler}'. Available assemblers: {', '.join(ASSEMBLERS)}")
+                sys.exit(1)
+        elif sys.argv[i] == "--no-cache":
+            use_cache = False
+        elif sys.argv[i].startswith("--cache-remote="):
+            cache_remote = sys.argv[i][len("--cache-remote="):]
+        elif sys.argv[i] == "--batch" and i + 1 < len(sys.argv):
+            i += 1
+            batch_pattern = sys.argv[i]
+        elif sys.argv[i].startswith("-j"):
+            value = sys.argv[i][2:]
+            if not value and i + 1 < len(sys.argv):
+                i += 1
+                value = sys.argv[i]
+            if not value.isdigit() or int(value) < 1:
+                print("-j expects a number of worker processes, e.g. -j 4")
+                sys.exit(1)
+            jobs = int(value)
+        elif sys.argv[i] == "--server":
+            server_mode = True
+        elif sys.argv[i].startswith("--socket="):
+            socket_path = sys.argv[i][len("--socket="):]
+        elif sys.argv[i] == "--cache-stats":
+            show_cache_stats = True
+        elif sys.argv[i].startswith("--cache-size="):
+            try:
+                cache_size = int(float(sys.argv[i][len("--cache-size="):]) * 1024 * 1024)
+            except ValueError:
+                print(f"Invalid cache size '{sys.argv[i]}' (expected megabytes, e.g. --cache-size=64)")
+                sys.exit(1)
+        elif is_toolchain_arg(sys.argv[i]):
+            try:
+                toolchain.parse_arg(sys.argv[i])
+            except ValueError as e:
+                print(e)
+                sys.exit(1)
         elif sys.argv[i].startswith("--"):
             flags.append(sys.argv[i])
         else:
@@ -53,15 +178,75 @@ def main():
     if "--f" not in sys.argv:
         generate_files = False
 
+    # --cache-stats on its own only reports on the build cache
+    if show_cache_stats and 'sourceFile' not in locals():
+        for line in BuildCache(ensure_build_dir() / "cache", cache_size).get_report():
+            print(line)
+        sys.exit(0)
+
+    # --- SERVER: a warm compiler answering modules/compile_client.py ---
+    if server_mode:
+        from modules.compile_server import serve, DEFAULT_SOCKET
+
+        sys.exit(serve(socket_path or DEFAULT_SOCKET))
+
+    # --- BATCH: every source of a directory or glob, in a pool of worker processes ---
+    if batch_pattern is not None:
+        from modules.batch import collect_sources, run_batch, write_summary
+
+        sources = collect_sources(batch_pattern)
+        if not sources:
+            print(f"No source files match '{batch_pattern}'")
+            sys.exit(1)
+        batch_dir = ensure_build_dir() / "batch"
+        options = {"optimize": optimize_tac, "whole_program": whole_program, "target": target,
+                   "assembler": assembler, "toolchain": toolchain, "generate_files": generate_files}
+
+        def report(result):
+            sizes = ', '.join(f"{backend} {binary['size']} B" for backend, binary in result["binaries"].items())
+            detail = result["error"] or sizes
+            print(f"  {result['status']:<15} {result.get('total_ms', 0):9.1f} ms  {result['source']}  ({detail})")
+
+        print(f"Compiling {len(sources)} files into {batch_dir}...")
+        summary = run_batch(sources, batch_dir, jobs, options, progress=report)
+        summary_path = write_summary(summary, batch_dir / "summary.json")
+        print(f"\n{summary['succeeded']} succeeded, {summary['failed']} failed in {summary['wall_time_ms']:.0f} ms "
+              f"on {summary['workers']} workers; summary written to {summary_path}")
+        sys.exit(0 if summary["failed"] == 0 else 1)
+
     # no source file provided
     if 'sourceFile' not in locals():
         if len(sys.argv) == 1:
             sourceFile = input("Enter the source file's name: ")
         else:
-            print("Usage: python main.py [--f] [--debug] <sourceFile.go>")
+            print("Usage: python main.py [--f] [--debug] [--noopt] [--whole-program] [--jit] [--run=M] [--target=T] [--assembler=A] [-O<level>] [--march=CPU] [--lto] [--cflags=F] [--no-cache] [--cache-size=MB] [--cache-remote=URL] [--cache-stats] <sourceFile.go>")
+            print("       python main.py --batch <dir|glob> [-j N] [flags]")
+            print("       python main.py --server [--socket=PATH]")
             print("\nFlags:")
-            print("  --f      Generate intermediate files (.txt, .c)")
-            print("  --debug  Generate semantic debug information")
+            print("  --f         Generate intermediate files (.txt, .c)")
+            print("  --debug     Generate semantic debug information")
+            print("  --noopt     Skip the TAC optimization passes")
+            print("  --whole-program  Emit C with prototypes, static functions and int64_t ints")
+            print("  --jit       Run the program in process from machine code in memory (--run=jit)")
+            print("  --run=M     native (default: C and NASM executables), jit, vm (bytecode")
+            print("              interpreter) or py (Python code objects); vm and py need no gcc or nasm")
+            print("  --target=T  Assembly target: win64 (default) or linux-x86_64")
+            print("  --assembler=A  internal (in-process ELF64 encoder, default on linux-x86_64),")
+            print("                 nasm, or verify (internal, checked byte for byte against nasm)")
+            print("  -O<level>   gcc optimization level (-O0 to -O3, -Os, -Ofast, -Og) for the C build and the NASM link")
+            print("  --march=CPU gcc -march for both builds, e.g. native")
+            print("  --lto       Build with link-time optimization (-flto)")
+            print("  --cflags=F  Extra gcc flags for both builds, e.g. --cflags=\"-fno-plt -g\"")
+            print("  --no-cache  Always rebuild instead of reusing the executables of an identical build")
+            print("  --cache-size=MB  Size bound of the build cache (default 256), least recently used go first")
+            print("  --cache-remote=URL  Shared cache server (python -m modules.cache_server) tried after")
+            print("                      the local cache, e.g. http://127.0.0.1:8765")
+            print("  --cache-stats    Print the build cache's hit/miss statistics")
+            print("  --batch <dir|glob>  Compile every .go file of a directory (or matching a glob) without")
+            print("                      running them, into build/batch/<name>/, with a JSON summary")
+            print("  -j N        Worker processes of --batch (default: one per CPU)")
+            print("  --server    Keep a warm compiler serving python -m modules.compile_client on a Unix")
+            print("              socket (--socket=PATH, default build/compiler.sock)")
             sys.exit(1)
 
     sourceFile = sourceFile.strip('"')
@@ -72,16 +257,70 @@ def main():
     if not os.path.isfile(sourceFile):
         print(f"\nCould not find the file '{sourceFile}'")
         sys.exit() 
+
+    with open(sourceFile, "r", encoding="utf-8") as f:
+        source_code = f.read()
+        source_lines = source_code.splitlines()
+
+    # --- PY CACHE: the code object of an identical source runs before the front end is imported ---
+    if run_mode == 'py' and not generate_files and not debug_mode:
+        from modules.pycodegen import PythonBackend, source_key
+
+        py_key = source_key(source_code)
+        code = PythonBackend(cache_dir=build_dir / "pycache").cached(py_key)
+        if code is not None:
+            print(" Python code cache hit")
+            log_to_file_only(sourceFile, "py_cache", [f"Cache hit {py_key[:16]}"], clear_first=True)
+            print("\n--- EXECUTING (PY) ---")
+            run_python_code(sourceFile, code, ["--- EXECUTING (PY) ---", "Code object reused from the cache"])
+            return
+
+    # --- BUILD CACHE: an identical source, compiler and set of flags reuses the earlier executables ---
+    build_cache = None
+    if use_cache and run_mode == 'native' and not debug_mode:
+        try:
+            remote = RemoteCache(cache_remote) if cache_remote else None
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+        build_cache = BuildCache(build_dir / "cache", cache_size, remote)
+        cache_key = build_cache.key(
+            source_code, run_mode,
+            options=[f"target={target}", f"assembler={assembler}", f"optimize={optimize_tac}",
+                     f"whole_program={whole_program}", f"files={generate_files}", *toolchain.flags()],
+            tools=("gcc", "nasm"))
+        restored = build_cache.restore(cache_key, build_dir, output_name)
+        # an entry without the C executable (gcc missing when it was stored) is rebuilt
+        if restored and (build_dir / f"{output_name}.exe").exists():
+            print(f" Build cache hit: {', '.join(path.name for path in restored)} reused")
+            log_to_file_only(sourceFile, "build_cache", [f"Cache hit {cache_key[:16]}",
+                                                        *[f"Restored: {path}" for path in restored],
+                                                        *build_cache.get_report()], clear_first=True)
+            # both executables run, in the order of a build that missed
+            exe_path = build_dir / f"{output_name}.exe"
+            exe_path_nasm = build_dir / f"{output_name}{TARGETS[target]['executable_suffix']}"
+            if exe_path_nasm in restored and exe_path_nasm != exe_path:
+                run_executable(sourceFile, exe_path_nasm)
+            run_executable(sourceFile, exe_path)
+            build_cache.close()
+            if show_cache_stats:
+                print('\n'.join(build_cache.get_report()))
+            return
     
+    # the front end is loaded only once the cache missed: rply and nltk take far longer to
+    # import than a cache hit takes altogether
+    from modules.lexer import Lexer
+    from modules.parser import Parser
+    from modules.semantic import SemanticAnalyzer, SemanticError
+    from modules.codegen import CCodeGenerator
+    from modules.tac_generator import TACGenerator
+    from modules.tac_optimizer import TACOptimizer
+
     # --- Lexer ---
     ERROR = False
     lexer_init = Lexer()
     lexer = lexer_init.get_lexer()
 
-    with open(sourceFile, "r", encoding="utf-8") as f:
-        source_code = f.read()
-        source_lines = source_code.splitlines()
-
     # --- INITIAL LEXICAL CHECK ---
     output_messages = []
     try:
@@ -193,6 +432,29 @@ def main():
                 # save log
                 log_to_file_only(sourceFile, "semantic", semantic_messages)
 
+                # --- PY: the parse tree as a Python code object, cached by source hash; no TAC needed ---
+                if run_mode == 'py':
+                    import ast
+                    from modules.pycodegen import PythonBackend, PythonCodeGenerator, PythonCodegenError
+
+                    print("\n--- EXECUTING (PY) ---")
+                    execution_messages = ["--- EXECUTING (PY) ---"]
+                    backend = PythonBackend(cache_dir=build_dir / "pycache")
+                    try:
+                        if generate_files:
+                            module = PythonCodeGenerator().generate(parse_tree)
+                            log_to_file_only(sourceFile, "python_code", ast.unparse(module).splitlines())
+                        code = backend.compile_tree(parse_tree, source_code, sourceFile)
+                    except PythonCodegenError as e:
+                        execution_messages.append(f"PY error: {e}")
+                        print(f"✗ PY error: {e}")
+                        write_output_log(sourceFile, "execution", execution_messages, is_error=True)
+                        return
+                    execution_messages.append("Code object reused from the cache" if backend.hits
+                                              else "Code object compiled and cached")
+                    run_python_code(sourceFile, code, execution_messages)
+                    return
+
                 # --- PHASE 3: CODE GENERATION ---
                 print("\nStarting TAC Generation...")
                 codegen_messages = ["Starting TAC Generation..."]
@@ -214,6 +476,14 @@ def main():
                 tac_code = tac_generator.generate_tac(parse_tree)
                 log_to_file_only(sourceFile, "tac", tac_code)
 
+                # --- TAC OPTIMIZATION ---
+                if optimize_tac and tac_code:
+                    optimizer = TACOptimizer(printer=tac_printer)
+                    tac_code = optimizer.optimize(tac_code)
+                    log_to_file_only(sourceFile, "tac_optimization", optimizer.get_report())
+                    log_to_file_only(sourceFile, "tac_optimized", tac_code)
+                    print("TAC Optimization Success!")
+
                 # VERIFY TAC
                 if len(tac_code) == 0:
                     warning_msg = "WARNING: No TAC code generated!"
@@ -236,59 +506,126 @@ def main():
                 
                 log_to_file_only(sourceFile, "codegen_tac", codegen_messages)
 
+                # --- JIT: machine code in memory, no C, NASM or executables ---
+                if run_mode == 'jit':
+                    from modules.jit import jit_run_tac, JITError
+                    from modules.nasm_encoder import EncodingError
+
+                    print("\n--- EXECUTING (JIT) ---")
+                    execution_messages = ["--- EXECUTING (JIT) ---"]
+                    try:
+                        output, exit_code = jit_run_tac(tac_code)
+                    except (JITError, EncodingError) as e:
+                        execution_messages.append(f"JIT error: {e}")
+                        print(f"✗ JIT error: {e}")
+                        write_output_log(sourceFile, "execution", execution_messages, is_error=True)
+                        return
+                    if output:
+                        execution_messages.append("Program output:")
+                        execution_messages.append(output)
+                        print("\nProgram output:")
+                        print(output)
+                    exit_msg = f"--- EXIT CODE {exit_code} ---"
+                    execution_messages.append(exit_msg)
+                    print(f"\n{exit_msg}")
+                    log_to_file_only(sourceFile, "execution", execution_messages)
+                    return
+
+                # --- VM: TAC compiled to bytecode and interpreted, no toolchain at all ---
+                if run_mode == 'vm':
+                    from modules.tac_vm import BytecodeCompiler, VirtualMachine, VMError
+
+                    print("\n--- EXECUTING (VM) ---")
+                    execution_messages = ["--- EXECUTING (VM) ---"]
+                    try:
+                        program = BytecodeCompiler().compile(tac_code)
+                        if generate_files:
+                            log_to_file_only(sourceFile, "vm_bytecode", program.disassemble())
+                        vm = VirtualMachine(program)
+                        exit_code = vm.run()
+                    except (VMError, RecursionError) as e:
+                        execution_messages.append(f"VM error: {e}")
+                        print(f"✗ VM error: {e}")
+                        write_output_log(sourceFile, "execution", execution_messages, is_error=True)
+                        return
+                    if vm.output:
+                        execution_messages.append("Program output:")
+                        execution_messages.extend(vm.output)
+                        print("\nProgram output:")
+                        print('\n'.join(vm.output))
+                    exit_msg = f"--- EXIT CODE {exit_code} ---"
+                    execution_messages.append(exit_msg)
+                    print(f"\n{exit_msg}")
+                    log_to_file_only(sourceFile, "execution", execution_messages)
+                    return
+
                 # --- GENERATE C AND COMPILING
                 print("\nGenerating C code...")
                 cgen_messages = ["Generating C code..."]
+                if whole_program:
+                    cgen_messages.append("Whole-program mode: prototypes, static/inline functions, int64_t for int")
                 
-                generator = CCodeGenerator()
-                generator.visit(parse_tree)
-                
-                # Save c file (only if --f flag)
+                # Save c file (only if --f flag); otherwise it is streamed into gcc when compiling
                 c_path = build_dir / f"{output_name}.c"
+                exe_path = build_dir / f"{output_name}.exe"
+
+                def build_c():
+                    """C generation and the gcc build, run in a worker thread next to the NASM build"""
+                    if generate_files:
+                        with open(c_path, "w") as f:
+                            CCodeGenerator(whole_program, sink=f).visit(parse_tree)
+                        toolchain.gcc([c_path], exe_path, check=True, capture_output=True, text=True,
+                                      timeout=GCC_TIMEOUT)
+                    else:
+                        with toolchain.gcc_stdin(exe_path, timeout=GCC_TIMEOUT) as gcc_input:
+                            CCodeGenerator(whole_program, sink=gcc_input).visit(parse_tree)
+
+                # Guardar TAC a archivo temporal
+                tac_file_path = build_dir / f"{output_name}_tac.txt"
+                with open(tac_file_path, "w") as f:
+                    f.write("THREE ADDRESS CODE (TAC):\n")
+                    for line in tac_code:
+                        f.write(line + "\n")
+                peephole_report = []
+                nasm_messages = []
+
+                def build_nasm():
+                    """NASM generation, assembling and linking, run in a worker thread next to the C build;
+                    the executable is run once it is collected below"""
+                    from modules.tac_nasm import write_nasm64_file
+                    return write_nasm64_file(tac_file_path, build_dir, target=target, report=peephole_report,
+                                             assembler=assembler, toolchain=toolchain, run=False,
+                                             printer=nasm_messages.append)
+
+                # neither build prints anything until it is collected below, so their
+                # messages do not interleave on the console
+                backends = ThreadPoolExecutor(max_workers=2, thread_name_prefix="backend")
+                c_build = backends.submit(build_c)
+                nasm_build = backends.submit(build_nasm)
+                backends.shutdown(wait=False)
                 if generate_files:
-                    with open(c_path, "w") as f:
-                        f.write(generator.get_code())
                     cgen_messages.append(f"C code generated in: {c_path}")
-                    print(f"C code generated")
+                    print("C code generated and compiled in the background")
                 else:
-                    cgen_messages.append("C code generated (not saved to file)")
-                    print("C code generated")
-                    c_code = generator.get_code()
-                    c_path = build_dir / f"{output_name}_temp.c"
-                    with open(c_path, "w") as f:
-                        f.write(c_code)
+                    cgen_messages.append("C code streamed into gcc's stdin (not saved to file)")
+                    print("C code streamed into gcc in the background")
                 
                 # save log
                 log_to_file_only(sourceFile, "codegen_c", cgen_messages)
                 
-                # Generar NASM
+                # Generar NASM: collected first, its executable run once here
+                exe_path_nasm = None
                 try:
-                    from modules.tac_nasm import write_nasm64_file
-                    
-                    # Guardar TAC a archivo temporal
-                    tac_file_path = build_dir / f"{output_name}_tac.txt"
-                    with open(tac_file_path, "w") as f:
-                        f.write("THREE ADDRESS CODE (TAC):\n")
-                        for line in tac_code:
-                            f.write(line + "\n")
-                    
-                    # Convertir a NASM y ensamblar
+                    exe_path_nasm = nasm_build.result()
+                    print('\n'.join(nasm_messages))
+                    log_to_file_only(sourceFile, "nasm_peephole", peephole_report)
                     
-                    exe_path_nasm = write_nasm64_file(tac_file_path, build_dir)
-                    
-                    if exe_path_nasm and os.path.exists(exe_path_nasm):
-                        try:
-                            result = subprocess.run(
-                                [str(exe_path_nasm)], 
-                                capture_output=True, 
-                                text=True,
-                                shell=True,  # Importante para Windows
-                                cwd=build_dir
-                            )
-                                
-                        except Exception as e:
-                            print(f"Error ejecutando NASM: {e}")
+                    # the .asm file comes back when assembling or linking failed
+                    if exe_path_nasm and os.path.exists(exe_path_nasm) and Path(exe_path_nasm).suffix != ".asm":
+                        exe_path_nasm = Path(exe_path_nasm)
+                        run_executable(sourceFile, exe_path_nasm)
                     else:
+                        exe_path_nasm = None
                         print("⚠ No se pudo generar el ejecutable NASM")
                         
                 except ImportError as e:
@@ -298,47 +635,38 @@ def main():
                     import traceback
                     traceback.print_exc()
 
-                # -- GCC compiling
+                # -- GCC compiling, started next to the NASM build and often done by now
                 try:
-                    exe_path = build_dir / f"{output_name}.exe"
-                    compilation_messages = [f"Compiling with GCC -> {exe_path.name}..."]
+                    compilation_messages = [f"Compiling with GCC -> {exe_path.name}...",
+                                            f"Toolchain flags: {' '.join(toolchain.flags()) or '(none)'}"]
                     print(f"\nCompiling with GCC -> {exe_path.name}...")
                     
-                    subprocess.run(["gcc", str(c_path), "-o", str(exe_path)], check=True)
+                    c_build.result()
                     
                     success_msg = "Successful Compilation!"
                     compilation_messages.append(success_msg)
                     print(f"{success_msg}")
                     
-                    # compilation log
+                    # compilation log, then every gcc command of the build
                     log_to_file_only(sourceFile, "compilation", compilation_messages)
+                    log_to_file_only(sourceFile, "toolchain", toolchain.get_report())
                     
-                    # --- EXECUTE
-                    print(f"\n--- EXECUTING {exe_path.name} ---")
-                    execution_messages = [f"--- EXECUTING {exe_path.name} ---"]
-                    
-                    result = subprocess.run([str(exe_path)], capture_output=True, text=True)
-                    
-                    if result.stdout:
-                        execution_messages.append("Program output:")
-                        execution_messages.append(result.stdout)
-                        print("\nProgram output:")
-                        print(result.stdout)
-                    if result.stderr:
-                        execution_messages.append("Program errors:")
-                        execution_messages.append(result.stderr)
-                        print("\nProgram errors:")
-                        print(result.stderr)
-                    
-                    exit_msg = f"--- EXIT CODE {result.returncode} ---"
-                    execution_messages.append(exit_msg)
-                    print(f"\n{exit_msg}")
-                    
-                    # save log
-                    log_to_file_only(sourceFile, "execution", execution_messages)
-                    
-                    if not generate_files:
-                        c_path.unlink(missing_ok=True)
+                    # --- BUILD CACHE: keep the executables (and with --f the intermediate files)
+                    if build_cache is not None:
+                        artifacts = [exe_path, exe_path_nasm]
+                        if generate_files:
+                            artifacts += [c_path, tac_file_path, build_dir / f"{output_name}.txt",
+                                          build_dir / f"{output_name}.asm"]
+                        build_cache.store(cache_key, artifacts, output_name)
+
+                    # --- EXECUTE (while the build is uploaded to the remote cache, if any)
+                    run_executable(sourceFile, exe_path)
+                    if build_cache is not None:
+                        build_cache.close()
+                        log_to_file_only(sourceFile, "build_cache", [f"Cache miss {cache_key[:16]}, build stored",
+                                                                    *build_cache.get_report()])
+                        if show_cache_stats:
+                            print('\n'.join(build_cache.get_report()))
                                 
                 except FileNotFoundError:
                     error_msg = "\nWARNING: The 'gcc' command was not found."
@@ -351,6 +679,12 @@ def main():
                         print(f"  {file_msg}")
                     write_output_log(sourceFile, "compilation", compilation_messages, is_error=True)
                     
+                except subprocess.TimeoutExpired as e:
+                    error_msg = f"\nERROR: GCC did not finish within {e.timeout} seconds."
+                    compilation_messages.append(error_msg)
+                    print(f"✗ {error_msg}")
+                    write_output_log(sourceFile, "compilation", compilation_messages, is_error=True)
+
                 except subprocess.CalledProcessError as e:
                     error_msg = f"\nERROR: GCC failed to compile the generated C file."
                     compilation_messages.append(error_msg)
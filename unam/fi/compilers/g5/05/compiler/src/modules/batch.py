@@ -0,0 +1,206 @@
+# modules/batch.py
+import glob
+import json
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from rply import errors, Token
+
+from modules.lexer import Lexer
+from modules.parser import Parser
+from modules.semantic import SemanticAnalyzer, SemanticError
+from modules.codegen import CCodeGenerator
+from modules.tac_generator import TACGenerator
+from modules.tac_optimizer import TACOptimizer
+from modules.tac_nasm import write_nasm64_file, DEFAULT_TARGET, TARGETS
+from modules.toolchain import Toolchain
+from modules.utilities import get_output_filename
+
+# Many sources compiled by a pool of worker processes. Every worker builds
+# the lexer and the LALR parser once and keeps them for all its jobs, and every
+# job gets a directory of its own, so nothing two jobs write can collide. The
+# result of each job (status, time per phase, size of each executable) goes
+# into one JSON summary.
+
+GCC_TIMEOUT = 60
+
+
+def collect_sources(pattern):
+    """The .go files of a directory, or the files a glob pattern matches, sorted"""
+    if os.path.isdir(pattern):
+        return sorted(str(path) for path in Path(pattern).glob("*.go"))
+    return sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+
+
+def job_names(sources):
+    """Output directory name of every source: its base name, numbered when two are alike"""
+    names, seen = [], {}
+    for source in sources:
+        name = get_output_filename(source)
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+    return names
+
+
+class BatchCompiler:
+    """Builds the C and NASM executables of many sources; the lexer and parser are built once"""
+
+    def __init__(self, optimize=True, whole_program=False, target=DEFAULT_TARGET, assembler=None,
+                 toolchain=None, generate_files=False, lexer=None, parser=None):
+        # an existing lexer and parser can be shared: neither keeps state between sources
+        self.lexer = lexer or Lexer().get_lexer()
+        self.parser = parser or Parser(printer=lambda msg: None).get_parser()
+        self.optimize = optimize
+        self.whole_program = whole_program
+        self.target = target
+        self.assembler = assembler
+        self.toolchain = toolchain or Toolchain()
+        self.generate_files = generate_files
+
+    def compile_file(self, source_file, output_dir):
+        """Compile one source into output_dir; the job's entry of the summary"""
+        output_dir = Path(output_dir)
+        shutil.rmtree(output_dir, ignore_errors=True)
+        output_dir.mkdir(parents=True)
+        name = get_output_filename(source_file)
+        result = {"source": str(source_file), "output_dir": str(output_dir), "status": "ok",
+                  "error": None, "timings_ms": {}, "binaries": {}}
+        timings = result["timings_ms"]
+        started = time.perf_counter()
+
+        def phase(label, action, *args):
+            start = time.perf_counter()
+            try:
+                return action(*args)
+            finally:
+                timings[label] = round((time.perf_counter() - start) * 1000, 3)
+
+        try:
+            with open(source_file, "r", encoding="utf-8") as f:
+                source_code = f.read()
+            phase("lexical", lambda: list(self.lexer.lex(source_code)))
+            parse_tree = phase("syntax", lambda: self.parser.parse(self.lexer.lex(source_code)))
+            phase("semantic", SemanticAnalyzer().visit, parse_tree)
+            tac_code = phase("tac", TACGenerator().generate_tac, parse_tree)
+            if self.optimize and tac_code:
+                tac_code = phase("tac_optimization", TACOptimizer().optimize, tac_code)
+        except errors.LexingError as e:
+            return self.failed(result, "lexical_error", f"Invalid token at line {e.getsourcepos().lineno}", started)
+        except errors.ParsingError as e:
+            pos = e.getsourcepos()
+            return self.failed(result, "syntax_error", f"Parsing error at line {pos.lineno}, column {pos.colno}",
+                               started)
+        except ValueError as e:
+            if not (e.args and isinstance(e.args[0], Token)):
+                raise
+            pos = e.args[0].getsourcepos()
+            return self.failed(result, "syntax_error", f"Unexpected token '{e.args[0].value}' at line {pos.lineno}, "
+                                                       f"column {pos.colno}", started)
+        except SemanticError as e:
+            return self.failed(result, "semantic_error", str(e), started)
+
+        toolchain = Toolchain(self.toolchain.opt_level, self.toolchain.march, self.toolchain.lto,
+                              self.toolchain.cflags)
+        exe_path = output_dir / f"{name}.exe"
+        try:
+            phase("c", self.build_c, parse_tree, output_dir / f"{name}.c", exe_path, toolchain)
+            result["binaries"]["c"] = {"path": str(exe_path), "size": exe_path.stat().st_size}
+        except subprocess.CalledProcessError as e:
+            return self.failed(result, "c_error", f"gcc failed: {(e.stderr or '').strip()[:500]}", started)
+        except subprocess.TimeoutExpired as e:
+            return self.failed(result, "c_error", f"gcc did not finish within {e.timeout} seconds", started)
+        except FileNotFoundError:
+            return self.failed(result, "c_error", "The 'gcc' command was not found", started)
+
+        # <name>_asm_tac.txt gives <name>_asm.asm and an executable apart from the C one on every target
+        exe_path_nasm = phase("asm", self.build_nasm, tac_code, output_dir / f"{name}_asm_tac.txt", output_dir,
+                              toolchain)
+        if exe_path_nasm is not None:
+            result["binaries"]["asm"] = {"path": str(exe_path_nasm), "size": exe_path_nasm.stat().st_size}
+        else:
+            result["asm_error"] = "The NASM executable could not be built"
+        result["commands"] = toolchain.commands
+        result["total_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    def build_c(self, parse_tree, c_path, exe_path, toolchain):
+        if self.generate_files:
+            with open(c_path, "w") as f:
+                CCodeGenerator(self.whole_program, sink=f).visit(parse_tree)
+            toolchain.gcc([c_path], exe_path, check=True, capture_output=True, text=True, timeout=GCC_TIMEOUT)
+        else:
+            with toolchain.gcc_stdin(exe_path, timeout=GCC_TIMEOUT) as gcc_input:
+                CCodeGenerator(self.whole_program, sink=gcc_input).visit(parse_tree)
+
+    def build_nasm(self, tac_code, tac_file_path, output_dir, toolchain):
+        """The linked NASM executable, or None; write_nasm64_file's console output is dropped"""
+        with open(tac_file_path, "w") as f:
+            f.write("THREE ADDRESS CODE (TAC):\n")
+            for line in tac_code:
+                f.write(line + "\n")
+        exe_path = write_nasm64_file(tac_file_path, output_dir, target=self.target, assembler=self.assembler,
+                                     toolchain=toolchain, run=False, printer=lambda msg: None)
+        if exe_path is None or Path(exe_path).suffix != TARGETS[self.target]['executable_suffix'] \
+                or not Path(exe_path).exists():
+            return None
+        return Path(exe_path)
+
+    def failed(self, result, status, error, started):
+        result["status"] = status
+        result["error"] = error
+        result["total_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+
+_worker = None  # the BatchCompiler of a pool process
+
+
+def init_worker(options):
+    global _worker
+    _worker = BatchCompiler(**options)
+
+
+def run_job(source_file, output_dir):
+    try:
+        return _worker.compile_file(source_file, output_dir)
+    except Exception as e:
+        return {"source": str(source_file), "output_dir": str(output_dir), "status": "error",
+                "error": f"{type(e).__name__}: {e}", "timings_ms": {}, "binaries": {}}
+
+
+def run_batch(sources, output_root, jobs=None, options=None, progress=None):
+    """Compile sources on jobs worker processes into output_root/<name>/; the summary dict"""
+    options = options or {}
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(sources) or 1))
+    output_root = Path(output_root)
+    started = time.perf_counter()
+    results = [None] * len(sources)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(options,)) as pool:
+        futures = {pool.submit(run_job, source, output_root / name): index
+                   for index, (source, name) in enumerate(zip(sources, job_names(sources)))}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            if progress:
+                progress(results[futures[future]])
+    succeeded = sum(1 for result in results if result["status"] == "ok")
+    toolchain = options.get("toolchain")
+    return {
+        "jobs": len(sources),
+        "workers": jobs,
+        "succeeded": succeeded,
+        "failed": len(sources) - succeeded,
+        "wall_time_ms": round((time.perf_counter() - started) * 1000, 3),
+        "options": {key: value for key, value in options.items() if key != "toolchain"}
+                   | {"gcc_flags": toolchain.flags() if toolchain else []},
+        "results": results,
+    }
+
+
+def write_summary(summary, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return path
@@ -0,0 +1,316 @@
+# modules/build_cache.py
+import hashlib
+import http.client
+import io
+import json
+import os
+import queue
+import shutil
+import tarfile
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# ccache-style store of finished builds. An entry is the set of files one
+# build produced (executables, and the intermediate files with --f), kept
+# under the hash of everything that can change them: the source, this
+# compiler's own code, the gcc/nasm binaries, the backend and its flags.
+# index.json records the size and last use of every entry, so the least
+# recently used ones are dropped once the cache grows past max_bytes, plus
+# hit/miss counters.
+#
+# A RemoteCache is an optional second tier shared by several builders (see
+# modules/cache_server.py): an entry travels as one gzipped tar, fetched with
+# GET /<key> when the local cache misses and uploaded with PUT /<key> in the
+# background after a build. When the server is unreachable builds go on with
+# the local cache alone.
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+INDEX_NAME = "index.json"
+# stands for the output name in stored file names (fib.exe is kept as @.exe),
+# so a copy of a source under another name reuses the entry with its own names
+NAME_PLACEHOLDER = "@"
+
+_compiler_fingerprint = None
+
+
+def compiler_fingerprint():
+    """Hash of the compiler's own sources (main.py and modules/), computed once per process"""
+    global _compiler_fingerprint
+    if _compiler_fingerprint is None:
+        src_dir = Path(__file__).resolve().parent.parent
+        digest = hashlib.sha256()
+        for path in sorted([src_dir / "main.py", *(src_dir / "modules").glob("*.py")]):
+            if path.exists():
+                digest.update(path.name.encode())
+                digest.update(path.read_bytes())
+        _compiler_fingerprint = digest.hexdigest()
+    return _compiler_fingerprint
+
+
+def tool_identity(name):
+    """Where a tool lives and which build of it it is, without running it"""
+    path = shutil.which(name)
+    if path is None:
+        return f"{name}:missing"
+    stat = os.stat(path)
+    return f"{name}:{os.path.realpath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def pack_files(paths):
+    """Files (kept under their base names, with their modes) as a gzipped tar"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz", compresslevel=6) as archive:
+        for path in paths:
+            archive.add(path, arcname=Path(path).name, recursive=False)
+    return buffer.getvalue()
+
+
+def unpack_files(blob, output_dir):
+    """Extract a pack_files() archive into output_dir; the names of the files"""
+    names = []
+    with tarfile.open(fileobj=io.BytesIO(blob), mode="r:gz") as archive:
+        for member in archive.getmembers():
+            # only plain files straight in output_dir, whatever the server sent
+            if not member.isfile() or Path(member.name).name != member.name or member.name in ("", ".", ".."):
+                raise ValueError(f"Unexpected member '{member.name}' in a cached build")
+            target = Path(output_dir) / member.name
+            target.write_bytes(archive.extractfile(member).read())
+            target.chmod(member.mode & 0o755)
+            names.append(member.name)
+    return names
+
+
+class RemoteCache:
+    """HTTP tier of the cache: GET and PUT of /<key> over a pool of keep-alive connections"""
+
+    def __init__(self, url, timeout=5.0, connections=4):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Invalid cache server URL '{url}' (expected http://host:port)")
+        self.url = url
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.address = (parts.hostname, parts.port)
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.connections = queue.LifoQueue()  # idle connections, most recently used first
+        self.executor = ThreadPoolExecutor(max_workers=connections, thread_name_prefix="build-cache")
+        self.uploads = []
+        self.errors = []
+
+    def request(self, method, key, body=None):
+        """(status, response body) of one request; retried once on a connection the server closed"""
+        for attempt in (1, 2):
+            try:
+                connection, reused = self.connections.get_nowait(), True
+            except queue.Empty:
+                connection, reused = self.connection_class(*self.address, timeout=self.timeout), False
+            try:
+                headers = {"Content-Type": "application/gzip"} if body is not None else {}
+                connection.request(method, f"{self.prefix}/{key}", body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                if reused and attempt == 1:
+                    continue
+                raise
+            self.connections.put(connection)
+            return response.status, data
+
+    def fetch(self, key):
+        """The packed entry, or None when the server has none or cannot be reached"""
+        try:
+            status, data = self.request("GET", key)
+        except (OSError, http.client.HTTPException) as e:
+            self.errors.append(f"GET {key[:16]}: {e}")
+            return None
+        if status != 200:
+            if status != 404:
+                self.errors.append(f"GET {key[:16]}: HTTP {status}")
+            return None
+        return data
+
+    def fetch_many(self, keys):
+        """fetch() of several keys at once, over as many connections as the pool allows"""
+        return dict(zip(keys, self.executor.map(self.fetch, keys)))
+
+    def upload(self, key, paths):
+        """Pack and PUT the files in the background; close() waits for it"""
+        def put():
+            try:
+                status, _ = self.request("PUT", key, pack_files(paths))
+            except (OSError, http.client.HTTPException) as e:
+                self.errors.append(f"PUT {key[:16]}: {e}")
+                return False
+            if status not in (200, 201, 204):
+                self.errors.append(f"PUT {key[:16]}: HTTP {status}")
+            return status in (200, 201, 204)
+        future = self.executor.submit(put)
+        self.uploads.append(future)
+        return future
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        while not self.connections.empty():
+            self.connections.get_nowait().close()
+
+
+class BuildCache:
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, remote=None):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.remote = remote
+        self.index_path = self.cache_dir / INDEX_NAME
+        self.index = self.load_index()
+
+    def load_index(self):
+        try:
+            index = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            index = {}
+        index.setdefault("entries", {})
+        index.setdefault("stats", {})
+        for counter in ("hits", "remote_hits", "misses", "stores", "evictions"):
+            index["stats"].setdefault(counter, 0)
+        return index
+
+    def save_index(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # written aside and renamed, so a concurrent reader never sees half a file
+        temp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        temp_path.write_text(json.dumps(self.index, indent=1), encoding="utf-8")
+        os.replace(temp_path, self.index_path)
+
+    def key(self, source_code, backend, options=(), tools=("gcc",)):
+        """Entry key for a source built by backend with options (strings, order kept)"""
+        digest = hashlib.sha256()
+        for part in (source_code, compiler_fingerprint(), backend, *options, *map(tool_identity, tools)):
+            digest.update(str(part).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def lookup(self, key):
+        """Stored file names of the entry, or None (counted as a hit or a miss)"""
+        entry = self.index["entries"].get(key)
+        if entry is not None and not all((self.cache_dir / key / name).exists() for name in entry["files"]):
+            # removed behind our back
+            self.forget(key)
+            entry = None
+        if entry is not None:
+            self.index["stats"]["hits"] += 1
+            entry["last_used"] = time.time()
+        elif self.remote is not None:
+            entry = self.fetch_remote(key)
+            if entry is not None:
+                self.index["stats"]["remote_hits"] += 1
+        if entry is None:
+            self.index["stats"]["misses"] += 1
+        self.save_index()
+        return entry["files"] if entry else None
+
+    def fetch_remote(self, key):
+        """Entry brought from the remote tier into the local cache, or None"""
+        blob = self.remote.fetch(key)
+        if blob is None:
+            return None
+        entry_dir = self.cache_dir / key
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        entry_dir.mkdir(parents=True)
+        try:
+            names = unpack_files(blob, entry_dir)
+        except (tarfile.TarError, ValueError, OSError) as e:
+            self.remote.errors.append(f"GET {key[:16]}: {e}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+        self.add_entry(key, names)
+        return self.index["entries"][key]
+
+    def restore(self, key, output_dir, output_name):
+        """Copy the entry's files into output_dir, named after output_name; their paths, or None on a miss"""
+        files = self.lookup(key)
+        if files is None:
+            return None
+        restored = []
+        for name in files:
+            if name.startswith(NAME_PLACEHOLDER):
+                target = Path(output_dir) / (output_name + name[len(NAME_PLACEHOLDER):])
+            else:
+                target = Path(output_dir) / name
+            shutil.copy2(self.cache_dir / key / name, target)
+            restored.append(target)
+        return restored
+
+    def store(self, key, paths, output_name):
+        """Keep copies of the files a build produced, then evict down to max_bytes.
+
+        Files named after output_name (fib.exe, fib_tac.txt) are kept under
+        NAME_PLACEHOLDER instead, for restore() to give them the name asked for.
+        """
+        paths = [path for path in dict.fromkeys(map(Path, filter(None, paths))) if path.is_file()]
+        if not paths:
+            return
+        entry_dir = self.cache_dir / key
+        if entry_dir.exists():
+            shutil.rmtree(entry_dir)
+        entry_dir.mkdir(parents=True)
+        names = []
+        for path in paths:
+            name = path.name
+            if name.startswith(output_name):
+                name = NAME_PLACEHOLDER + name[len(output_name):]
+            shutil.copy2(path, entry_dir / name)
+            names.append(name)
+        self.add_entry(key, names)
+        self.index["stats"]["stores"] += 1
+        self.save_index()
+        if self.remote is not None:
+            self.remote.upload(key, [entry_dir / name for name in names])
+
+    def add_entry(self, key, names):
+        entry_dir = self.cache_dir / key
+        self.index["entries"][key] = {
+            "files": names,
+            "size": sum((entry_dir / name).stat().st_size for name in names),
+            "last_used": time.time(),
+        }
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        entries = self.index["entries"]
+        while self.total_size() > self.max_bytes:
+            candidates = [key for key in entries if key != keep]
+            if not candidates:
+                break
+            oldest = min(candidates, key=lambda key: entries[key]["last_used"])
+            self.forget(oldest)
+            self.index["stats"]["evictions"] += 1
+
+    def forget(self, key):
+        self.index["entries"].pop(key, None)
+        shutil.rmtree(self.cache_dir / key, ignore_errors=True)
+
+    def total_size(self):
+        return sum(entry["size"] for entry in self.index["entries"].values())
+
+    def get_report(self):
+        stats = self.index["stats"]
+        lookups = stats["hits"] + stats["remote_hits"] + stats["misses"]
+        hit_rate = f"{100 * (lookups - stats['misses']) / lookups:.1f}%" if lookups else "n/a"
+        lines = [
+            f"Cache: {self.cache_dir}",
+            f"Entries: {len(self.index['entries'])}, {self.total_size() / 1024:.1f} KiB of "
+            f"{self.max_bytes / (1024 * 1024):g} MiB",
+            f"Hits: {stats['hits']} local, {stats['remote_hits']} remote, misses: {stats['misses']} "
+            f"(hit rate {hit_rate}), stores: {stats['stores']}, evictions: {stats['evictions']}",
+        ]
+        if self.remote is not None:
+            lines.append(f"Remote: {self.remote.url}")
+            lines += [f"Remote error: {error}" for error in self.remote.errors]
+        return lines
+
+    def close(self):
+        """Wait for the uploads to the remote tier"""
+        if self.remote is not None:
+            self.remote.close()
@@ -0,0 +1,134 @@
+# modules/cache_server.py
+import os
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from modules.utilities import get_project_root
+
+# Reference server of the remote build cache tier (modules/build_cache.py):
+# GET /<key> answers with the stored blob or 404, PUT /<key> stores the body,
+# HEAD /<key> tells whether a key is there. Keys are the sha256 hex digests
+# BuildCache computes; blobs are kept as files, one per key, so any number of
+# builders can share a directory served by one of these.
+#
+#   python -m modules.cache_server [--host=H] [--port=P] [--dir=D]
+
+DEFAULT_PORT = 8765
+MAX_BLOB_BYTES = 64 * 1024 * 1024
+KEY_PATTERN = re.compile(r"^/(?:.*/)?([0-9a-f]{64})$")
+
+
+class CacheRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients can pool connections
+    server_version = "BuildCacheServer/1"
+
+    def blob_path(self):
+        match = KEY_PATTERN.match(self.path)
+        if match is None:
+            self.send_empty(400)
+            return None
+        return self.server.storage / match.group(1)
+
+    def send_empty(self, status):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_HEAD(self):
+        path = self.blob_path()
+        if path is not None:
+            self.send_empty(200 if path.exists() else 404)
+
+    def do_GET(self):
+        path = self.blob_path()
+        if path is None:
+            return
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            self.server.count("misses")
+            self.send_empty(404)
+            return
+        self.server.count("hits")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_PUT(self):
+        path = self.blob_path()
+        if path is None:
+            return
+        length = int(self.headers.get("Content-Length", "-1"))
+        if length < 0 or length > MAX_BLOB_BYTES:
+            self.close_connection = True
+            self.send_empty(411 if length < 0 else 413)
+            return
+        data = self.rfile.read(length)
+        # written aside and renamed: a concurrent GET sees the old blob or the new one
+        temp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+        self.server.count("stores")
+        self.send_empty(201)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class CacheServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, storage, verbose=False):
+        super().__init__(address, CacheRequestHandler)
+        self.storage = Path(storage)
+        self.storage.mkdir(parents=True, exist_ok=True)
+        self.verbose = verbose
+        self.stats = {"hits": 0, "misses": 0, "stores": 0}
+        self.stats_lock = threading.Lock()
+
+    def count(self, counter):
+        with self.stats_lock:
+            self.stats[counter] += 1
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def main():
+    host, port = "127.0.0.1", DEFAULT_PORT
+    storage = get_project_root() / "build" / "cache_server"
+    verbose = False
+    for arg in sys.argv[1:]:
+        if arg.startswith("--host="):
+            host = arg[len("--host="):]
+        elif arg.startswith("--port="):
+            port = int(arg[len("--port="):])
+        elif arg.startswith("--dir="):
+            storage = Path(arg[len("--dir="):])
+        elif arg == "--verbose":
+            verbose = True
+        else:
+            print("Usage: python -m modules.cache_server [--host=H] [--port=P] [--dir=D] [--verbose]")
+            sys.exit(1)
+
+    server = CacheServer((host, port), storage, verbose)
+    print(f"Build cache server on {server.url}, storing in {server.storage}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Hits: {server.stats['hits']}, misses: {server.stats['misses']}, stores: {server.stats['stores']}")
+
+
+if __name__ == "__main__":
+    main()
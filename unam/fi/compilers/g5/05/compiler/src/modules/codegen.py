@@ -1,17 +1,43 @@
+import io
+
 from nltk.tree import Tree
 
+# functions with at most this many statements and no loop get an inline hint
+INLINE_MAX_STATEMENTS = 3
+
 class CCodeGenerator:
-    def __init__(self):
-        self.code = []
+    """Parse tree to C.
+
+    whole_program emits the translation unit for gcc to optimize as a whole:
+    a prototype for every function, static (and inline for small ones) on
+    everything but main, and int64_t for Go's int.
+
+    Lines are written to sink as they are generated: a text file, gcc's
+    stdin (see Toolchain.gcc_stdin) or, by default, a buffer for get_code().
+    """
+    def __init__(self, whole_program=False, sink=None):
+        self.sink = sink if sink is not None else io.StringIO()
         self.indent_level = 0
+        self.whole_program = whole_program
+        self.int_type = "int64_t" if whole_program else "int"
 
     def emit(self, line):
-        indentation = "    " * self.indent_level
-        self.code.append(indentation + line)
+        self.sink.write("    " * self.indent_level)
+        self.sink.write(line)
+        self.sink.write("\n")
 
     def get_code(self):
-        headers = "#include <stdio.h>\n#include <stdbool.h>\n\n"
-        return headers + "\n".join(self.code)
+        if not isinstance(self.sink, io.StringIO):
+            raise ValueError("The C code was written to a stream, not kept in memory")
+        return self.sink.getvalue()
+
+    def emit_headers(self, prototypes):
+        self.sink.write("#include <stdio.h>\n#include <stdbool.h>\n")
+        if self.whole_program:
+            self.sink.write("#include <stdint.h>\n#include <inttypes.h>\n")
+        self.sink.write("\n")
+        if prototypes:
+            self.sink.write("\n".join(prototypes) + "\n\n")
 
     def visit(self, node):
         if not isinstance(node, Tree):
@@ -22,19 +48,21 @@ class CCodeGenerator:
         return visitor(node)
 
     def generic_visit(self, node):
-        res = ""
-        for child in node:
-            val = self.visit(child)
-            if isinstance(val, str):
-                res += val
-        return res
+        parts = [self.visit(child) for child in node]
+        return "".join(part for part in parts if isinstance(part, str))
 
     # --- GENERAL STRUCTURE ---
 
     def visit_SourceFile(self, node):
-        for child in node:
-            if isinstance(child, Tree) and child.label() == "TopLevelDecls":
-                self.visit(child)
+        decls = [child for child in node if isinstance(child, Tree) and child.label() == "TopLevelDecls"]
+        prototypes = []
+        if self.whole_program:
+            # known before any function body is written, so they can lead the stream
+            prototypes = [f"{self.function_header(decl[0])};" for child in decls for decl in child
+                          if isinstance(decl, Tree) and decl[0].label() == "FunctionDecl"]
+        self.emit_headers(prototypes)
+        for child in decls:
+            self.visit(child)
 
     def visit_TopLevelDecls(self, node):
         for child in node:
@@ -43,7 +71,7 @@ class CCodeGenerator:
     def visit_TopLevelDecl(self, node):
         self.visit(node[0])
 
-    def visit_FunctionDecl(self, node):
+    def function_header(self, node):
         func_name = node[0][0] # Identifier
         signature = node[1]
         params_node = signature[0]
@@ -51,7 +79,7 @@ class CCodeGenerator:
         
         return_type = "void"
         if len(result_node) > 0:
-            return_type = self.visit(result_node[0])
+            return_type = self.map_type(self.visit(result_node[0]))
         
         if func_name == "main": return_type = "int"
 
@@ -59,10 +87,24 @@ class CCodeGenerator:
         if len(params_node) > 0:
             for param in params_node:
                 p_name = param[0][0]
-                p_type = self.visit(param[1])
+                p_type = self.map_type(self.visit(param[1]))
                 c_params.append(f"{p_type} {p_name}")
-        
-        self.emit(f"{return_type} {func_name}({', '.join(c_params)}) {{")
+        if not c_params and self.whole_program:
+            c_params.append("void")
+
+        qualifiers = ""
+        if self.whole_program and func_name != "main":
+            # nothing outside this file calls them, so gcc may inline or drop them
+            qualifiers = "static inline " if self.is_small(node[-1]) else "static "
+        return f"{qualifiers}{return_type} {func_name}({', '.join(c_params)})"
+
+    def is_small(self, block):
+        statements = block[0] if len(block) > 0 else []
+        loops = [sub for sub in block.subtrees() if sub.label() == "ForStmt"]
+        return len(statements) <= INLINE_MAX_STATEMENTS and not loops
+
+    def visit_FunctionDecl(self, node):
+        self.emit(f"{self.function_header(node)} {{")
         self.indent_level += 1
         
         # The last son is Block
@@ -184,7 +226,10 @@ class CCodeGenerator:
         for i, ident in enumerate(ident_list):
             name = ident[0]
             if i < len(vals): self.emit(f"{c_type} {name} = {vals[i]};")
-            else: self.emit(f"{c_type} {name};")
+            else:
+                # Go's zero value; an uninitialized local is undefined behaviour for gcc
+                zero = '""' if c_type == "char*" else "0"
+                self.emit(f"{c_type} {name} = {zero};")
 
     def visit_ShortVarDecl(self, node):
         if len(node) == 1 and isinstance(node[0], Tree) and node[0].label() == 'ShortVarDecl':
@@ -195,7 +240,7 @@ class CCodeGenerator:
         name = ident_list[0][0]
         expr_str = self.visit(expr_list[0])
         
-        c_type = "int"
+        c_type = self.int_type
         if expr_str.startswith('"'): c_type = "char*"
         elif "." in expr_str and not expr_str.startswith('"'): c_type = "double"
         
@@ -218,7 +263,7 @@ class CCodeGenerator:
         if go_type == "string": return "char*"
         elif go_type == "float64": return "double"
         elif go_type == "bool": return "bool"
-        return "int"
+        return self.int_type
 
     # --- EXPRESSIONS AND SELECTORS ---
 
@@ -235,6 +280,8 @@ class CCodeGenerator:
                 if val.startswith('"'):
                     inner = val.strip('"') 
                     return f'printf("{inner}\\n")'
+                elif self.whole_program:
+                    return f'printf("%" PRId64 "\\n", (int64_t)({val}))'
                 else:
                     return f'printf("%d\\n", {val})'
             return 'printf("\\n")'
@@ -0,0 +1,90 @@
+# modules/compile_client.py
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+
+# Thin client of the compile server (main.py --server). It only imports the
+# standard library, so a compile costs a Python start and one round trip:
+#
+#   python -m modules.compile_client [--socket=PATH] [--no-run] [flags] <sourceFile.go>
+#   python -m modules.compile_client [--socket=PATH] --stats | --stop
+#
+# flags are the main.py ones the server understands (--noopt, --whole-program,
+# --f, --target=, --assembler=, -O<level>, --march=, --lto, --cflags=).
+
+DEFAULT_SOCKET = Path(__file__).resolve().parent.parent.parent / "build" / "compiler.sock"
+
+
+def send(request, socket_path=DEFAULT_SOCKET, timeout=120):
+    """One request to the server; its JSON response, or an error response when none came back"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(str(socket_path))
+        client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        try:
+            with client.makefile("rb") as response:
+                line = response.readline()
+        except TimeoutError:
+            return {"status": "error", "error": f"No reply from the server within {timeout} seconds"}
+    if not line.strip():
+        return {"status": "error", "error": "The server closed the connection without replying"}
+    try:
+        reply = json.loads(line)
+    except ValueError:
+        reply = None
+    if not isinstance(reply, dict) or "status" not in reply:
+        return {"status": "error", "error": f"Invalid reply from the server: {line[:200]!r}"}
+    return reply
+
+
+def main():
+    socket_path = DEFAULT_SOCKET
+    request = {"command": "compile", "args": [], "run": True}
+    for arg in sys.argv[1:]:
+        if arg.startswith("--socket="):
+            socket_path = Path(arg[len("--socket="):])
+        elif arg in ("--stats", "--stop"):
+            request = {"command": arg[2:]}
+        elif arg == "--no-run":
+            request["run"] = False
+        elif arg.startswith("-"):
+            request.setdefault("args", []).append(arg)
+        else:
+            request["source"] = os.path.abspath(arg)
+
+    if request["command"] == "compile" and "source" not in request:
+        print("Usage: python -m modules.compile_client [--socket=PATH] [--no-run] [flags] <sourceFile.go>")
+        print("       python -m modules.compile_client [--socket=PATH] --stats | --stop")
+        return 1
+    try:
+        response = send(request, socket_path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"No compile server on {socket_path}; start one with: python main.py --server")
+        return 1
+
+    if response["status"] not in ("ok", "stopping"):
+        print(f"✗ {response['status']}: {response.get('error')}")
+        return 1
+    if request["command"] != "compile":
+        for key, value in response.items():
+            print(f"{key}: {value}")
+        return 0
+
+    sizes = ', '.join(f"{backend} {binary['size']} B" for backend, binary in response["binaries"].items())
+    print(f"{'Reused' if response['cached'] else 'Built'} in {response['server_ms']:.1f} ms: {sizes}")
+    if "exit_code" not in response:
+        return 0
+    if response["output"]:
+        print("\nProgram output:")
+        print(response["output"])
+    if response["errors"]:
+        print("\nProgram errors:")
+        print(response["errors"])
+    print(f"\n--- EXIT CODE {response['exit_code']} ---")
+    return response["exit_code"] if isinstance(response["exit_code"], int) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+# modules/compile_server.py
+import hashlib
+import json
+import os
+import shutil
+import socket
+import socketserver
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from modules.batch import BatchCompiler
+from modules.build_cache import compiler_fingerprint, tool_identity
+from modules.lexer import Lexer
+from modules.parser import Parser
+from modules.tac_nasm import TARGETS, ASSEMBLERS, DEFAULT_TARGET
+from modules.toolchain import Toolchain, is_toolchain_arg
+from modules.utilities import get_output_filename, get_project_root
+
+# Long-lived compiler process (main.py --server) answering compile requests on
+# a Unix domain socket, so a build no longer pays for starting Python,
+# importing nltk and building the lexer and LALR parser. Those are built once
+# and shared by the threads serving the requests; results are kept by the hash
+# of the source and options, so an unchanged file is answered without building.
+#
+# The protocol is one JSON line each way per connection:
+#   {"command": "compile", "source": "/abs/file.go", "args": ["-O2", ...], "run": true}
+#   {"command": "stats"} / {"command": "stop"}
+# modules/compile_client.py is the matching command line client.
+
+DEFAULT_SOCKET = get_project_root() / "build" / "compiler.sock"
+RUN_TIMEOUT = 30
+MAX_RESULTS = 256  # builds kept, least recently used dropped first
+
+
+def parse_options(args):
+    """BatchCompiler keyword arguments for main.py-style flags; ValueError for anything else"""
+    options = {"optimize": True, "whole_program": False, "target": DEFAULT_TARGET, "assembler": None,
+               "generate_files": False}
+    toolchain = Toolchain()
+    for arg in args:
+        if arg == "--noopt":
+            options["optimize"] = False
+        elif arg == "--whole-program":
+            options["whole_program"] = True
+        elif arg == "--f":
+            options["generate_files"] = True
+        elif arg.startswith("--target=") and arg[len("--target="):] in TARGETS:
+            options["target"] = arg[len("--target="):]
+        elif arg.startswith("--assembler=") and arg[len("--assembler="):] in ASSEMBLERS:
+            options["assembler"] = arg[len("--assembler="):]
+        elif is_toolchain_arg(arg):
+            toolchain.parse_arg(arg)
+        else:
+            raise ValueError(f"Unsupported flag for the compile server: '{arg}'")
+    options["toolchain"] = toolchain
+    return options
+
+
+class CompileRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            command = request.get("command", "compile")
+            if command == "compile":
+                response = self.server.compile(request)
+            elif command == "stats":
+                response = self.server.get_stats()
+            elif command == "stop":
+                response = {"status": "stopping"}
+                threading.Thread(target=self.server.shutdown).start()
+            else:
+                response = {"status": "error", "error": f"Unknown command '{command}'"}
+        except Exception as e:
+            # any failure is answered, as batch.run_job does, so the client never waits on a closed socket
+            response = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class CompileServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, output_root=None):
+        # built once, shared by every request: neither keeps state between sources
+        self.lexer = Lexer().get_lexer()
+        self.parser = Parser(printer=lambda msg: None).get_parser()
+        self.output_root = Path(output_root or get_project_root() / "build" / "server")
+        self.tools = (tool_identity("gcc"), tool_identity("nasm"))
+        self.results = OrderedDict()  # request key -> result of its build
+        self.building = {}            # request key -> lock, so one build runs per key
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "hits": 0, "builds": 0, "evictions": 0}
+        self.started = time.time()
+        super().__init__(str(socket_path), CompileRequestHandler)
+
+    def request_key(self, source_code, args):
+        digest = hashlib.sha256()
+        for part in (source_code, compiler_fingerprint(), *self.tools, *args):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def compile(self, request):
+        started = time.perf_counter()
+        source_file = request["source"]
+        args = list(request.get("args", []))
+        options = parse_options(args)
+        with open(source_file, "r", encoding="utf-8") as f:
+            source_code = f.read()
+        key = self.request_key(source_code, args)
+
+        with self.lock:
+            self.stats["requests"] += 1
+            key_lock = self.building.setdefault(key, threading.Lock())
+        with key_lock:
+            with self.lock:
+                result = self.results.get(key)
+                cached = result is not None and all(Path(binary["path"]).exists()
+                                                    for binary in result["binaries"].values())
+                if cached:
+                    self.results.move_to_end(key)
+                    self.stats["hits"] += 1
+            if not cached:
+                compiler = BatchCompiler(lexer=self.lexer, parser=self.parser, **options)
+                output_dir = self.output_root / f"{get_output_filename(source_file)}-{key[:12]}"
+                result = compiler.compile_file(source_file, output_dir)
+                self.store(key, result)
+
+        response = dict(result, cached=cached)
+        if request.get("run") and "c" in result["binaries"]:
+            response.update(self.run(result["binaries"]["c"]["path"]))
+        response["server_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return response
+
+    def store(self, key, result):
+        with self.lock:
+            self.stats["builds"] += 1
+            self.results[key] = result
+            self.results.move_to_end(key)
+            while len(self.results) > MAX_RESULTS:
+                old_key, old_result = self.results.popitem(last=False)
+                self.building.pop(old_key, None)
+                shutil.rmtree(old_result["output_dir"], ignore_errors=True)
+                self.stats["evictions"] += 1
+
+    def run(self, exe_path):
+        try:
+            result = subprocess.run([exe_path], capture_output=True, text=True, timeout=RUN_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            return {"output": "", "errors": f"Killed after {RUN_TIMEOUT} seconds", "exit_code": None}
+        return {"output": result.stdout, "errors": result.stderr, "exit_code": result.returncode}
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats, status="ok", results=len(self.results), pid=os.getpid(),
+                        uptime_s=round(time.time() - self.started, 1))
+
+
+def serve(socket_path=DEFAULT_SOCKET):
+    """Run a CompileServer on socket_path until a client sends stop (or Ctrl+C)"""
+    if not hasattr(socket, "AF_UNIX"):
+        print("The compile server needs Unix domain sockets, which this platform does not have")
+        return 1
+    socket_path = Path(socket_path)
+    if socket_path.exists():
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(socket_path))
+            print(f"A compile server is already listening on {socket_path}")
+            return 1
+        except OSError:
+            socket_path.unlink()  # left behind by a server that did not stop cleanly
+        finally:
+            probe.close()
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+    server = CompileServer(socket_path)
+    print(f"Compile server ready on {socket_path} (pid {os.getpid()})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        socket_path.unlink(missing_ok=True)
+        stats = server.get_stats()
+        print(f"Served {stats['requests']} requests: {stats['hits']} from memory, {stats['builds']} builds")
+    return 0
@@ -0,0 +1,155 @@
+# modules/elf_object.py
+import struct
+
+# Relocatable ELF64 (x86-64) objects for an AssembledProgram, laid out like
+# the ones nasm -f elf64 writes: .text/.data/.bss, the non-executable stack
+# note, a symbol table with the labels and a .rela.text section.
+
+SHT_PROGBITS, SHT_SYMTAB, SHT_STRTAB, SHT_RELA, SHT_NOBITS = 1, 2, 3, 4, 8
+SHF_WRITE, SHF_ALLOC, SHF_EXECINSTR, SHF_INFO_LINK = 0x1, 0x2, 0x4, 0x40
+STB_LOCAL, STB_GLOBAL = 0, 1
+STT_NOTYPE, STT_SECTION, STT_FILE = 0, 3, 4
+SHN_UNDEF, SHN_ABS = 0, 0xFFF1
+EM_X86_64 = 62
+ET_REL = 1
+
+
+class StringTable:
+    def __init__(self):
+        self.data = bytearray(b'\0')
+        self.offsets = {'': 0}
+
+    def add(self, name):
+        if name not in self.offsets:
+            self.offsets[name] = len(self.data)
+            self.data += name.encode('utf-8') + b'\0'
+        return self.offsets[name]
+
+
+class Section:
+    def __init__(self, name, kind, flags=0, data=b'', align=1, entsize=0, size=None):
+        self.name = name
+        self.kind = kind
+        self.flags = flags
+        self.data = bytes(data)
+        self.align = align
+        self.entsize = entsize
+        self.size = len(self.data) if size is None else size
+        self.link = 0
+        self.info = 0
+
+
+def build_elf_object(program, source_name=''):
+    """Bytes of the relocatable object for program"""
+    sections = [
+        None,
+        Section('.text', SHT_PROGBITS, SHF_ALLOC | SHF_EXECINSTR, program.sections['.text'], 16),
+        Section('.data', SHT_PROGBITS, SHF_WRITE | SHF_ALLOC, program.sections['.data'], 4),
+        Section('.bss', SHT_NOBITS, SHF_WRITE | SHF_ALLOC, align=4, size=program.bss_size),
+        Section('.note.GNU-stack', SHT_PROGBITS),
+    ]
+    section_index = {section.name: index for index, section in enumerate(sections) if section}
+
+    strtab = StringTable()
+    symbols = [(0, 0, 0, SHN_UNDEF, 0)]  # (name, info, other, shndx, value)
+    if source_name:
+        symbols.append((strtab.add(source_name), STB_LOCAL << 4 | STT_FILE, 0, SHN_ABS, 0))
+    section_symbol = {}
+    for name in ('.text', '.data', '.bss'):
+        section_symbol[name] = len(symbols)
+        symbols.append((0, STB_LOCAL << 4 | STT_SECTION, 0, section_index[name], 0))
+    for name, (section, offset) in program.labels.items():
+        if name not in program.globals:
+            symbols.append((strtab.add(name), STB_LOCAL << 4 | STT_NOTYPE, 0, section_index[section], offset))
+    first_global = len(symbols)
+
+    symbol_index = {}
+    for name in program.globals:
+        if name not in program.labels:
+            raise ValueError(f"Global symbol '{name}' is not defined")
+        section, offset = program.labels[name]
+        symbol_index[name] = len(symbols)
+        symbols.append((strtab.add(name), STB_GLOBAL << 4 | STT_NOTYPE, 0, section_index[section], offset))
+    referenced = [reloc.symbol for reloc in program.relocations if reloc.symbol not in program.labels]
+    for name in program.externs + referenced:
+        if name not in symbol_index:
+            symbol_index[name] = len(symbols)
+            symbols.append((strtab.add(name), STB_GLOBAL << 4 | STT_NOTYPE, 0, SHN_UNDEF, 0))
+
+    relocations = bytearray()
+    for reloc in program.relocations:
+        if reloc.symbol in program.labels:
+            # local data is addressed through its section symbol, as nasm does
+            section, offset = program.labels[reloc.symbol]
+            index, addend = section_symbol[section], reloc.addend + offset
+        else:
+            index, addend = symbol_index[reloc.symbol], reloc.addend
+        relocations += struct.pack('<QQq', reloc.offset, index << 32 | reloc.kind, addend)
+
+    symtab_data = b''.join(struct.pack('<IBBHQQ', name, info, other, shndx, value, 0)
+                           for name, info, other, shndx, value in symbols)
+    symtab = Section('.symtab', SHT_SYMTAB, data=symtab_data, align=8, entsize=24)
+    strtab_section = Section('.strtab', SHT_STRTAB, data=strtab.data)
+    rela = Section('.rela.text', SHT_RELA, SHF_INFO_LINK, relocations, 8, 24)
+    sections += [symtab, strtab_section, rela]
+    symtab.link = len(sections) - 2
+    symtab.info = first_global
+    rela.link = len(sections) - 3
+    rela.info = section_index['.text']
+
+    shstrtab = StringTable()
+    shstrtab_section = Section('.shstrtab', SHT_STRTAB)
+    sections.append(shstrtab_section)
+    names = [shstrtab.add(section.name) if section else 0 for section in sections]
+    shstrtab_section.data = bytes(shstrtab.data)
+    shstrtab_section.size = len(shstrtab_section.data)
+
+    # contents after the 64-byte header, each aligned, then the section headers
+    body = bytearray()
+    offsets = []
+    for section in sections:
+        if section is None:
+            offsets.append(0)
+            continue
+        padding = -(64 + len(body)) % max(section.align, 1)
+        body += bytes(padding)
+        offsets.append(64 + len(body))
+        if section.kind != SHT_NOBITS:
+            body += section.data
+    body += bytes(-(64 + len(body)) % 8)
+    section_headers_offset = 64 + len(body)
+
+    header = b'\x7fELF' + bytes([2, 1, 1, 0]) + bytes(8)
+    header += struct.pack('<HHIQQQIHHHHHH', ET_REL, EM_X86_64, 1, 0, 0, section_headers_offset,
+                          0, 64, 0, 0, 64, len(sections), len(sections) - 1)
+
+    headers = bytearray(bytes(64))
+    for section, name, offset in zip(sections[1:], names[1:], offsets[1:]):
+        headers += struct.pack('<IIQQQQIIQQ', name, section.kind, section.flags, 0, offset, section.size,
+                               section.link, section.info, section.align, section.entsize)
+    return bytes(header) + bytes(body) + bytes(headers)
+
+
+def write_elf_object(program, path, source_name=''):
+    with open(path, 'wb') as f:
+        f.write(build_elf_object(program, source_name))
+    return path
+
+
+def read_elf_sections(path):
+    """name -> contents of the sections of an ELF64 object (for comparing objects)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != b'\x7fELF' or data[4] != 2:
+        raise ValueError(f"{path} is not an ELF64 file")
+    section_headers_offset, = struct.unpack_from('<Q', data, 0x28)
+    count, names_index = struct.unpack_from('<HH', data, 0x3C)
+    headers = [struct.unpack_from('<IIQQQQIIQQ', data, section_headers_offset + 64 * index) for index in range(count)]
+    names_offset = headers[names_index][4]
+
+    sections = {}
+    for name_offset, kind, _, _, offset, size, *_ in headers[1:]:
+        end = data.index(b'\0', names_offset + name_offset)
+        name = data[names_offset + name_offset:end].decode('utf-8')
+        sections[name] = b'' if kind == SHT_NOBITS else data[offset:offset + size]
+    return sections
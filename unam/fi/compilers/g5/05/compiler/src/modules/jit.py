@@ -0,0 +1,184 @@
+# modules/jit.py
+import ctypes
+import mmap
+import os
+import platform
+
+from modules.lexer import Lexer
+from modules.parser import Parser
+from modules.semantic import SemanticAnalyzer
+from modules.tac_generator import TACGenerator
+from modules.tac_optimizer import TACOptimizer
+from modules.tac_nasm import TACToNASM64
+from modules.nasm_encoder import X86Assembler, R_X86_64_PC32, R_X86_64_PLT32
+
+# The generated code follows the System V convention of the linux-x86_64
+# target, which is also the one ctypes uses for callbacks on x86-64 POSIX hosts.
+JIT_TARGET = 'linux-x86_64'
+
+PRINTF_TYPE = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_char_p, ctypes.c_uint64)
+MAIN_TYPE = ctypes.CFUNCTYPE(ctypes.c_int)
+
+# jmp [rip+0] followed by the absolute address it jumps to
+STUB_SIZE = 16
+
+PROT_READ_EXEC = mmap.PROT_READ | mmap.PROT_EXEC
+
+
+class JITError(RuntimeError):
+    pass
+
+
+def align(offset, alignment=16):
+    return offset + -offset % alignment
+
+
+class PrintlnCallback:
+    """Host side of fmt.Println: the printf the generated code calls, writing into output"""
+
+    def __init__(self):
+        self.chunks = []
+        self.function = PRINTF_TYPE(self.printf)
+
+    def printf(self, fmt, value):
+        text = fmt.decode('utf-8')
+        if '%s' in text:
+            argument = ctypes.string_at(value).decode('utf-8', 'replace')
+        else:
+            # ints travel in the low dword of the argument register
+            argument = ctypes.c_int32(value & 0xFFFFFFFF).value
+        output = text % argument
+        self.chunks.append(output)
+        return len(output)
+
+    @property
+    def output(self):
+        return ''.join(self.chunks)
+
+    @property
+    def address(self):
+        return ctypes.cast(self.function, ctypes.c_void_p).value
+
+
+def mprotect(address, size, prot):
+    libc = ctypes.CDLL(None, use_errno=True)
+    libc.mprotect.argtypes = (ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int)
+    if libc.mprotect(address, size, prot) != 0:
+        raise JITError(f"mprotect failed: {os.strerror(ctypes.get_errno())}")
+
+
+class JITProgram:
+    """An AssembledProgram loaded into one mmap region.
+
+    The region holds .text, a jump stub for every extern (the callbacks live
+    too far away for a rel32 call), then .data and .bss from the next page
+    on. It is mapped read-write while the sections are copied in and the
+    relocations patched, then the code pages become read-execute and the
+    data pages stay read-write, so no page is writable and executable at
+    once. close() releases it.
+    """
+
+    def __init__(self, program, externs):
+        text = program.sections['.text']
+        data = program.sections['.data']
+        self.section_offsets = {'.text': 0}
+        stubs_offset = align(len(text))
+        self.stub_offsets = {name: stubs_offset + STUB_SIZE * index for index, name in enumerate(externs)}
+        self.code_size = align(stubs_offset + STUB_SIZE * len(externs), mmap.PAGESIZE)
+        self.section_offsets['.data'] = self.code_size
+        self.section_offsets['.bss'] = align(self.section_offsets['.data'] + len(data))
+        size = max(align(self.section_offsets['.bss'] + program.bss_size, mmap.PAGESIZE), mmap.PAGESIZE)
+
+        self.memory = mmap.mmap(-1, size, flags=mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS,
+                                prot=mmap.PROT_READ | mmap.PROT_WRITE)
+        self.anchor = ctypes.c_char.from_buffer(self.memory)
+        self.base = ctypes.addressof(self.anchor)
+
+        self.memory[0:len(text)] = bytes(text)
+        data_offset = self.section_offsets['.data']
+        self.memory[data_offset:data_offset + len(data)] = bytes(data)
+        for name, offset in self.stub_offsets.items():
+            stub = (bytes([0xFF, 0x25, 0, 0, 0, 0]) + externs[name].to_bytes(8, 'little')).ljust(STUB_SIZE, b'\xCC')
+            self.memory[offset:offset + STUB_SIZE] = stub
+
+        self.labels = {name: self.section_offsets[section] + offset
+                       for name, (section, offset) in program.labels.items()}
+        for reloc in program.relocations:
+            self.patch(reloc)
+        if self.code_size:
+            mprotect(self.base, self.code_size, PROT_READ_EXEC)
+
+    def patch(self, reloc):
+        if reloc.kind not in (R_X86_64_PC32, R_X86_64_PLT32):
+            raise JITError(f"Unsupported relocation type {reloc.kind}")
+        if reloc.symbol in self.labels:
+            target = self.labels[reloc.symbol]
+        elif reloc.symbol in self.stub_offsets:
+            target = self.stub_offsets[reloc.symbol]
+        else:
+            raise JITError(f"Unresolved symbol '{reloc.symbol}'")
+        # everything sits in one region, so offsets stand in for addresses
+        value = target + reloc.addend - reloc.offset
+        self.memory[reloc.offset:reloc.offset + 4] = value.to_bytes(4, 'little', signed=True)
+
+    def address_of(self, name):
+        if name not in self.labels:
+            raise JITError(f"Undefined symbol '{name}'")
+        return self.base + self.labels[name]
+
+    def call(self, name='main'):
+        return MAIN_TYPE(self.address_of(name))()
+
+    def close(self):
+        # the exported buffer has to go before the mapping can be closed
+        del self.anchor
+        self.memory.close()
+
+
+def check_host():
+    if os.name != 'posix' or platform.machine().lower() not in ('x86_64', 'amd64'):
+        raise JITError("The JIT needs an x86-64 POSIX host (System V calling convention)")
+
+
+def jit_run_tac(tac_code, allocate_registers=True):
+    """Compile TAC to machine code in memory and run main; returns (output, exit code)"""
+    check_host()
+    nasm_code = TACToNASM64(allocate_registers, JIT_TARGET).convert_tac_instructions(tac_code)
+    program = X86Assembler().assemble(nasm_code)
+
+    println = PrintlnCallback()
+    host_symbols = {'printf': println.address}
+    externs = {}
+    for name in program.externs:
+        if name in host_symbols:
+            externs[name] = host_symbols[name]
+    for reloc in program.relocations:
+        if reloc.symbol not in program.labels and reloc.symbol not in externs:
+            raise JITError(f"No host function for '{reloc.symbol}'")
+
+    loaded = JITProgram(program, externs)
+    try:
+        exit_code = loaded.call('main')
+    finally:
+        loaded.close()
+    return println.output, exit_code
+
+
+class JITRunner:
+    """Runs many programs in one process; the lexer and parser are built once"""
+
+    def __init__(self, optimize=True, allocate_registers=True):
+        check_host()
+        self.lexer = Lexer().get_lexer()
+        self.parser = Parser().get_parser()
+        self.optimize = optimize
+        self.allocate_registers = allocate_registers
+
+    def run_source(self, source_code):
+        """Compile and run one Go source; returns (output, exit code)"""
+        parse_tree = self.parser.parse(self.lexer.lex(source_code))
+        SemanticAnalyzer().visit(parse_tree)
+        tac_code = TACGenerator().generate_tac(parse_tree)
+        if self.optimize:
+            tac_code = TACOptimizer().optimize(tac_code)
+        return jit_run_tac(tac_code, self.allocate_registers)
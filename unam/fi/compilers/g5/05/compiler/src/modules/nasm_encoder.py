@@ -0,0 +1,570 @@
+# modules/nasm_encoder.py
+import re
+
+# x86-64 machine code for the NASM text written by TACToNASM64, so an object
+# file can be produced without running nasm. Only the instruction forms the
+# backend emits are covered; the encodings are the ones nasm picks for them
+# (short immediates and jumps, the eax forms of the ALU ops, shl by 1 as D1).
+
+REGISTERS = {}
+for number, names in enumerate([
+        ('rax', 'eax', 'al'), ('rcx', 'ecx', 'cl'), ('rdx', 'edx', 'dl'), ('rbx', 'ebx', 'bl'),
+        ('rsp', 'esp', None), ('rbp', 'ebp', None), ('rsi', 'esi', None), ('rdi', 'edi', None)]):
+    for size, name in zip((64, 32, 8), names):
+        if name:
+            REGISTERS[name] = (number, size)
+for number in range(8, 16):
+    REGISTERS[f"r{number}"] = (number, 64)
+    REGISTERS[f"r{number}d"] = (number, 32)
+
+CONDITION_NUMBERS = {
+    'o': 0, 'no': 1, 'b': 2, 'ae': 3, 'e': 4, 'z': 4, 'ne': 5, 'nz': 5, 'be': 6, 'a': 7,
+    's': 8, 'ns': 9, 'p': 10, 'np': 11, 'l': 12, 'ge': 13, 'le': 14, 'g': 15,
+}
+
+# /digit of the group opcodes
+ALU_OPS = {'add': 0, 'or': 1, 'and': 4, 'sub': 5, 'xor': 6, 'cmp': 7}
+GROUP3_OPS = {'not': 2, 'neg': 3, 'mul': 4, 'imul': 5, 'div': 6, 'idiv': 7}
+SHIFT_OPS = {'rol': 0, 'ror': 1, 'shl': 4, 'sal': 4, 'shr': 5, 'sar': 7}
+MEMORY_SIZES = {'byte': 8, 'dword': 32, 'qword': 64}
+
+# ELF relocation types
+R_X86_64_PC32 = 2
+R_X86_64_PLT32 = 4
+
+
+class Register:
+    def __init__(self, name):
+        self.name = name
+        self.number, self.size = REGISTERS[name]
+
+
+class Immediate:
+    def __init__(self, value):
+        self.value = value
+
+
+class Memory:
+    """[base + index*scale + disp], or [symbol + disp] relative to rip (default rel)"""
+
+    def __init__(self, size=None, base=None, index=None, scale=1, disp=0, symbol=None):
+        self.size = size
+        self.base = base
+        self.index = index
+        self.scale = scale
+        self.disp = disp
+        self.symbol = symbol
+
+
+class SymbolRef:
+    def __init__(self, name, plt=False):
+        self.name = name
+        self.plt = plt
+
+
+class Relocation:
+    """A 4-byte field at offset of a section that refers to symbol"""
+
+    def __init__(self, offset, symbol, kind, addend):
+        self.offset = offset
+        self.symbol = symbol
+        self.kind = kind
+        self.addend = addend
+
+
+class AssembledProgram:
+    """Section contents, labels and unresolved references of one assembly file.
+
+    labels maps a name to (section, offset). Relocations refer to labels of
+    .data/.bss or to externs; references inside .text are already resolved.
+    """
+
+    def __init__(self):
+        self.sections = {'.text': bytearray(), '.data': bytearray()}
+        self.bss_size = 0
+        self.labels = {}
+        self.globals = []
+        self.externs = []
+        self.relocations = []
+        self.line_offsets = []  # (offset in .text, source line)
+
+
+class EncodingError(ValueError):
+    pass
+
+
+def parse_integer(text):
+    text = text.strip()
+    try:
+        return int(text, 0)
+    except ValueError:
+        return None
+
+
+def parse_operand(text):
+    text = text.strip()
+    if text in REGISTERS:
+        return Register(text)
+    value = parse_integer(text)
+    if value is not None:
+        return Immediate(value)
+    if '[' in text:
+        return parse_memory(text)
+    if text.endswith(' wrt ..plt'):
+        return SymbolRef(text[:-len(' wrt ..plt')].strip(), plt=True)
+    if re.fullmatch(r'[A-Za-z_.][\w.]*', text):
+        return SymbolRef(text)
+    raise EncodingError(f"Unknown operand '{text}'")
+
+
+def parse_memory(text):
+    size_name, _, address = text.partition('[')
+    size_name = size_name.strip()
+    if size_name and size_name not in MEMORY_SIZES:
+        raise EncodingError(f"Unknown operand size '{size_name}'")
+    memory = Memory(MEMORY_SIZES.get(size_name))
+    expression = address.rstrip().rstrip(']').strip()
+    if expression.startswith('rel '):
+        expression = expression[4:]
+
+    for sign, term in re.findall(r'([+-]?)\s*([^+-]+)', expression):
+        term = term.strip()
+        factors = [factor.strip() for factor in term.split('*')]
+        registers = [factor for factor in factors if factor in REGISTERS]
+        if registers:
+            if sign == '-':
+                raise EncodingError(f"Negative register in '{text}'")
+            scale = 1
+            for factor in factors:
+                if factor not in REGISTERS:
+                    scale *= int(factor, 0)
+            register = Register(registers[0])
+            if scale == 1 and memory.base is None:
+                memory.base = register
+            elif memory.index is None:
+                memory.index, memory.scale = register, scale
+            else:
+                raise EncodingError(f"Too many registers in '{text}'")
+            continue
+        value = parse_integer(term)
+        if value is not None:
+            memory.disp += -value if sign == '-' else value
+        elif memory.symbol is None and sign != '-':
+            memory.symbol = term
+        else:
+            raise EncodingError(f"Cannot address '{text}'")
+    return memory
+
+
+def split_operands(text):
+    """Comma-separated operands, keeping commas inside quotes"""
+    operands = []
+    current = ''
+    quote = None
+    for char in text:
+        if quote:
+            current += char
+            if char == quote:
+                quote = None
+        elif char in '"\'`':
+            quote = char
+            current += char
+        elif char == ',':
+            operands.append(current.strip())
+            current = ''
+        else:
+            current += char
+    if current.strip():
+        operands.append(current.strip())
+    return operands
+
+
+def fits_int8(value):
+    return -128 <= value <= 127
+
+
+def le32(value):
+    return (value & 0xFFFFFFFF).to_bytes(4, 'little')
+
+
+def le64(value):
+    return (value & 0xFFFFFFFFFFFFFFFF).to_bytes(8, 'little')
+
+
+class Encoded:
+    """Bytes of one instruction and the rip-relative fields it leaves open"""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.fixups = []  # (position, symbol, kind, addend)
+
+
+class X86Encoder:
+    """Encodes single instructions; jumps are sized by X86Assembler"""
+
+    def encode(self, op, operands):
+        if op in ALU_OPS:
+            return self.alu(ALU_OPS[op], operands)
+        if op in GROUP3_OPS and len(operands) == 1:
+            return self.group(0xF7, GROUP3_OPS[op], operands[0])
+        if op in ('inc', 'dec'):
+            return self.group(0xFF, 0 if op == 'inc' else 1, operands[0])
+        if op in SHIFT_OPS:
+            return self.shift(SHIFT_OPS[op], operands)
+        handler = getattr(self, f"encode_{op}", None)
+        if handler is not None:
+            return handler(operands)
+        if op.startswith('set') and op[3:] in CONDITION_NUMBERS:
+            return self.modrm_form([0x0F, 0x90 + CONDITION_NUMBERS[op[3:]]], 0, operands[0], 8)
+        raise EncodingError(f"Unsupported instruction '{op}'")
+
+    # --- INSTRUCTION FORMS ---
+
+    def alu(self, digit, operands):
+        dest, src = operands
+        size = self.operand_size(dest, src)
+        if isinstance(src, Immediate):
+            if fits_int8(src.value):
+                return self.modrm_form([0x83], digit, dest, size, immediate=src.value.to_bytes(1, 'little', signed=True))
+            if isinstance(dest, Register) and dest.number == 0:
+                return self.plain([0x05 + 8 * digit], size, immediate=le32(src.value))
+            return self.modrm_form([0x81], digit, dest, size, immediate=le32(src.value))
+        if isinstance(src, Register):
+            return self.modrm_form([0x01 + 8 * digit], src, dest, size)
+        return self.modrm_form([0x03 + 8 * digit], dest, src, size)
+
+    def group(self, opcode, digit, operand):
+        return self.modrm_form([opcode], digit, operand, self.operand_size(operand))
+
+    def shift(self, digit, operands):
+        dest, count = operands
+        size = self.operand_size(dest)
+        if not isinstance(count, Immediate):
+            raise EncodingError("Shift counts must be immediates")
+        if count.value == 1:
+            return self.modrm_form([0xD1], digit, dest, size)
+        return self.modrm_form([0xC1], digit, dest, size, immediate=bytes([count.value & 0xFF]))
+
+    def encode_mov(self, operands):
+        dest, src = operands
+        size = self.operand_size(dest, src)
+        if isinstance(src, Immediate):
+            if isinstance(dest, Register):
+                if size == 64 and not -2**31 <= src.value < 2**31:
+                    return self.plain([0xB8 + (dest.number & 7)], size, rex_b=dest.number >> 3,
+                                      immediate=le64(src.value))
+                if size == 32:
+                    return self.plain([0xB8 + (dest.number & 7)], size, rex_b=dest.number >> 3,
+                                      immediate=le32(src.value))
+            return self.modrm_form([0xC7], 0, dest, size, immediate=le32(src.value))
+        if isinstance(src, Register):
+            return self.modrm_form([0x89], src, dest, size)
+        return self.modrm_form([0x8B], dest, src, size)
+
+    def encode_lea(self, operands):
+        dest, src = operands
+        if not isinstance(src, Memory):
+            raise EncodingError("lea needs a memory operand")
+        return self.modrm_form([0x8D], dest, src, dest.size)
+
+    def encode_test(self, operands):
+        dest, src = operands
+        size = self.operand_size(dest, src)
+        if isinstance(src, Immediate):
+            return self.modrm_form([0xF7], 0, dest, size, immediate=le32(src.value))
+        return self.modrm_form([0x85], src, dest, size)
+
+    def encode_imul(self, operands):
+        if len(operands) == 1:
+            return self.group(0xF7, 5, operands[0])
+        if len(operands) == 2:
+            dest, src = operands
+            if isinstance(src, Immediate):
+                operands = [dest, dest, src]
+            else:
+                return self.modrm_form([0x0F, 0xAF], dest, src, dest.size)
+        dest, src, factor = operands
+        if fits_int8(factor.value):
+            return self.modrm_form([0x6B], dest, src, dest.size, immediate=factor.value.to_bytes(1, 'little', signed=True))
+        return self.modrm_form([0x69], dest, src, dest.size, immediate=le32(factor.value))
+
+    def encode_movzx(self, operands):
+        dest, src = operands
+        return self.modrm_form([0x0F, 0xB6], dest, src, dest.size)
+
+    def encode_push(self, operands):
+        return self.plain([0x50 + (operands[0].number & 7)], 32, rex_b=operands[0].number >> 3)
+
+    def encode_pop(self, operands):
+        return self.plain([0x58 + (operands[0].number & 7)], 32, rex_b=operands[0].number >> 3)
+
+    def encode_cdq(self, operands):
+        return self.plain([0x99], 32)
+
+    def encode_cqo(self, operands):
+        return self.plain([0x99], 64)
+
+    def encode_ret(self, operands):
+        return self.plain([0xC3], 32)
+
+    # --- PREFIXES, MODRM AND SIB ---
+
+    def operand_size(self, *operands):
+        for operand in operands:
+            if isinstance(operand, Register):
+                return operand.size
+        for operand in operands:
+            if isinstance(operand, Memory) and operand.size:
+                return operand.size
+        raise EncodingError("Operand size not specified")
+
+    def rex(self, size, r=0, x=0, b=0):
+        bits = (8 if size == 64 else 0) | (r << 2) | (x << 1) | b
+        return [0x40 | bits] if bits else []
+
+    def plain(self, opcode, size, rex_b=0, immediate=b''):
+        encoded = Encoded()
+        encoded.data += bytes(self.rex(size, b=rex_b) + opcode) + immediate
+        return encoded
+
+    def modrm_form(self, opcode, reg, rm, size, immediate=b''):
+        """opcode /r (reg a Register) or opcode /digit (reg an int) with rm a register or memory"""
+        reg_number = reg.number if isinstance(reg, Register) else reg
+        encoded = Encoded()
+        if isinstance(rm, Register):
+            prefix = self.rex(size, r=reg_number >> 3, b=rm.number >> 3)
+            encoded.data += bytes(prefix + opcode + [0xC0 | (reg_number & 7) << 3 | (rm.number & 7)])
+            encoded.data += immediate
+            return encoded
+        if not isinstance(rm, Memory):
+            raise EncodingError("Expected a register or memory operand")
+
+        address, x, b, fixup = self.address(reg_number & 7, rm)
+        prefix = self.rex(size, r=reg_number >> 3, x=x, b=b)
+        start = len(prefix) + len(opcode)
+        encoded.data += bytes(prefix + opcode) + address + immediate
+        if fixup is not None:
+            position, symbol, disp = fixup
+            # rip points past the immediate when the field is read
+            encoded.fixups.append((start + position, symbol, R_X86_64_PC32, disp - 4 - len(immediate)))
+        return encoded
+
+    def address(self, reg_bits, memory):
+        """ModRM (+SIB, disp) bytes, REX.X, REX.B and the rip-relative field if any"""
+        if memory.symbol is not None:
+            if memory.base or memory.index:
+                raise EncodingError("Symbols cannot be combined with registers")
+            return bytes([reg_bits << 3 | 0b101]) + bytes(4), 0, 0, (1, memory.symbol, memory.disp)
+
+        base, index, scale, disp = memory.base, memory.index, memory.scale, memory.disp
+        if base is None and index is not None and scale in (2, 3, 5, 9):
+            # [r*2] is [r+r], shorter than an index without base
+            base, scale = index, scale - 1
+        if index is not None and scale == 1 and index.number == 4:
+            base, index = index, base
+        if base is None and index is None:
+            raise EncodingError("Absolute addresses are not supported")
+        if index is not None and index.number == 4:
+            raise EncodingError("rsp cannot be an index")
+
+        if base is None:
+            sib = SCALE_BITS[scale] << 6 | (index.number & 7) << 3 | 0b101
+            return bytes([reg_bits << 3 | 0b100, sib]) + le32(disp), index.number >> 3, 0, None
+
+        if disp == 0 and base.number & 7 != 5:
+            mod, displacement = 0, b''
+        elif fits_int8(disp):
+            mod, displacement = 1, disp.to_bytes(1, 'little', signed=True)
+        else:
+            mod, displacement = 2, le32(disp)
+
+        if index is None and base.number & 7 != 4:
+            return bytes([mod << 6 | reg_bits << 3 | (base.number & 7)]) + displacement, 0, base.number >> 3, None
+        index_bits = 0b100 if index is None else index.number & 7
+        sib = SCALE_BITS[scale] << 6 | index_bits << 3 | (base.number & 7)
+        x = 0 if index is None else index.number >> 3
+        return bytes([mod << 6 | reg_bits << 3 | 0b100, sib]) + displacement, x, base.number >> 3, None
+
+
+SCALE_BITS = {1: 0, 2: 1, 4: 2, 8: 3}
+
+
+class X86Assembler:
+    """Assembles the text of build_nasm_code into an AssembledProgram.
+
+    Jumps start in their short form and are widened, pass after pass, until
+    every displacement fits, as nasm does.
+    """
+
+    def __init__(self):
+        self.encoder = X86Encoder()
+
+    def assemble(self, nasm_code):
+        program = AssembledProgram()
+        text_items = []  # ('label', name) | ('jump', op, target, line) | ('code', Encoded, line)
+        section = '.text'
+
+        for raw_line in nasm_code.split('\n'):
+            line = self.strip_comment(raw_line).strip()
+            if not line:
+                continue
+            keyword = line.split(None, 1)[0]
+            if keyword == 'default':
+                continue
+            if keyword == 'section':
+                section = line.split()[1]
+                continue
+            if keyword in ('global', 'extern'):
+                names = [name.strip() for name in line.split(None, 1)[1].split(',')]
+                (program.globals if keyword == 'global' else program.externs).extend(names)
+                continue
+            if section == '.text':
+                self.parse_text_line(line, raw_line, text_items)
+            elif section in ('.data', '.bss'):
+                self.parse_data_line(line, section, program)
+            # other sections (.note.GNU-stack) carry no contents
+
+        self.layout_text(text_items, program)
+        return program
+
+    def strip_comment(self, line):
+        quote = None
+        for position, char in enumerate(line):
+            if quote:
+                if char == quote:
+                    quote = None
+            elif char in '"\'`':
+                quote = char
+            elif char == ';':
+                return line[:position]
+        return line
+
+    def parse_text_line(self, line, raw_line, items):
+        if line.endswith(':') and not raw_line[:1].isspace():
+            items.append(('label', line[:-1]))
+            return
+        parts = line.split(None, 1)
+        op = parts[0]
+        operands = [parse_operand(text) for text in split_operands(parts[1])] if len(parts) > 1 else []
+        if op == 'jmp' or op == 'call' or (op.startswith('j') and op[1:] in CONDITION_NUMBERS):
+            if len(operands) != 1 or not isinstance(operands[0], SymbolRef):
+                raise EncodingError(f"Cannot encode '{line}'")
+            items.append(('jump', op, operands[0], line))
+            return
+        try:
+            items.append(('code', self.encoder.encode(op, operands), line))
+        except (EncodingError, AttributeError, TypeError, ValueError) as error:
+            raise EncodingError(f"Cannot encode '{line}': {error}")
+
+    def parse_data_line(self, line, section, program):
+        match = re.match(r'([A-Za-z_.][\w.]*):?\s+(db|dw|dd|dq|resb|resw|resd|resq)\b\s*(.*)$', line)
+        if not match:
+            match = re.match(r'()(db|dw|dd|dq|resb|resw|resd|resq)\b\s*(.*)$', line)
+        if not match:
+            raise EncodingError(f"Cannot assemble data line '{line}'")
+        label, directive, rest = match.groups()
+        width = {'b': 1, 'w': 2, 'd': 4, 'q': 8}[directive[-1]]
+
+        if section == '.bss':
+            if label:
+                self.check_new_label(label, program.labels)
+                program.labels[label] = ('.bss', program.bss_size)
+            program.bss_size += width * int(rest, 0)
+            return
+        data = program.sections['.data']
+        if label:
+            self.check_new_label(label, program.labels)
+            program.labels[label] = ('.data', len(data))
+        if directive.startswith('res'):
+            data += bytes(width * int(rest, 0))
+            return
+        for item in split_operands(rest):
+            if item[:1] in '"\'`':
+                # nasm keeps "..." and '...' strings verbatim
+                data += item[1:-1].encode('utf-8')
+            else:
+                data += (int(item, 0) & ((1 << 8 * width) - 1)).to_bytes(width, 'little')
+
+    def layout_text(self, items, program):
+        long_jumps = set()
+        while True:
+            offsets = self.text_offsets(items, long_jumps)
+            widened = False
+            for position, item in enumerate(items):
+                if item[0] != 'jump' or item[1] == 'call' or position in long_jumps:
+                    continue
+                target = item[2].name
+                if target not in offsets['labels']:
+                    raise EncodingError(f"Undefined label '{target}' in '{item[3]}'")
+                end = offsets['items'][position] + 2
+                if not fits_int8(offsets['labels'][target] - end):
+                    long_jumps.add(position)
+                    widened = True
+            if not widened:
+                break
+
+        text = program.sections['.text']
+        labels = offsets['labels']
+        for name, offset in labels.items():
+            self.check_new_label(name, program.labels)
+            program.labels[name] = ('.text', offset)
+        for position, item in enumerate(items):
+            if item[0] == 'label':
+                continue
+            start = len(text)
+            if item[0] == 'code':
+                encoded = item[1]
+                text += encoded.data
+                for field, symbol, kind, addend in encoded.fixups:
+                    program.relocations.append(Relocation(start + field, symbol, kind, addend))
+                program.line_offsets.append((start, item[2]))
+                continue
+
+            _, op, target, line = item
+            program.line_offsets.append((start, line))
+            if op == 'call':
+                text.append(0xE8)
+                if target.name in labels:
+                    text += le32(labels[target.name] - (start + 5))
+                else:
+                    kind = R_X86_64_PLT32 if target.plt else R_X86_64_PC32
+                    program.relocations.append(Relocation(start + 1, target.name, kind, -4))
+                    text += bytes(4)
+                continue
+            short = position not in long_jumps
+            size = self.jump_size(op, short)
+            displacement = labels[target.name] - (start + size)
+            if op == 'jmp':
+                text += bytes([0xEB]) + displacement.to_bytes(1, 'little', signed=True) if short \
+                    else bytes([0xE9]) + le32(displacement)
+            else:
+                condition = CONDITION_NUMBERS[op[1:]]
+                text += bytes([0x70 + condition]) + displacement.to_bytes(1, 'little', signed=True) if short \
+                    else bytes([0x0F, 0x80 + condition]) + le32(displacement)
+
+    def text_offsets(self, items, long_jumps):
+        offset = 0
+        labels = {}
+        item_offsets = []
+        for position, item in enumerate(items):
+            item_offsets.append(offset)
+            if item[0] == 'label':
+                self.check_new_label(item[1], labels)
+                labels[item[1]] = offset
+            elif item[0] == 'code':
+                offset += len(item[1].data)
+            elif item[1] == 'call':
+                offset += 5
+            else:
+                offset += self.jump_size(item[1], position not in long_jumps)
+        return {'labels': labels, 'items': item_offsets}
+
+    def check_new_label(self, name, labels):
+        # nasm refuses a second definition; taking the last one would silently misdirect jumps
+        if name in labels:
+            raise EncodingError(f"Label '{name}' redefined")
+
+    def jump_size(self, op, short):
+        if short:
+            return 2
+        return 5 if op == 'jmp' else 6
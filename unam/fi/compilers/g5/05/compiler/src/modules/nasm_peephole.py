@@ -0,0 +1,273 @@
+# modules/nasm_peephole.py
+from modules.tac_isel import NEGATED_CODES, REGISTER_64
+
+REGISTERS_32 = set(REGISTER_64)
+REGISTERS_64 = set(REGISTER_64.values())
+UNCONDITIONAL_JUMPS = ('jmp', 'ret')
+
+
+class AsmLine:
+    """One line of the text section: a label, an instruction or a comment/blank line"""
+
+    def __init__(self, text):
+        self.text = text
+        code = text.split(';', 1)[0].strip()
+        self.label = None
+        self.op = None
+        self.operands = []
+        if not code:
+            return
+        if not text[0].isspace() and code.endswith(':'):
+            self.label = code[:-1]
+            return
+        parts = code.split(None, 1)
+        self.op = parts[0]
+        if len(parts) > 1:
+            self.operands = [operand.strip() for operand in parts[1].split(',')]
+
+    @classmethod
+    def instruction(cls, op, *operands):
+        if operands:
+            return cls(f"    {op} {', '.join(operands)}")
+        return cls(f"    {op}")
+
+    @property
+    def is_comment(self):
+        return self.label is None and self.op is None
+
+    def is_op(self, op, operand_count=None):
+        if self.op != op:
+            return False
+        return operand_count is None or len(self.operands) == operand_count
+
+    def condition(self):
+        """Condition code of a conditional jump, else None"""
+        if self.op and self.op.startswith('j') and self.op[1:] in NEGATED_CODES:
+            return self.op[1:]
+        return None
+
+
+def is_register(operand):
+    return operand in REGISTERS_32 or operand in REGISTERS_64
+
+
+def is_memory(operand):
+    return '[' in operand
+
+
+def is_immediate(operand):
+    return operand.lstrip('-').isdigit()
+
+
+def register_width(operand):
+    return 32 if operand in REGISTERS_32 else 64
+
+
+def memory_key(operand):
+    """A memory operand without its size keyword, for comparing addresses"""
+    for size in ('dword ', 'qword '):
+        operand = operand.replace(size, '')
+    return operand.replace(' ', '')
+
+
+def mentions(operand, register):
+    """Whether operand reads register, in its 32 or 64-bit form"""
+    names = {register, REGISTER_64.get(register, register)}
+    names |= {name for name, wide in REGISTER_64.items() if wide == register}
+    tokens = operand.replace('[', ' ').replace(']', ' ').replace('+', ' ').replace('-', ' ').replace('*', ' ').split()
+    return any(token in names for token in tokens)
+
+
+def stack_adjustment(line):
+    """Signed change of rsp made by 'add/sub rsp, n', else None"""
+    if line.op in ('add', 'sub') and len(line.operands) == 2 and line.operands[0] == 'rsp' \
+            and is_immediate(line.operands[1]):
+        amount = int(line.operands[1])
+        return amount if line.op == 'add' else -amount
+    return None
+
+
+# --- RULES ---
+#
+# Every rule gets a window of consecutive lines (comments skipped, labels
+# included) and returns the lines that replace it, or None when it does not
+# apply. Rules that do not expect a label in their window reject it through
+# the op checks, so nothing is moved across a jump target.
+
+def self_move(window):
+    # mov r, r
+    (line,) = window
+    if line.is_op('mov', 2) and is_register(line.operands[0]) and line.operands[0] == line.operands[1]:
+        return []
+    return None
+
+
+def null_adjustment(window):
+    # add/sub x, 0
+    (line,) = window
+    if line.op in ('add', 'sub') and len(line.operands) == 2 and line.operands[1] == '0':
+        return []
+    return None
+
+
+def stack_adjustments(window):
+    # sub rsp, a / add rsp, b: one adjustment, or none when they cancel out
+    first, second = window
+    a, b = stack_adjustment(first), stack_adjustment(second)
+    if a is None or b is None:
+        return None
+    total = a + b
+    if total == 0:
+        return []
+    return [AsmLine.instruction('add' if total > 0 else 'sub', 'rsp', str(abs(total)))]
+
+
+def compare_zero(window):
+    # cmp r, 0 sets the same flags as test r, r
+    (line,) = window
+    if line.is_op('cmp', 2) and is_register(line.operands[0]) and line.operands[1] == '0':
+        return [AsmLine.instruction('test', line.operands[0], line.operands[0])]
+    return None
+
+
+def store_load(window):
+    # mov [x], r / mov r, [x]  and  mov r, [x] / mov [x], r
+    first, second = window
+    if not (first.is_op('mov', 2) and second.is_op('mov', 2)):
+        return None
+    (a, b), (c, d) = first.operands, second.operands
+    if is_memory(a) and is_register(b) and c == b and is_memory(d) and memory_key(a) == memory_key(d):
+        return [first]
+    if is_register(a) and is_memory(b) and is_memory(c) and d == a and memory_key(b) == memory_key(c) \
+            and not mentions(b, a):
+        return [first]
+    return None
+
+
+def load_forwarding(window):
+    # mov [x], r / mov r2, [x]: the second read comes from r instead of memory
+    first, second = window
+    if not (first.is_op('mov', 2) and second.is_op('mov', 2)):
+        return None
+    (a, b), (c, d) = first.operands, second.operands
+    if not (is_memory(a) and is_register(c) and is_memory(d) and memory_key(a) == memory_key(d)):
+        return None
+    if is_register(b) and register_width(b) == register_width(c) and b != c:
+        return [first, AsmLine.instruction('mov', c, b)]
+    if is_immediate(b):
+        return [first, AsmLine.instruction('mov', c, b)]
+    return None
+
+
+def repeated_load(window):
+    # mov r, x / mov r, x
+    first, second = window
+    if first.is_op('mov', 2) and second.is_op('mov', 2) and is_register(first.operands[0]) \
+            and first.operands == second.operands and not mentions(first.operands[1], first.operands[0]):
+        return [first]
+    return None
+
+
+def jump_to_next(window):
+    # jmp L / L:  (jcc L / L: as well)
+    jump, label = window
+    if (jump.is_op('jmp', 1) or jump.condition()) and label.label == jump.operands[0]:
+        return [label]
+    return None
+
+
+def branch_over_jump(window):
+    # jcc L1 / jmp L2 / L1:  ->  jncc L2 / L1:
+    branch, jump, label = window
+    code = branch.condition()
+    if code and jump.is_op('jmp', 1) and label.label is not None and label.label == branch.operands[0]:
+        return [AsmLine.instruction(f"j{NEGATED_CODES[code]}", jump.operands[0]), label]
+    return None
+
+
+def unreachable_after_jump(window):
+    # nothing after jmp/ret runs until the next label
+    jump, line = window
+    if jump.op in UNCONDITIONAL_JUMPS and line.op is not None:
+        return [jump]
+    return None
+
+
+# (name, window size, rule)
+PEEPHOLE_RULES = [
+    ('self_moves_removed', 1, self_move),
+    ('null_adjustments_removed', 1, null_adjustment),
+    ('stack_adjustments_merged', 2, stack_adjustments),
+    ('compares_with_zero', 1, compare_zero),
+    ('store_loads_removed', 2, store_load),
+    ('loads_forwarded', 2, load_forwarding),
+    ('repeated_loads_removed', 2, repeated_load),
+    ('jumps_to_next_removed', 2, jump_to_next),
+    ('branches_over_jumps', 3, branch_over_jump),
+    ('unreachable_removed', 2, unreachable_after_jump),
+]
+
+
+class PeepholeOptimizer:
+    """Windowed peephole rewriting of the final instruction list.
+
+    Slides over the text section trying PEEPHOLE_RULES at every instruction
+    and repeats until no rule applies; comments stay where they were. The
+    number of rewrites of every rule is kept in stats.
+    """
+
+    def __init__(self, rules=None, printer=None):
+        self.rules = PEEPHOLE_RULES if rules is None else rules
+        self.printer = printer or (lambda msg: None)
+        self.stats = {}  # rule name -> rewrites
+
+    def optimize(self, lines):
+        code = [AsmLine(line) for line in lines]
+        self.stats = {name: 0 for name, _, _ in self.rules}
+
+        changed = True
+        while changed:
+            changed = False
+            index = 0
+            while index < len(code):
+                if code[index].is_comment or not self.rewrite(code, index):
+                    index += 1
+                else:
+                    changed = True
+
+        for name, count in self.stats.items():
+            if count:
+                self.printer(f"[PEEPHOLE] {name} -> {count}")
+        return [line.text for line in code]
+
+    def rewrite(self, code, index):
+        """Apply the first rule whose window starting at index matches"""
+        for name, size, rule in self.rules:
+            positions = self.window(code, index, size)
+            if len(positions) < size:
+                continue
+            replacement = rule([code[position] for position in positions])
+            if replacement is None:
+                continue
+            # replacements take the places of the first lines of the window
+            for position, line in zip(positions, replacement):
+                code[position] = line
+            for position in reversed(positions[len(replacement):]):
+                del code[position]
+            self.stats[name] += 1
+            return True
+        return False
+
+    def window(self, code, index, size):
+        positions = []
+        while index < len(code) and len(positions) < size:
+            if not code[index].is_comment:
+                positions.append(index)
+            index += 1
+        return positions
+
+    def get_report(self):
+        """Summary line for the compilation log"""
+        total = sum(self.stats.values())
+        details = ", ".join(f"{name}={count}" for name, count in self.stats.items())
+        return [f"rewrites={total}: {details}"]
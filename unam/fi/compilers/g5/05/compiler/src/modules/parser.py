@@ -7,7 +7,7 @@ import json
 from nltk import Tree as Tree
 
 class Parser:
-    def __init__(self):
+    def __init__(self, printer=print):
         self.pg = ParserGenerator(
             # TOKEN NAMES
             [
@@ -55,6 +55,7 @@ class Parser:
             
         )
 
+        self.printer = printer  # where syntax errors are reported
         self.parse()
         self.parser = self.pg.build()
 
@@ -703,7 +704,7 @@ class Parser:
         
         @self.pg.error
         def error_handle(token):
-            print("\033[91mERROR SINTACTICO: No se esperaba encontrar el Token '{}' en la línea '{}' columna '{}'".format(token.value,str(token.getsourcepos().lineno),str(token.getsourcepos().colno)))
+            self.printer("\033[91mERROR SINTACTICO: No se esperaba encontrar el Token '{}' en la línea '{}' columna '{}'".format(token.value,str(token.getsourcepos().lineno),str(token.getsourcepos().colno)))
             raise ValueError(token)
         
         # '''
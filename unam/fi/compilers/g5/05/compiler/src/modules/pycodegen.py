@@ -0,0 +1,440 @@
+# modules/pycodegen.py
+import ast
+import hashlib
+import importlib.util
+import keyword
+import marshal
+import sys
+import threading
+from pathlib import Path
+
+# Lowers the parse tree checked by SemanticAnalyzer into a Python ast.Module
+# that is compile()d once and run in process, for a quick edit-run loop
+# without gcc. Go ints follow the 32-bit wraparound of the other backends,
+# comparisons yield 0/1 outside of conditions and fmt.Println goes to write().
+
+# bump when the generated code changes, so cached code objects are not reused
+GENERATOR_VERSION = 1
+# every Go call is a Python call: main runs in a thread of its own with room
+# for this many nested calls instead of the interpreter's default 1000
+RECURSION_LIMIT = 200_000
+THREAD_STACK_SIZE = 512 * 1024 * 1024
+
+ARITHMETIC_OPS = {'+': ast.Add, '-': ast.Sub, '*': ast.Mult}
+DIVISION_HELPERS = {'/': '_go_div', '%': '_go_mod'}
+COMPARISON_OPS = {'<': ast.Lt, '<=': ast.LtE, '>': ast.Gt, '>=': ast.GtE, '==': ast.Eq, '!=': ast.NotEq}
+COMPOUND_ASSIGN_OPS = {'+=': '+', '-=': '-', '*=': '*', '/=': '/', '%=': '%'}
+ZERO_VALUES = {'string': '', 'float32': 0.0, 'float64': 0.0}
+
+
+class PythonCodegenError(RuntimeError):
+    pass
+
+
+def is_tree(node):
+    # nltk is imported on first use only: running a cached code object never needs it
+    from nltk.tree import Tree
+    return isinstance(node, Tree)
+
+
+def _go_div(left, right):
+    if right == 0:
+        raise ZeroDivisionError("integer divide by zero")
+    quotient = abs(left) // abs(right)
+    if (left < 0) != (right < 0):
+        quotient = -quotient
+    return ((quotient + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+
+
+def _go_mod(left, right):
+    if right == 0:
+        raise ZeroDivisionError("integer divide by zero")
+    remainder = abs(left) % abs(right)
+    return -remainder if left < 0 else remainder
+
+
+class PythonCodeGenerator:
+    """Parse tree (after semantic analysis) to a Python ast.Module"""
+
+    def __init__(self):
+        self.functions = set()
+        self.globals = set()
+        self.loop_posts = []  # post statements of the enclosing for loops, for continue
+
+    def visit(self, node):
+        if not is_tree(node):
+            return node
+        visitor = getattr(self, f'visit_{node.label()}', None)
+        if visitor is None:
+            raise PythonCodegenError(f"Unsupported construct: {node.label()}")
+        return visitor(node)
+
+    def generate(self, parse_tree):
+        decls = [decl[0] if decl.label() == 'TopLevelDecl' else decl
+                 for child in parse_tree if is_tree(child) and child.label() == 'TopLevelDecls'
+                 for decl in child]
+        self.functions = {decl[0][0] for decl in decls if decl.label() == 'FunctionDecl'}
+        if 'main' not in self.functions:
+            raise PythonCodegenError("The program has no main function")
+
+        body = []
+        for decl in decls:
+            if decl.label() == 'VarDecl':
+                for var_spec in decl[0]:
+                    body.extend(self.visit(var_spec))
+                    self.globals.update(self.name(ident[0]) for ident in var_spec[0])
+        for decl in decls:
+            if decl.label() == 'FunctionDecl':
+                body.append(self.visit(decl))
+            elif decl.label() != 'VarDecl':
+                raise PythonCodegenError(f"Unsupported top level declaration: {decl.label()}")
+        return ast.fix_missing_locations(ast.Module(body=body, type_ignores=[]))
+
+    def name(self, identifier):
+        # Go names that are Python keywords or clash with the runtime helpers get a suffix
+        if keyword.iskeyword(identifier) or identifier.startswith('_go_'):
+            return identifier + '_'
+        return identifier
+
+    # --- FUNCTIONS AND BLOCKS ---
+
+    def visit_FunctionDecl(self, node):
+        func_name = node[0][0]
+        params = [self.name(param[0][0]) for param in node[1][0]]
+        body = self.visit(node[2])
+        if not body or not isinstance(body[-1], ast.Return):
+            body.append(ast.Return(value=ast.Constant(0)))
+
+        # package level variables this function assigns without declaring its own
+        declared, assigned = set(params), set()
+        for sub in node[2].subtrees():
+            if sub.label() in ('ShortVarDecl', 'VarSpec') and len(sub) > 1:
+                declared.update(self.name(ident[0]) for ident in sub[0])
+            elif sub.label() == 'AssignStmt':
+                assigned.update(self.name(expr[0]) for expr in sub[0] if expr.label() == 'Identifier')
+            elif sub.label() == 'IncDecStmt' and sub[0].label() == 'Identifier':
+                assigned.add(self.name(sub[0][0]))
+        shared = sorted(self.globals & (assigned - declared))
+        if shared:
+            body.insert(0, ast.Global(names=shared))
+
+        args = ast.arguments(posonlyargs=[], args=[ast.arg(arg=param) for param in params], kwonlyargs=[],
+                             kw_defaults=[], defaults=[])
+        return ast.FunctionDef(name=self.name(func_name), args=args, body=body, decorator_list=[], returns=None)
+
+    def visit_Block(self, node):
+        return self.visit(node[0]) if len(node) else []
+
+    def visit_StatementList(self, node):
+        statements = []
+        for child in node:
+            statements.extend(self.visit(child))
+        return statements
+
+    def block(self, node):
+        return self.visit(node) or [ast.Pass()]
+
+    # --- STATEMENTS ---
+
+    def visit_ExprStmt(self, node):
+        return [ast.Expr(value=self.expression(node[0]))]
+
+    def visit_ReturnStmt(self, node):
+        return [ast.Return(value=self.value(node[0]))]
+
+    def visit_IfStmt(self, node):
+        return [ast.If(test=self.condition(node[0]), body=self.block(node[1]), orelse=[])]
+
+    def visit_IfElseStmt(self, node):
+        orelse = self.block(node[2]) if node[2].label() == 'Block' else self.visit(node[2])
+        return [ast.If(test=self.condition(node[0]), body=self.block(node[1]), orelse=orelse)]
+
+    def visit_ForStmt(self, node):
+        header, block = node[0], node[1]
+        if header.label() == 'Infinite':
+            return self.loop(ast.Constant(True), block, [])
+        if header.label() != 'ForClause':
+            return self.loop(self.condition(header), block, [])
+
+        init, cond, post = header
+        statements = self.simple_statement(init)
+        test = ast.Constant(True) if cond.label() == 'EmptyStmt' else self.condition(cond)
+        return statements + self.loop(test, block, self.simple_statement(post))
+
+    def loop(self, test, block, post):
+        self.loop_posts.append(post)
+        body = self.visit(block) + post
+        self.loop_posts.pop()
+        return [ast.While(test=test, body=body or [ast.Pass()], orelse=[])]
+
+    def simple_statement(self, node):
+        if node.label() == 'EmptyStmt':
+            return []
+        if node.label() in ('ShortVarDecl', 'IncDecStmt'):
+            return self.visit(node)
+        return [ast.Expr(value=self.expression(node))]
+
+    def visit_BreakStmt(self, node):
+        return [ast.Break()]
+
+    def visit_ContinueStmt(self, node):
+        if not self.loop_posts:
+            raise PythonCodegenError("continue outside of a for loop")
+        # the post statement still runs before the next iteration
+        return self.loop_posts[-1] + [ast.Continue()]
+
+    def visit_IncDecStmt(self, node):
+        operator = '+' if node[1][0] == '++' else '-'
+        return [self.assign(node[0], self.arithmetic(operator, self.expression(node[0]), ast.Constant(1)))]
+
+    def visit_DeclStmt(self, node):
+        if node[0].label() != 'VarDecl':
+            raise PythonCodegenError(f"Unsupported declaration: {node[0].label()}")
+        statements = []
+        for var_spec in node[0][0]:
+            statements.extend(self.visit(var_spec))
+        return statements
+
+    def visit_VarSpec(self, node):
+        names = [ident for ident in node[0]]
+        values = [self.value(expr) for expr in node[2]] if len(node) > 2 else []
+        if not values:
+            go_type = node[1][0] if is_tree(node[1]) and len(node[1]) else 'int'
+            values = [ast.Constant(ZERO_VALUES.get(go_type, 0))] * len(names)
+        return [self.assign_many(names, values)]
+
+    def visit_ShortVarDecl(self, node):
+        if len(node) == 1:
+            return self.visit(node[0])
+        return [self.assign_many(list(node[0]), [self.value(expr) for expr in node[1]])]
+
+    def visit_AssignStmt(self, node):
+        targets, operator, values = list(node[0]), node[1][0], list(node[2])
+        if operator in ('=', ':='):
+            return [self.assign_many(targets, [self.value(expr) for expr in values])]
+        if operator not in COMPOUND_ASSIGN_OPS or len(targets) != 1 or len(values) != 1:
+            raise PythonCodegenError(f"Unsupported assignment operator '{operator}'")
+        value = self.binary(COMPOUND_ASSIGN_OPS[operator], self.expression(targets[0]), self.expression(values[0]))
+        return [self.assign(targets[0], value)]
+
+    def assign(self, target, value):
+        return ast.Assign(targets=[self.store(target)], value=value)
+
+    def assign_many(self, targets, values):
+        if len(targets) != len(values):
+            raise PythonCodegenError(f"Assignment of {len(values)} values to {len(targets)} variables")
+        if len(targets) == 1:
+            return self.assign(targets[0], values[0])
+        # every value is evaluated before any variable changes, as in Go
+        return ast.Assign(targets=[ast.Tuple(elts=[self.store(target) for target in targets], ctx=ast.Store())],
+                          value=ast.Tuple(elts=values, ctx=ast.Load()))
+
+    def store(self, target):
+        if not is_tree(target) or target.label() != 'Identifier':
+            raise PythonCodegenError("The left side of an assignment must be a variable")
+        return ast.Name(id=self.name(target[0]), ctx=ast.Store())
+
+    # --- EXPRESSIONS ---
+
+    def expression(self, node):
+        return self.visit(node)
+
+    def value(self, node):
+        """expression as an int: comparisons and logical operators give 0 or 1"""
+        if self.is_boolean(node):
+            return ast.IfExp(test=self.condition(node), body=ast.Constant(1), orelse=ast.Constant(0))
+        return self.expression(node)
+
+    def condition(self, node):
+        """expression only tested for truth, so comparisons stay Python bools"""
+        if node.label() == 'BinaryExpr' and node[1][0] in ('&&', '||'):
+            op = ast.And() if node[1][0] == '&&' else ast.Or()
+            return ast.BoolOp(op=op, values=[self.condition(node[0]), self.condition(node[2])])
+        if node.label() == 'UnaryExpr' and node[0][0] == '!':
+            return ast.UnaryOp(op=ast.Not(), operand=self.condition(node[1]))
+        if node.label() == 'BinaryExpr' and node[1][0] in COMPARISON_OPS:
+            return ast.Compare(left=self.value(node[0]), ops=[COMPARISON_OPS[node[1][0]]()],
+                               comparators=[self.value(node[2])])
+        if node.label() == 'BoolLiteral':
+            return ast.Constant(node[0] == 'true')
+        return self.expression(node)
+
+    def is_boolean(self, node):
+        if node.label() == 'BinaryExpr':
+            return node[1][0] in COMPARISON_OPS or node[1][0] in ('&&', '||')
+        return node.label() == 'UnaryExpr' and node[0][0] == '!'
+
+    def visit_BinaryExpr(self, node):
+        if self.is_boolean(node):
+            return self.value(node)
+        return self.binary(node[1][0], self.value(node[0]), self.value(node[2]))
+
+    def binary(self, operator, left, right):
+        if operator in ARITHMETIC_OPS:
+            return self.arithmetic(operator, left, right)
+        if operator in DIVISION_HELPERS:
+            return ast.Call(func=ast.Name(id=DIVISION_HELPERS[operator], ctx=ast.Load()), args=[left, right],
+                            keywords=[])
+        raise PythonCodegenError(f"Unsupported operator '{operator}'")
+
+    def arithmetic(self, operator, left, right):
+        return self.wrap(ast.BinOp(left=left, op=ARITHMETIC_OPS[operator](), right=right))
+
+    def wrap(self, expr):
+        # ((x + 2**31) & (2**32 - 1)) - 2**31: x wrapped to a 32-bit int
+        shifted = ast.BinOp(left=expr, op=ast.Add(), right=ast.Constant(0x80000000))
+        masked = ast.BinOp(left=shifted, op=ast.BitAnd(), right=ast.Constant(0xFFFFFFFF))
+        return ast.BinOp(left=masked, op=ast.Sub(), right=ast.Constant(0x80000000))
+
+    def visit_UnaryExpr(self, node):
+        operator = node[0][0]
+        if operator == '!':
+            return self.value(node)
+        if operator == '+':
+            return self.value(node[1])
+        return self.wrap(ast.UnaryOp(op=ast.USub(), operand=self.value(node[1])))
+
+    def visit_CallExpr(self, node):
+        func, args = node[0], [self.value(arg) for arg in node[1]]
+        if func.label() == 'QualifiedIdent':
+            func_name = f"{func[0][0]}.{func[1][0]}"
+            if func_name != 'fmt.Println':
+                raise PythonCodegenError(f"Call to unknown function '{func_name}'")
+            return ast.Call(func=ast.Name(id='_go_println', ctx=ast.Load()), args=args, keywords=[])
+        if func.label() != 'Identifier' or func[0] not in self.functions:
+            raise PythonCodegenError(f"Call to unknown function '{func[0] if len(func) else func}'")
+        return ast.Call(func=ast.Name(id=self.name(func[0]), ctx=ast.Load()), args=args, keywords=[])
+
+    def visit_Identifier(self, node):
+        return ast.Name(id=self.name(node[0]), ctx=ast.Load())
+
+    def visit_IntLiteral(self, node):
+        return ast.Constant(int(node[0]))
+
+    def visit_FloatLiteral(self, node):
+        return ast.Constant(float(node[0]))
+
+    def visit_BoolLiteral(self, node):
+        return ast.Constant(1 if node[0] == 'true' else 0)
+
+    def visit_StringLiteral(self, node):
+        raw = node[0]
+        try:
+            return ast.Constant(ast.literal_eval(raw))
+        except (ValueError, SyntaxError):
+            return ast.Constant(raw.strip('"'))
+
+
+def source_key(source_code):
+    """Cache key: the source text, the generator version and the bytecode format of this Python"""
+    digest = hashlib.sha256()
+    digest.update(importlib.util.MAGIC_NUMBER)
+    digest.update(str(GENERATOR_VERSION).encode())
+    digest.update(source_code.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class PythonBackend:
+    """Compiles Go sources to Python code objects and runs them in process.
+
+    Code objects are kept by source hash, in memory and, with cache_dir, as
+    marshal files, so running an unchanged source again skips the front end
+    and code generation. The lexer and parser are built on the first miss.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache = {}
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.lexer = None
+        self.parser = None
+        self.hits = 0
+        self.misses = 0
+
+    def cached(self, key):
+        if key in self.cache:
+            return self.cache[key]
+        if self.cache_dir:
+            path = self.cache_dir / f"{key}.bin"
+            if path.exists():
+                try:
+                    self.cache[key] = marshal.loads(path.read_bytes())
+                    return self.cache[key]
+                except (EOFError, ValueError, TypeError):
+                    path.unlink()
+        return None
+
+    def store(self, key, code):
+        self.cache[key] = code
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            (self.cache_dir / f"{key}.bin").write_bytes(marshal.dumps(code))
+
+    def compile_tree(self, parse_tree, source_code, filename='<go>'):
+        """Code object for a parse tree that already passed semantic analysis"""
+        key = source_key(source_code)
+        code = self.cached(key)
+        if code is not None:
+            self.hits += 1
+            return code
+        self.misses += 1
+        code = compile(PythonCodeGenerator().generate(parse_tree), filename, 'exec')
+        self.store(key, code)
+        return code
+
+    def compile_source(self, source_code, filename='<go>'):
+        key = source_key(source_code)
+        code = self.cached(key)
+        if code is not None:
+            self.hits += 1
+            return code
+        from modules.lexer import Lexer
+        from modules.parser import Parser
+        from modules.semantic import SemanticAnalyzer
+        if self.parser is None:
+            self.lexer = Lexer().get_lexer()
+            self.parser = Parser().get_parser()
+        parse_tree = self.parser.parse(self.lexer.lex(source_code))
+        SemanticAnalyzer().visit(parse_tree)
+        return self.compile_tree(parse_tree, source_code, filename)
+
+    def run_source(self, source_code, write=None):
+        """Compile (or reuse) and run one Go source; returns (output lines, exit code)"""
+        return run_code(self.compile_source(source_code), write)
+
+
+def run_code(code, write=None):
+    """Run a compiled program's main; returns (output lines, exit code)"""
+    output = []
+    write = write or output.append
+
+    def println(*args):
+        write(' '.join(str(arg) for arg in args))
+
+    namespace = {'__name__': '__go__', '_go_div': _go_div, '_go_mod': _go_mod, '_go_println': println}
+    exec(code, namespace)
+    result = {}
+
+    def run_main():
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(RECURSION_LIMIT)
+        try:
+            result['exit_code'] = namespace['main']()
+        except BaseException as e:
+            result['error'] = e
+        finally:
+            sys.setrecursionlimit(limit)
+
+    stack_size = threading.stack_size(THREAD_STACK_SIZE)
+    try:
+        thread = threading.Thread(target=run_main, name='go-main')
+        thread.start()
+    finally:
+        threading.stack_size(stack_size)
+    thread.join()
+
+    error = result.get('error')
+    if isinstance(error, RecursionError):
+        raise RecursionError(f"Go calls nested deeper than the py backend's limit of {RECURSION_LIMIT}") from error
+    if error is not None:
+        raise error
+    return output, result['exit_code'] or 0
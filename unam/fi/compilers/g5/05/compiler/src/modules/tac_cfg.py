@@ -0,0 +1,524 @@
+# modules/tac_cfg.py
+import re
+
+# TAC mnemonics and the source-level spellings that may also appear in TAC lines
+BINARY_OPS = {
+    'ADD': '+', 'SUB': '-', 'MUL': '*', 'DIV': '/', 'MOD': '%',
+    'LE': '<=', 'LT': '<', 'GE': '>=', 'GT': '>', 'EQ': '==', 'NE': '!=',
+}
+SYMBOL_TO_OP = {symbol: op for op, symbol in BINARY_OPS.items()}
+COMMUTATIVE_OPS = {'ADD', 'MUL', 'EQ', 'NE'}
+
+NAME_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_.]*$')
+TEMP_RE = re.compile(r'^t\d+$')
+
+
+def is_int_literal(operand):
+    return bool(operand) and (operand.isdigit() or (operand[0] == '-' and operand[1:].isdigit()))
+
+
+def is_temp(operand):
+    return bool(TEMP_RE.match(operand or ""))
+
+
+def is_name(operand):
+    return bool(operand) and bool(NAME_RE.match(operand)) and not is_int_literal(operand)
+
+
+def evaluate_binop(op, left, right):
+    """Fold a TAC operation on two integers with the 32-bit semantics of the
+    backends (wraparound, division truncating toward zero, 0/1 comparisons).
+    Returns None when the operation would trap."""
+    if op in ('DIV', 'MOD'):
+        if right == 0:
+            return None
+        quotient = abs(left) // abs(right)
+        if (left < 0) != (right < 0):
+            quotient = -quotient
+        result = quotient if op == 'DIV' else left - quotient * right
+    elif op == 'ADD':
+        result = left + right
+    elif op == 'SUB':
+        result = left - right
+    elif op == 'MUL':
+        result = left * right
+    else:
+        result = int({
+            'LE': left <= right, 'LT': left < right, 'GE': left >= right,
+            'GT': left > right, 'EQ': left == right, 'NE': left != right,
+        }[op])
+    result &= 0xFFFFFFFF
+    return result - (1 << 32) if result & 0x80000000 else result
+
+
+class Quad:
+    """Structured form of a single TAC line.
+
+    kind is one of: func, end_func, label, goto, if_true, if_false, return,
+    call, copy, binop, data, param, opaque, and phi while a function is in SSA form
+    (each phi arg comes from the predecessor block at the same index of
+    self.sources).
+    """
+
+    def __init__(self, kind, dest=None, op=None, args=None, label=None, text=None):
+        self.kind = kind
+        self.dest = dest
+        self.op = op
+        self.args = list(args or [])
+        self.label = label
+        self.text = text
+        self.sources = []
+
+    def uses(self):
+        """Names read by this instruction (literals excluded)"""
+        if self.kind in ('if_true', 'if_false', 'return', 'call', 'copy', 'binop', 'phi', 'opaque'):
+            return [a for a in self.args if is_name(a) and not a.endswith("_EXPR")]
+        return []
+
+    def defines(self):
+        if self.kind in ('call', 'copy', 'binop', 'opaque', 'phi', 'param') and self.dest:
+            return self.dest
+        return None
+
+    def is_jump(self):
+        return self.kind in ('goto', 'if_true', 'if_false')
+
+    def ends_block(self):
+        return self.kind in ('goto', 'if_true', 'if_false', 'return')
+
+    def has_side_effects(self):
+        if self.kind == 'binop' and self.op in ('DIV', 'MOD'):
+            # division by zero traps, so only a known non-zero divisor is pure
+            return not (is_int_literal(self.args[1]) and int(self.args[1]) != 0)
+        # a parameter's position is its meaning, even when nothing reads it
+        return self.kind in ('call', 'return', 'goto', 'if_true', 'if_false', 'label', 'func', 'end_func', 'data', 'param')
+
+    def replace_uses(self, mapping):
+        if self.kind in ('if_true', 'if_false', 'return', 'call', 'copy', 'binop', 'phi', 'opaque'):
+            self.args = [mapping.get(a, a) for a in self.args]
+
+    def copy(self):
+        quad = Quad(self.kind, self.dest, self.op, self.args, self.label, self.text)
+        quad.sources = list(self.sources)
+        return quad
+
+    def to_tac(self):
+        if self.kind == 'func':
+            return f"FUNC {self.label}:"
+        if self.kind == 'end_func':
+            return f"END_FUNC {self.label}"
+        if self.kind == 'label':
+            return f"LABEL {self.label}:"
+        if self.kind == 'goto':
+            return f"GOTO {self.label}"
+        if self.kind == 'if_true':
+            return f"IF_TRUE {self.args[0]} GOTO {self.label}"
+        if self.kind == 'if_false':
+            return f"IF_FALSE {self.args[0]} GOTO {self.label}"
+        if self.kind == 'return':
+            return f"RETURN {self.args[0]}" if self.args else "RETURN"
+        if self.kind == 'call':
+            call = " ".join(["CALL", self.op] + self.args)
+            return f"{self.dest} = {call}" if self.dest else call
+        if self.kind == 'copy':
+            return f"{self.dest} = {self.args[0]}"
+        if self.kind == 'binop':
+            return f"{self.dest} = {self.args[0]} {self.op} {self.args[1]}"
+        if self.kind == 'data':
+            return f"DATA {self.dest} = {self.args[0]}"
+        if self.kind == 'param':
+            return f"PARAM {self.dest}"
+        if self.kind == 'phi':
+            return f"{self.dest} = PHI {' '.join(self.args)}"
+        if self.kind == 'opaque' and self.dest:
+            return f"{self.dest} = {' '.join(self.args)}"
+        return self.text
+
+    def __repr__(self):
+        return f"Quad({self.to_tac()!r})"
+
+
+def parse_tac_line(line):
+    """Parse one TAC line produced by TACGenerator into a Quad"""
+    line = ' '.join(line.split())
+
+    if line.startswith("FUNC ") and line.endswith(':'):
+        return Quad('func', label=line[5:-1])
+    if line.startswith("END_FUNC"):
+        return Quad('end_func', label=line[9:])
+    if line.startswith("LABEL ") and line.endswith(':'):
+        return Quad('label', label=line[6:-1])
+    if line.startswith("GOTO "):
+        return Quad('goto', label=line[5:])
+    if line.startswith("DATA "):
+        name, value = line[5:].split(" = ", 1)
+        return Quad('data', dest=name.strip(), args=[value.strip()])
+    if line.startswith("PARAM "):
+        return Quad('param', dest=line[6:])
+
+    parts = line.split()
+    if parts[0] in ('IF_TRUE', 'IF_FALSE') and len(parts) == 4 and parts[2] == "GOTO":
+        return Quad(parts[0].lower(), args=[parts[1]], label=parts[3])
+    if parts[0] == "RETURN":
+        return Quad('return', args=parts[1:2])
+    if parts[0] == "CALL" and len(parts) >= 2:
+        return Quad('call', op=parts[1], args=parts[2:])
+
+    if " = " in line:
+        dest, expr = line.split(" = ", 1)
+        dest = dest.strip()
+        rhs = expr.split()
+        if rhs and rhs[0] == "CALL" and len(rhs) >= 2:
+            return Quad('call', dest=dest, op=rhs[1], args=rhs[2:])
+        if len(rhs) == 1 and (is_int_literal(rhs[0]) or is_name(rhs[0])) and not rhs[0].endswith("_EXPR"):
+            return Quad('copy', dest=dest, args=rhs)
+        if len(rhs) == 3:
+            op = SYMBOL_TO_OP.get(rhs[1], rhs[1])
+            if op in BINARY_OPS:
+                return Quad('binop', dest=dest, op=op, args=[rhs[0], rhs[2]])
+        # unknown operators and X_EXPR placeholders; keep the operands visible
+        return Quad('opaque', dest=dest, args=rhs, text=line)
+
+    return Quad('opaque', text=line)
+
+
+class TACFunction:
+    """A FUNC ... END_FUNC region of the TAC listing"""
+
+    def __init__(self, name, quads=None):
+        self.name = name
+        self.quads = quads or []
+
+    def to_lines(self):
+        lines = [f"FUNC {self.name}:"]
+        lines.extend(q.to_tac() for q in self.quads)
+        lines.append(f"END_FUNC {self.name}")
+        return lines
+
+
+class TACProgram:
+    """Whole TAC listing split into DATA entries and functions"""
+
+    def __init__(self, tac_lines):
+        self.data = []
+        self.functions = []
+        current = None
+
+        for line in tac_lines:
+            if not line.strip():
+                continue
+            quad = parse_tac_line(line)
+            if quad.kind == 'data':
+                # string literals are global; keep them together ahead of the code
+                self.data.append(quad)
+            elif quad.kind == 'func':
+                current = TACFunction(quad.label)
+                self.functions.append(current)
+            elif quad.kind == 'end_func':
+                current = None
+            elif current is not None:
+                current.quads.append(quad)
+
+    def data_labels(self):
+        return {q.dest for q in self.data}
+
+    def to_lines(self):
+        lines = [q.to_tac() for q in self.data]
+        for func in self.functions:
+            lines.extend(func.to_lines())
+        return lines
+
+
+class BasicBlock:
+    def __init__(self, block_id, quads):
+        self.id = block_id
+        self.quads = quads
+        self.succs = []
+        self.preds = []
+
+    @property
+    def label(self):
+        if self.quads and self.quads[0].kind == 'label':
+            return self.quads[0].label
+        return None
+
+    @property
+    def terminator(self):
+        if self.quads and self.quads[-1].ends_block():
+            return self.quads[-1]
+        return None
+
+    def falls_through(self):
+        term = self.terminator
+        return term is None or term.kind in ('if_true', 'if_false')
+
+    def __repr__(self):
+        return f"BasicBlock(B{self.id}, {len(self.quads)} quads)"
+
+
+class ControlFlowGraph:
+    """Basic blocks of one TACFunction, kept in layout order.
+
+    Fall-through edges depend on the order of self.blocks, so passes that
+    reorder or insert blocks must call rebuild_edges() afterwards.
+    """
+
+    def __init__(self, function):
+        self.function = function
+        self.blocks = []
+        self.build(function.quads)
+
+    def build(self, quads):
+        self.blocks = []
+        current = []
+        for quad in quads:
+            if quad.kind == 'label' and current:
+                self.blocks.append(BasicBlock(len(self.blocks), current))
+                current = []
+            current.append(quad)
+            if quad.ends_block():
+                self.blocks.append(BasicBlock(len(self.blocks), current))
+                current = []
+        if current or not self.blocks:
+            self.blocks.append(BasicBlock(len(self.blocks), current))
+        self.rebuild_edges()
+
+    def rebuild_edges(self):
+        label_to_block = {}
+        for index, block in enumerate(self.blocks):
+            block.id = index
+            block.succs = []
+            block.preds = []
+            if block.label:
+                label_to_block[block.label] = block
+        self.label_to_block = label_to_block
+
+        for index, block in enumerate(self.blocks):
+            term = block.terminator
+            if term is not None and term.is_jump() and term.label in label_to_block:
+                block.succs.append(label_to_block[term.label])
+            if block.falls_through() and index + 1 < len(self.blocks):
+                nxt = self.blocks[index + 1]
+                if nxt not in block.succs:
+                    block.succs.append(nxt)
+            for succ in block.succs:
+                succ.preds.append(block)
+
+    @property
+    def entry(self):
+        return self.blocks[0]
+
+    def extended_basic_blocks(self):
+        """Roots of the extended basic blocks and the tree children of every block.
+
+        A block belongs to its predecessor's EBB when that predecessor is its
+        only one; every other block starts a new EBB.
+        """
+        children = {block.id: [] for block in self.blocks}
+        roots = []
+        for block in self.blocks:
+            if block is not self.entry and len(block.preds) == 1 and block.preds[0] is not block:
+                children[block.preds[0].id].append(block)
+            else:
+                roots.append(block)
+        return roots, children
+
+    def reachable_blocks(self):
+        seen = set()
+        stack = [self.entry]
+        while stack:
+            block = stack.pop()
+            if block.id in seen:
+                continue
+            seen.add(block.id)
+            stack.extend(block.succs)
+        return seen
+
+    def remove_unreachable_blocks(self):
+        """Drop blocks that cannot be reached from the entry; returns quads removed"""
+        reachable = self.reachable_blocks()
+        removed = sum(len(b.quads) for b in self.blocks if b.id not in reachable)
+        if removed or len(reachable) != len(self.blocks):
+            self.blocks = [b for b in self.blocks if b.id in reachable]
+            self.rebuild_edges()
+        return removed
+
+    def liveness(self):
+        """Backward live-variable analysis.
+
+        Returns (live_in, live_out), two dicts mapping block id to the set
+        of names live on entry to / exit from that block.
+        """
+        use = {}
+        defs = {}
+        for block in self.blocks:
+            block_use, block_def = set(), set()
+            for quad in block.quads:
+                for name in quad.uses():
+                    if name not in block_def:
+                        block_use.add(name)
+                if quad.defines():
+                    block_def.add(quad.defines())
+            use[block.id] = block_use
+            defs[block.id] = block_def
+
+        live_in = {block.id: set() for block in self.blocks}
+        live_out = {block.id: set() for block in self.blocks}
+        changed = True
+        while changed:
+            changed = False
+            for block in reversed(self.blocks):
+                out = set()
+                for succ in block.succs:
+                    out |= live_in[succ.id]
+                new_in = use[block.id] | (out - defs[block.id])
+                if out != live_out[block.id] or new_in != live_in[block.id]:
+                    live_out[block.id] = out
+                    live_in[block.id] = new_in
+                    changed = True
+        return live_in, live_out
+
+    def dominators(self):
+        """Map block id -> set of ids of the blocks that dominate it"""
+        reachable = self.reachable_blocks()
+        all_ids = {b.id for b in self.blocks if b.id in reachable}
+        dom = {b.id: set(all_ids) for b in self.blocks if b.id in reachable}
+        dom[self.entry.id] = {self.entry.id}
+
+        changed = True
+        while changed:
+            changed = False
+            for block in self.blocks:
+                if block is self.entry or block.id not in reachable:
+                    continue
+                preds = [p.id for p in block.preds if p.id in reachable]
+                new = set.intersection(*(dom[p] for p in preds)) if preds else set()
+                new = new | {block.id}
+                if new != dom[block.id]:
+                    dom[block.id] = new
+                    changed = True
+        return dom
+
+    def immediate_dominators(self, dom=None):
+        """Map block id -> id of its immediate dominator (None for the entry)"""
+        dom = dom or self.dominators()
+        idom = {}
+        for block_id, dominators in dom.items():
+            strict = dominators - {block_id}
+            # the closest strict dominator is the one dominated by all the others
+            idom[block_id] = max(strict, key=lambda d: len(dom[d])) if strict else None
+        return idom
+
+    def dominance_frontiers(self, idom=None):
+        """Map block id -> ids of the blocks where its dominance ends.
+
+        Computed by walking up the dominator tree from the predecessors of
+        every join point (Cooper, Harvey and Kennedy).
+        """
+        idom = idom or self.immediate_dominators()
+        frontiers = {block_id: set() for block_id in idom}
+        for block in self.blocks:
+            if block.id not in idom:
+                continue
+            preds = [p for p in block.preds if p.id in idom]
+            if len(preds) < 2:
+                continue
+            for pred in preds:
+                runner = pred.id
+                while runner is not None and runner != idom[block.id]:
+                    frontiers[runner].add(block.id)
+                    runner = idom[runner]
+        return frontiers
+
+    def natural_loops(self, dom=None):
+        """Natural loops as a list of (header block, set of body block ids).
+
+        Every back edge tail -> header (header dominates tail) contributes
+        the blocks that reach tail without passing through header; loops
+        sharing a header are merged. Innermost (smallest) loops come first.
+        """
+        dom = dom or self.dominators()
+        bodies = {}
+        for block in self.blocks:
+            for succ in block.succs:
+                if block.id in dom and succ.id in dom[block.id]:
+                    body = bodies.setdefault(succ.id, {succ.id})
+                    stack = [block]
+                    while stack:
+                        node = stack.pop()
+                        if node.id in body:
+                            continue
+                        body.add(node.id)
+                        stack.extend(node.preds)
+        loops = [(self.blocks[h], body) for h, body in bodies.items()]
+        loops.sort(key=lambda loop: len(loop[1]))
+        return loops
+
+    def interference_graph(self, live_out, fixed=()):
+        """Map name -> names simultaneously live with it somewhere.
+
+        A copy 'a = b' does not make a and b interfere. Names in fixed
+        (values live on entry, i.e. globals) all interfere with each other.
+        """
+        graph = {}
+
+        def add_edge(a, b):
+            graph.setdefault(a, set()).add(b)
+            graph.setdefault(b, set()).add(a)
+
+        for block in self.blocks:
+            live = set(live_out[block.id])
+            for quad in reversed(block.quads):
+                dest = quad.defines()
+                if dest:
+                    graph.setdefault(dest, set())
+                    for name in live:
+                        if name == dest or (quad.kind == 'copy' and name == quad.args[0]):
+                            continue
+                        add_edge(dest, name)
+                    live.discard(dest)
+                for name in quad.uses():
+                    graph.setdefault(name, set())
+                live.update(quad.uses())
+
+        for a in fixed:
+            for b in fixed:
+                if a != b:
+                    add_edge(a, b)
+        return graph
+
+    def new_temp_name(self):
+        """A temp (tN) name not used anywhere in this function"""
+        used = set()
+        for block in self.blocks:
+            for quad in block.quads:
+                used.update(name for name in quad.uses() if is_temp(name))
+                if quad.defines() and is_temp(quad.defines()):
+                    used.add(quad.defines())
+        index = max((int(name[1:]) for name in used), default=-1) + 1
+        return f"t{index}"
+
+    def new_label(self, base):
+        """A label name not used anywhere in the program.
+
+        TACGenerator numbers its L<n> labels across the whole program and the
+        NASM labels are global, so a name only free in this function is not
+        enough: new labels carry the function's name (main__L0, f__L3_ssa0).
+        """
+        used = {q.label for b in self.blocks for q in b.quads if q.label}
+        prefix = f"{self.function.name}__{base}"
+        index = 0
+        while f"{prefix}{index}" in used:
+            index += 1
+        return f"{prefix}{index}"
+
+    def linearize(self):
+        quads = []
+        for block in self.blocks:
+            quads.extend(block.quads)
+        return quads
+
+    def apply(self):
+        """Write the blocks back into the underlying function"""
+        self.function.quads = self.linearize()
+        return self.function
@@ -122,15 +122,18 @@ class TACGenerator:
         # Add function label
         self.code.append(f"FUNC {func_name}:")
         
-        # Process parameters if they exist
+        # Process parameters if they exist: one PARAM line per parameter, in order
         if len(func_decl) > 1:
             signature = func_decl[1]
             if isinstance(signature, Tree) and signature.label() == 'Signature':
-                if len(signature) > 1:
-                    params = signature[1]
+                if len(signature) > 0:
+                    params = signature[0]
                     if isinstance(params, Tree) and params.label() == 'Parameters':
-                        # Parameters are already in scope, no TAC needed
-                        self.printer(f"[TAC] Function {func_name} has parameters")
+                        for param_decl in params:
+                            if isinstance(param_decl, Tree) and param_decl.label() == 'ParameterDecl':
+                                param_name = param_decl[0][0]
+                                self.code.append(f"PARAM {param_name}")
+                                self.printer(f"[TAC] Parameter: {param_name}")
         
         # Process function body
         if len(func_decl) > 2:
@@ -200,21 +203,18 @@ class TACGenerator:
     
     def process_if_statement(self, if_stmt):
         """Process IfStmt node"""
-        if not isinstance(if_stmt, Tree) or len(if_stmt) < 3:
+        if not isinstance(if_stmt, Tree) or len(if_stmt) < 2:
             self.printer(f"[TAC] Invalid IfStmt: {if_stmt}")
             return
             
         self.printer(f"[TAC] Processing if statement")
         
-        # Process condition
-        condition = if_stmt[0]
-        cond_temp = self.process_expression(condition)
-        
         false_label = self.new_label()
         end_label = self.new_label()
         
         # Jump to false branch if condition is false
-        self.code.append(f"IF_FALSE {cond_temp} GOTO {false_label}")
+        condition = if_stmt[0]
+        self.process_condition(condition, false_label, jump_if=False)
         
         # Process true branch
         true_block = if_stmt[1]
@@ -241,11 +241,10 @@ class TACGenerator:
             
         self.printer(f"[TAC] Processing if-else statement")
         condition = if_else_stmt[0]
-        cond_temp = self.process_expression(condition)
         false_label = self.new_label()
         end_label = self.new_label()
         
-        self.code.append(f"IF_FALSE {cond_temp} GOTO {false_label}")
+        self.process_condition(condition, false_label, jump_if=False)
         
         true_block = if_else_stmt[1]
         if isinstance(true_block, Tree) and true_block.label() == 'Block':
@@ -293,7 +292,11 @@ class TACGenerator:
                 values = []
                 for expr in expr_list_node:
                     values.append(self.process_expression(expr))
-                
+
+                # Without initializers Go gives numeric and bool variables their zero value
+                if not values and 'string' not in var_spec[1].leaves():
+                    values = ['0'] * len(var_names)
+
                 for var_name, value in zip(var_names, values):
                     self.code.append(f"{var_name} = {value}")
     
@@ -340,8 +343,7 @@ class TACGenerator:
                 self.code.append(f"LABEL {condition_label}:")
                 if len(for_clause) > 1:
                     condition = for_clause[1]
-                    cond_temp = self.process_expression(condition)
-                    self.code.append(f"IF_TRUE {cond_temp} GOTO {start_label}")
+                    self.process_condition(condition, start_label, jump_if=True)
                 
                 self.code.append(f"LABEL {end_label}:")
     
@@ -483,11 +485,8 @@ class TACGenerator:
             if isinstance(args_expr, Tree) and args_expr.label() == 'ArgumentList':
                 for arg in args_expr:
                     if isinstance(arg, Tree) and arg.label() == 'CallExpr':
-                        # Handle nested function calls
-                        result_temp = self.new_temp()
-                        nested_func_name = self.process_call_expression(arg)
-                        self.code.append(f"{result_temp} = CALL {nested_func_name}")
-                        args.append(result_temp)
+                        # Handle nested function calls (the call already leaves its result in a temp)
+                        args.append(self.process_call_expression(arg))
                     else:
                         args.append(self.process_expression(arg))
         
@@ -502,6 +501,62 @@ class TACGenerator:
             self.code.append(f"CALL {func_name} {args_str}")
             return ""
     
+    def logical_operator(self, expr):
+        """'&&', '||' or '!' when expr is a boolean connective, otherwise None"""
+        if not isinstance(expr, Tree) or expr.label() not in ('BinaryExpr', 'UnaryExpr'):
+            return None
+        operator_node = expr[1] if expr.label() == 'BinaryExpr' else expr[0]
+        if isinstance(operator_node, Tree) and operator_node.label() == 'Operator' and len(operator_node) > 0:
+            if operator_node[0] in ('&&', '||') and expr.label() == 'BinaryExpr' and len(expr) == 3:
+                return operator_node[0]
+            if operator_node[0] == '!' and expr.label() == 'UnaryExpr' and len(expr) == 2:
+                return '!'
+        return None
+
+    def process_condition(self, expr, label, jump_if):
+        """Emit a jump to label taken when expr evaluates to jump_if.
+
+        && and || are lowered in jumping style: the right operand is only
+        evaluated when the left one does not already decide the result.
+        """
+        operator = self.logical_operator(expr)
+        
+        if operator == '!':
+            self.process_condition(expr[1], label, not jump_if)
+            return
+        
+        if operator in ('&&', '||'):
+            # the value of the left operand that decides the whole expression
+            decisive = operator == '||'
+            if jump_if == decisive:
+                self.process_condition(expr[0], label, jump_if)
+                self.process_condition(expr[2], label, jump_if)
+            else:
+                skip_label = self.new_label()
+                self.process_condition(expr[0], skip_label, decisive)
+                self.process_condition(expr[2], label, jump_if)
+                self.code.append(f"LABEL {skip_label}:")
+            return
+        
+        cond_temp = self.process_expression(expr)
+        if cond_temp.isdigit():
+            # constant condition: jump unconditionally or not at all
+            if (cond_temp != "0") == jump_if:
+                self.code.append(f"GOTO {label}")
+            return
+        jump = "IF_TRUE" if jump_if else "IF_FALSE"
+        self.code.append(f"{jump} {cond_temp} GOTO {label}")
+
+    def process_logical_expression(self, expr):
+        """0/1 value of a boolean connective, computed with short-circuit jumps"""
+        temp = self.new_temp()
+        false_label = self.new_label()
+        self.code.append(f"{temp} = 0")
+        self.process_condition(expr, false_label, jump_if=False)
+        self.code.append(f"{temp} = 1")
+        self.code.append(f"LABEL {false_label}:")
+        return temp
+
     def process_expression(self, expr):
         """Process expression node and return temporary holding result"""
         if not isinstance(expr, Tree):
@@ -532,6 +587,12 @@ class TACGenerator:
             self.code.append(f"DATA {label} = {value}")
             return label
         
+        elif expr_type == 'BoolLiteral':
+            return "1" if len(expr) > 0 and expr[0] == "true" else "0"
+        
+        elif self.logical_operator(expr):
+            return self.process_logical_expression(expr)
+        
         elif expr_type == 'BinaryExpr':
             if len(expr) < 3:
                 return "0"
@@ -0,0 +1,317 @@
+# modules/tac_isel.py
+import string
+
+COMPARISON_OPS = ('LE', 'LT', 'GE', 'GT', 'EQ', 'NE')
+
+# Condition-code suffix of jcc/setcc for every comparison, and the code that
+# holds when the original does not / when the operands of cmp are swapped
+CONDITION_CODES = {'LE': 'le', 'LT': 'l', 'GE': 'ge', 'GT': 'g', 'EQ': 'e', 'NE': 'ne'}
+NEGATED_CODES = {'le': 'g', 'l': 'ge', 'ge': 'l', 'g': 'le', 'e': 'ne', 'ne': 'e'}
+SWAPPED_CODES = {'le': 'ge', 'l': 'g', 'ge': 'le', 'g': 'l', 'e': 'e', 'ne': 'ne'}
+
+REGISTER_64 = {
+    'eax': 'rax', 'ebx': 'rbx', 'ecx': 'rcx', 'edx': 'rdx', 'esi': 'rsi', 'edi': 'rdi',
+    'r8d': 'r8', 'r9d': 'r9', 'r10d': 'r10', 'r11d': 'r11',
+    'r12d': 'r12', 'r13d': 'r13', 'r14d': 'r14', 'r15d': 'r15',
+}
+
+# Pattern ops that stand for a whole family of tree ops
+OP_CLASSES = {
+    'CMP': COMPARISON_OPS,
+    'MOVE': ('MOVE_REG', 'MOVE_MEM'),
+}
+
+# The tiling grammar: (nonterminal, pattern, cost, instructions, result).
+#
+# A pattern is either a nonterminal (a chain rule) or a tuple (op, *kids)
+# whose kids are patterns again. Leaves of the expression tree come with
+# their own nonterminals:
+#   imm     any constant        reg  value in an allocated register
+#   one     1                   mem  value in memory (a 'dword [...]' operand)
+#   minus_one  -1               dst  leaf in the location the root writes
+#   zero    0
+#   scale   2, 4, 8 (lea index scale)
+#   lea_factor  3, 5, 9 (x + x*scale)
+#   pow2    a positive power of two
+# The nonterminals built on top of them are src/rsrc/rm (instruction
+# operands), addr (a lea address), acc (a value computed into the target
+# register {t}), cond (flags set for the condition code it returns) and
+# stmt (a whole TAC line).
+#
+# Instructions and results are format strings: {0}, {1}... are the
+# operands the nonterminals of the pattern reduced to, in pre-order; {t}
+# is the target register, {d} the destination of a MOVE, {label} the target
+# of a BRANCH and {cc}/{swapped_cc} the condition code of the comparison at
+# the root of the pattern. Format specs: q (64-bit register name), log2,
+# minus1, disp/negdisp (signed displacement) and not (negated condition).
+# Costs count instructions, with imul weighing its latency; on a tie the
+# rule listed first wins.
+RULES = [
+    # operands
+    ('src', 'imm', 0, [], '{0}'),
+    ('src', 'reg', 0, [], '{0}'),
+    ('src', 'mem', 0, [], '{0}'),
+    ('rsrc', 'imm', 0, [], '{0}'),
+    ('rsrc', 'reg', 0, [], '{0}'),
+    ('rm', 'reg', 0, [], '{0}'),
+    ('rm', 'mem', 0, [], '{0}'),
+
+    # lea addresses, registers only
+    ('addr', ('ADD', 'reg', 'reg'), 0, [], '[{0:q}+{1:q}]'),
+    ('addr', ('ADD', 'reg', 'imm'), 0, [], '[{0:q}{1:disp}]'),
+    ('addr', ('ADD', 'imm', 'reg'), 0, [], '[{1:q}{0:disp}]'),
+    ('addr', ('SUB', 'reg', 'imm'), 0, [], '[{0:q}{1:negdisp}]'),
+    ('addr', ('MUL', 'reg', 'scale'), 0, [], '[{0:q}*{1}]'),
+    ('addr', ('MUL', 'scale', 'reg'), 0, [], '[{1:q}*{0}]'),
+    ('addr', ('MUL', 'reg', 'lea_factor'), 0, [], '[{0:q}+{0:q}*{1:minus1}]'),
+    ('addr', ('MUL', 'lea_factor', 'reg'), 0, [], '[{1:q}+{1:q}*{0:minus1}]'),
+    ('addr', ('ADD', 'reg', ('MUL', 'reg', 'scale')), 0, [], '[{0:q}+{1:q}*{2}]'),
+    ('addr', ('ADD', ('MUL', 'reg', 'scale'), 'reg'), 0, [], '[{2:q}+{0:q}*{1}]'),
+    ('addr', ('ADD', ('MUL', 'reg', 'scale'), 'imm'), 0, [], '[{0:q}*{1}{2:disp}]'),
+
+    # values computed into the target register
+    ('acc', 'imm', 1, ['mov {t}, {0}'], '{t}'),
+    ('acc', 'reg', 1, ['mov {t}, {0}'], '{t}'),
+    ('acc', 'mem', 1, ['mov {t}, {0}'], '{t}'),
+    ('acc', 'addr', 1, ['lea {t}, {0}'], '{t}'),
+    ('acc', 'cond', 2, ['set{0} al', 'movzx {t}, al'], '{t}'),
+    ('acc', ('ADD', 'acc', 'one'), 1, ['inc {t}'], '{t}'),
+    ('acc', ('ADD', 'one', 'acc'), 1, ['inc {t}'], '{t}'),
+    ('acc', ('ADD', 'acc', 'minus_one'), 1, ['dec {t}'], '{t}'),
+    ('acc', ('ADD', 'acc', 'src'), 1, ['add {t}, {1}'], '{t}'),
+    ('acc', ('ADD', 'src', 'acc'), 1, ['add {t}, {0}'], '{t}'),
+    ('acc', ('SUB', 'acc', 'one'), 1, ['dec {t}'], '{t}'),
+    ('acc', ('SUB', 'acc', 'src'), 1, ['sub {t}, {1}'], '{t}'),
+    ('acc', ('SUB', 'src', 'acc'), 2, ['neg {t}', 'add {t}, {0}'], '{t}'),
+    ('acc', ('MUL', 'acc', 'minus_one'), 1, ['neg {t}'], '{t}'),
+    ('acc', ('MUL', 'acc', 'pow2'), 1, ['shl {t}, {1:log2}'], '{t}'),
+    ('acc', ('MUL', 'pow2', 'acc'), 1, ['shl {t}, {0:log2}'], '{t}'),
+    ('acc', ('MUL', 'acc', 'lea_factor'), 1, ['lea {t}, [{t:q}+{t:q}*{1:minus1}]'], '{t}'),
+    ('acc', ('MUL', 'lea_factor', 'acc'), 1, ['lea {t}, [{t:q}+{t:q}*{0:minus1}]'], '{t}'),
+    ('acc', ('MUL', 'acc', 'imm'), 3, ['imul {t}, {t}, {1}'], '{t}'),
+    ('acc', ('MUL', 'imm', 'acc'), 3, ['imul {t}, {t}, {0}'], '{t}'),
+    ('acc', ('MUL', 'rm', 'imm'), 3, ['imul {t}, {0}, {1}'], '{t}'),
+    ('acc', ('MUL', 'imm', 'rm'), 3, ['imul {t}, {1}, {0}'], '{t}'),
+    ('acc', ('MUL', 'acc', 'rm'), 3, ['imul {t}, {1}'], '{t}'),
+    ('acc', ('MUL', 'rm', 'acc'), 3, ['imul {t}, {0}'], '{t}'),
+
+    # flags for a conditional jump or setcc
+    ('cond', ('CMP', 'reg', 'zero'), 1, ['test {0}, {0}'], '{cc}'),
+    ('cond', ('CMP', 'acc', 'zero'), 1, ['test {0}, {0}'], '{cc}'),
+    ('cond', ('CMP', 'reg', 'src'), 1, ['cmp {0}, {1}'], '{cc}'),
+    ('cond', ('CMP', 'mem', 'rsrc'), 1, ['cmp {0}, {1}'], '{cc}'),
+    ('cond', ('CMP', 'imm', 'rm'), 1, ['cmp {1}, {0}'], '{swapped_cc}'),
+    ('cond', ('CMP', 'acc', 'src'), 1, ['cmp {0}, {1}'], '{cc}'),
+    ('cond', ('CMP', 'src', 'acc'), 1, ['cmp {1}, {0}'], '{swapped_cc}'),
+    ('cond', 'reg', 1, ['test {0}, {0}'], 'ne'),
+    ('cond', 'mem', 1, ['cmp {0}, 0'], 'ne'),
+
+    # whole lines; in-place updates come before the general forms
+    ('stmt', ('MOVE', 'dst'), 0, [], None),
+    ('stmt', ('MOVE', ('ADD', 'dst', 'one')), 1, ['inc {d}'], None),
+    ('stmt', ('MOVE', ('ADD', 'one', 'dst')), 1, ['inc {d}'], None),
+    ('stmt', ('MOVE', ('ADD', 'dst', 'minus_one')), 1, ['dec {d}'], None),
+    ('stmt', ('MOVE', ('SUB', 'dst', 'one')), 1, ['dec {d}'], None),
+    ('stmt', ('MOVE', ('ADD', 'dst', 'rsrc')), 1, ['add {d}, {1}'], None),
+    ('stmt', ('MOVE', ('ADD', 'rsrc', 'dst')), 1, ['add {d}, {0}'], None),
+    ('stmt', ('MOVE', ('SUB', 'dst', 'rsrc')), 1, ['sub {d}, {1}'], None),
+    ('stmt', ('MOVE_REG', ('ADD', 'dst', 'mem')), 1, ['add {d}, {1}'], None),
+    ('stmt', ('MOVE_REG', ('ADD', 'mem', 'dst')), 1, ['add {d}, {0}'], None),
+    ('stmt', ('MOVE_REG', ('SUB', 'dst', 'mem')), 1, ['sub {d}, {1}'], None),
+    ('stmt', ('MOVE', ('ADD', 'dst', 'acc')), 1, ['add {d}, {1}'], None),
+    ('stmt', ('MOVE', ('ADD', 'acc', 'dst')), 1, ['add {d}, {0}'], None),
+    ('stmt', ('MOVE', ('SUB', 'dst', 'acc')), 1, ['sub {d}, {1}'], None),
+    ('stmt', ('MOVE', ('MUL', 'dst', 'pow2')), 1, ['shl {d}, {1:log2}'], None),
+    ('stmt', ('MOVE', ('MUL', 'pow2', 'dst')), 1, ['shl {d}, {0:log2}'], None),
+    ('stmt', ('MOVE', ('MUL', 'dst', 'minus_one')), 1, ['neg {d}'], None),
+    # shifts and lea through the target register before a 3-cycle imul
+    ('stmt', ('MOVE', 'acc'), 1, ['mov {d}, {0}'], None),
+    ('stmt', ('MOVE_REG', ('MUL', 'dst', 'rm')), 3, ['imul {d}, {1}'], None),
+    ('stmt', ('MOVE_REG', ('MUL', 'rm', 'dst')), 3, ['imul {d}, {0}'], None),
+    ('stmt', ('MOVE_REG', ('MUL', 'rm', 'imm')), 3, ['imul {d}, {0}, {1}'], None),
+    ('stmt', ('MOVE_REG', ('MUL', 'imm', 'rm')), 3, ['imul {d}, {1}, {0}'], None),
+    ('stmt', ('MOVE_REG', 'addr'), 1, ['lea {d}, {0}'], None),
+    ('stmt', ('MOVE', 'imm'), 1, ['mov {d}, {0}'], None),
+    ('stmt', ('MOVE', 'reg'), 1, ['mov {d}, {0}'], None),
+    ('stmt', ('MOVE_REG', 'mem'), 1, ['mov {d}, {0}'], None),
+    ('stmt', ('BRANCH_TRUE', 'cond'), 1, ['j{0} {label}'], None),
+    ('stmt', ('BRANCH_FALSE', 'cond'), 1, ['j{0:not} {label}'], None),
+]
+
+
+class ExprNode:
+    """Node of the expression tree of one TAC line.
+
+    Leaves are CONST (value: the constant as written), REG and MEM (value:
+    the operand). Interior nodes are ADD, SUB, MUL and the comparisons; the
+    root is MOVE_REG or MOVE_MEM (value: the destination operand) or
+    BRANCH_TRUE / BRANCH_FALSE (value: the target label).
+    """
+
+    def __init__(self, op, kids=(), value=None):
+        self.op = op
+        self.kids = list(kids)
+        self.value = value
+        self.best = {}  # nonterminal -> (cost, rule)
+
+    def leaves(self):
+        if not self.kids:
+            return [self]
+        return [leaf for kid in self.kids for leaf in kid.leaves()]
+
+    def __repr__(self):
+        if not self.kids:
+            return f"{self.op}({self.value})"
+        return f"{self.op}({', '.join(repr(kid) for kid in self.kids)})"
+
+
+class OperandFormatter(string.Formatter):
+    def format_field(self, value, format_spec):
+        if format_spec == 'q':
+            return REGISTER_64[value]
+        if format_spec == 'log2':
+            return str(int(value).bit_length() - 1)
+        if format_spec == 'minus1':
+            return str(int(value) - 1)
+        if format_spec == 'disp':
+            return f"{int(value):+d}"
+        if format_spec == 'negdisp':
+            return f"{-int(value):+d}"
+        if format_spec == 'not':
+            return NEGATED_CODES[value]
+        return super().format_field(value, format_spec)
+
+
+class InstructionSelector:
+    """Bottom-up rewrite (BURS-style) tiling of expression trees with RULES.
+
+    label() finds, for every node and nonterminal, the cheapest rule that
+    derives it (dynamic programming from the leaves up, closed under the
+    chain rules); reduce() walks the chosen rules from the root down and
+    emits their instructions.
+    """
+
+    def __init__(self, rules=None):
+        self.rules = RULES if rules is None else rules
+        self.chain_rules = [rule for rule in self.rules if isinstance(rule[1], str)]
+        self.tree_rules = [rule for rule in self.rules if not isinstance(rule[1], str)]
+        self.formatter = OperandFormatter()
+
+    def select(self, root):
+        """Instructions for one tree rooted at a MOVE or BRANCH node"""
+        dest = root.value if root.op in OP_CLASSES['MOVE'] else None
+        self.label(root, dest)
+        if 'stmt' not in root.best:
+            raise ValueError(f"No rule covers {root!r}")
+
+        # compute straight into the destination register unless an operand still lives there
+        target = 'eax'
+        if root.op == 'MOVE_REG' and all(leaf.value != dest for leaf in root.leaves()):
+            target = dest
+
+        fields = {'t': target, 'd': dest, 'label': root.value}
+        instructions = []
+        self.reduce(root, 'stmt', fields, instructions)
+        return [ins for ins in instructions if not self.is_self_move(ins)]
+
+    def is_self_move(self, instruction):
+        parts = instruction.replace(',', ' ').split()
+        return len(parts) == 3 and parts[0] == 'mov' and parts[1] == parts[2]
+
+    # --- LABELING ---
+
+    def label(self, node, dest):
+        for kid in node.kids:
+            self.label(kid, dest)
+        node.best = {}
+        if not node.kids:
+            for nonterminal in self.leaf_nonterminals(node, dest):
+                node.best[nonterminal] = (0, None)
+        else:
+            for rule in self.tree_rules:
+                cost = self.match(rule[1], node)
+                if cost is not None:
+                    self.record(node, rule, cost + rule[2])
+
+        changed = True
+        while changed:
+            changed = False
+            for rule in self.chain_rules:
+                if rule[1] in node.best:
+                    changed |= self.record(node, rule, node.best[rule[1]][0] + rule[2])
+
+    def record(self, node, rule, cost):
+        nonterminal = rule[0]
+        if nonterminal in node.best and node.best[nonterminal][0] <= cost:
+            return False
+        node.best[nonterminal] = (cost, rule)
+        return True
+
+    def leaf_nonterminals(self, node, dest):
+        if node.op == 'CONST':
+            value = int(node.value)
+            names = ['imm']
+            if value == 1:
+                names.append('one')
+            if value == -1:
+                names.append('minus_one')
+            if value == 0:
+                names.append('zero')
+            if value in (2, 4, 8):
+                names.append('scale')
+            if value in (3, 5, 9):
+                names.append('lea_factor')
+            if value >= 2 and value & (value - 1) == 0:
+                names.append('pow2')
+            return names
+        names = ['reg' if node.op == 'REG' else 'mem']
+        if node.value == dest:
+            names.append('dst')
+        return names
+
+    def match(self, pattern, node):
+        """Cost of the kids' nonterminals if pattern fits node, else None"""
+        if isinstance(pattern, str):
+            entry = node.best.get(pattern)
+            return entry[0] if entry else None
+        op, kid_patterns = pattern[0], pattern[1:]
+        if node.op != op and node.op not in OP_CLASSES.get(op, ()):
+            return None
+        if len(kid_patterns) != len(node.kids):
+            return None
+        total = 0
+        for kid_pattern, kid in zip(kid_patterns, node.kids):
+            cost = self.match(kid_pattern, kid)
+            if cost is None:
+                return None
+            total += cost
+        return total
+
+    # --- REDUCTION ---
+
+    def reduce(self, node, nonterminal, fields, instructions):
+        """Emit the instructions of the rule chosen for node; returns its operand"""
+        _, rule = node.best[nonterminal]
+        if rule is None:
+            return node.value
+
+        operands = [self.reduce(kid, kid_nonterminal, fields, instructions)
+                    for kid, kid_nonterminal in self.bindings(rule[1], node)]
+        rule_fields = dict(fields)
+        if node.op in COMPARISON_OPS:
+            rule_fields['cc'] = CONDITION_CODES[node.op]
+            rule_fields['swapped_cc'] = SWAPPED_CODES[rule_fields['cc']]
+        for template in rule[3]:
+            instructions.append(self.formatter.format(template, *operands, **rule_fields))
+        if rule[4] is None:
+            return None
+        return self.formatter.format(rule[4], *operands, **rule_fields)
+
+    def bindings(self, pattern, node):
+        """(node, nonterminal) for every nonterminal of pattern, in pre-order"""
+        if isinstance(pattern, str):
+            return [(node, pattern)]
+        result = []
+        for kid_pattern, kid in zip(pattern[1:], node.kids):
+            result.extend(self.bindings(kid_pattern, kid))
+        return result
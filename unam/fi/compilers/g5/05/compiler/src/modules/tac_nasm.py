@@ -3,9 +3,107 @@ import re
 from pathlib import Path
 import subprocess
 import os
+from modules.tac_cfg import (TACFunction, ControlFlowGraph, parse_tac_line, evaluate_binop,
+                             is_int_literal, is_temp)
+from modules.tac_isel import ExprNode, InstructionSelector, COMPARISON_OPS, REGISTER_64
+from modules.nasm_peephole import PeepholeOptimizer
+from modules.nasm_encoder import X86Assembler, EncodingError
+from modules.elf_object import write_elf_object, read_elf_sections
+from modules.toolchain import Toolchain
+
+# Lines tiled by the instruction selector; DIV and MOD keep their own lowering
+SELECTED_OPS = ('ADD', 'SUB', 'MUL') + COMPARISON_OPS
+
+# Calling convention and object format of every supported target. Ints travel
+# in the low dword of the argument registers; arguments beyond those go on the
+# stack, above the shadow space the caller reserves for the callee. A leaf
+# function may keep its slots in the red zone below rsp, which signal handlers
+# leave alone, when the target has one.
+#
+# The linear-scan allocator hands out the target's callee-saved registers,
+# which survive calls (printf included), plus r10d/r11d for values that are not
+# live across a call. eax, ecx and edx stay free as scratch for every operation.
+# Argument registers are only handed out in leaf functions, past their own
+# parameters, so loading the arguments of a call or homing the parameters of a
+# function cannot overwrite a value that is still to be read.
+TARGETS = {
+    'win64': {
+        'object_format': 'win64',
+        'object_suffix': '.obj',
+        'executable_suffix': '.exe',
+        'argument_registers': ['ecx', 'edx', 'r8d', 'r9d'],
+        'shadow_space': 32,
+        'red_zone': 0,
+        'callee_saved': ['ebx', 'esi', 'edi', 'r12d', 'r13d', 'r14d', 'r15d'],
+    },
+    # System V AMD64: no shadow space, and rsi/rdi belong to the caller
+    'linux-x86_64': {
+        'object_format': 'elf64',
+        'object_suffix': '.o',
+        'executable_suffix': '',
+        'argument_registers': ['edi', 'esi', 'edx', 'ecx', 'r8d', 'r9d'],
+        'shadow_space': 0,
+        'red_zone': 128,
+        'callee_saved': ['ebx', 'r12d', 'r13d', 'r14d', 'r15d'],
+    },
+}
+DEFAULT_TARGET = 'win64'
+
+# Ways to turn the .asm text into an object file (see write_nasm64_file)
+ASSEMBLERS = ('internal', 'nasm', 'verify')
+
+CALLER_SAVED_REGISTERS = ['r10d', 'r11d']
+
+def signed_division_magic(divisor):
+    """Magic multiplier and shift for signed 32-bit division by a constant.
+
+    Hacker's Delight, figure 10-1; valid for 2 <= |divisor| < 2**31.
+    Returns (magic, shift) with magic as a signed 32-bit value.
+    """
+    two31 = 2 ** 31
+    mask = 2 ** 32 - 1
+    ad = abs(divisor)
+    t = two31 + (1 if divisor < 0 else 0)
+    anc = t - 1 - t % ad
+    p = 31
+    q1, r1 = two31 // anc, two31 - (two31 // anc) * anc
+    q2, r2 = two31 // ad, two31 - (two31 // ad) * ad
+    while True:
+        p += 1
+        q1, r1 = (2 * q1) & mask, (2 * r1) & mask
+        if r1 >= anc:
+            q1, r1 = (q1 + 1) & mask, (r1 - anc) & mask
+        q2, r2 = (2 * q2) & mask, (2 * r2) & mask
+        if r2 >= ad:
+            q2, r2 = (q2 + 1) & mask, (r2 - ad) & mask
+        delta = ad - r2
+        if not (q1 < delta or (q1 == delta and r1 == 0)):
+            break
+    magic = (q2 + 1) & mask
+    if divisor < 0:
+        magic = (-magic) & mask
+    if magic >= two31:
+        magic -= 2 ** 32
+    return magic, p - 32
+
+
+def truncated_division(left, right):
+    """Integer division and remainder rounding toward zero, as in Go"""
+    quotient = abs(left) // abs(right)
+    if (left < 0) != (right < 0):
+        quotient = -quotient
+    return quotient, left - quotient * right
+
 
 class TACToNASM64:
-    def __init__(self):
+    def __init__(self, allocate_registers=True, target=DEFAULT_TARGET):
+        if target not in TARGETS:
+            raise ValueError(f"Unknown target '{target}' (expected one of: {', '.join(TARGETS)})")
+        self.allocate_registers = allocate_registers
+        self.target_name = target
+        self.target = TARGETS[target]
+        self.selector = InstructionSelector()
+        self.peephole = PeepholeOptimizer()
         self.asm_code = []
         self.text_section = []
         self.data_section = []
@@ -14,8 +112,9 @@ class TACToNASM64:
         self.string_data = {}
         self.current_function = None
         self.functions = {}  # name -> {'params': [], 'locals': {}, 'temp_count': 0}
+        self.call_graph = {}  # function name -> names of the functions it calls
         self.local_vars = {}  # var_name -> stack_offset
-        self.param_vars = {}  # param_name -> register/stack_offset
+        self.param_index = 0  # position of the next PARAM line
         self.temp_count = 0
         self.label_count = 0
         self.global_vars = set()
@@ -55,14 +154,17 @@ class TACToNASM64:
         self.data_section = []
         self.bss_section = []
         self.functions = {}
+        self.call_graph = {}
         self.current_function = None
         self.local_vars = {}
-        self.param_vars = {}
+        self.param_index = 0
         self.temp_count = 0
         self.label_count = 0
         self.global_vars = set()
         self.stack_used = 0
         self.max_stack_used = 0
+        self.folded_lines = set()
+        self.pending_tree = None
         
         tac_instructions = self.preprocess_tac(tac_instructions)
         
@@ -73,40 +175,264 @@ class TACToNASM64:
         return self.build_nasm_code()
     
     def analyze_functions(self, tac_instructions):
-        """Primera pasada: identificar funciones y sus variables"""
+        """Primera pasada: identificar funciones y los nombres que ocupan su marco"""
         current_func = None
-        in_function = False
+        body = []
+        
+        for index, line in enumerate(tac_instructions):
+            quad = parse_tac_line(line)
+            if quad.kind == 'func':
+                current_func = quad.label
+                body = []
+                self.functions[current_func] = {
+                    'params': [],
+                    'locals': set(),
+                    'temps': set(),
+                    'start_line': index
+                }
+                self.call_graph[current_func] = set()
+            elif quad.kind == 'end_func':
+                self.analyze_function_body(current_func, body)
+                current_func = None
+            elif current_func:
+                body.append((index, quad))
+                # Only names that are still read or written after optimization get a slot;
+                # a parameter is one more local, written by its PARAM line on entry
+                info = self.functions[current_func]
+                if quad.kind == 'param':
+                    info['params'].append(quad.dest)
+                elif quad.kind == 'call':
+                    self.call_graph[current_func].add(quad.op)
+                names = quad.uses()
+                if quad.defines():
+                    names.append(quad.defines())
+                for name in names:
+                    if name in self.data_labels:
+                        continue
+                    if is_temp(name):
+                        info['temps'].add(name)
+                    else:
+                        info['locals'].add(name)
+    
+    def analyze_function_body(self, func_name, body):
+        """Liveness-driven decisions for one function; body is its list of (line index, quad)"""
+        info = self.functions[func_name]
+        info['registers'] = {}
+        info['saved_registers'] = []
+        
+        cfg = ControlFlowGraph(TACFunction(func_name, [quad for _, quad in body]))
+        live_in, live_out = cfg.liveness()
+        line_of = {id(quad): index for index, quad in body}
+        
+        self.find_folded_lines(cfg, live_out, line_of)
+        # a temp folded into the next line's tree never materializes its value
+        folded = set()
+        for index, _ in body:
+            if index in self.folded_lines:
+                folded.update((index, index + 1))
+        materialized = set()
+        for index, quad in body:
+            if index not in folded:
+                materialized.update(quad.uses())
+                materialized.add(quad.defines())
+        for index, quad in body:
+            if index in self.folded_lines and quad.dest not in materialized:
+                info['temps'].discard(quad.dest)
+        
+        if self.allocate_registers:
+            intervals = self.live_intervals(cfg, live_in, live_out, line_of)
+            call_lines = [index for index, quad in body if quad.kind == 'call']
+            caller_saved = list(CALLER_SAVED_REGISTERS)
+            if not self.call_graph[func_name]:
+                # a leaf never loads arguments, so the argument registers past its own
+                # parameters are free too (ecx and edx stay scratch)
+                caller_saved += [reg for reg in self.target['argument_registers'][len(info['params']):]
+                                 if reg not in ('ecx', 'edx')]
+            self.linear_scan(info, intervals, call_lines, caller_saved)
+        self.choose_frame(func_name, info, [quad for _, quad in body])
+    
+    def choose_frame(self, func_name, info, quads):
+        """Frame layout of one function, once its registers are known.
+
+        Leaves of the call graph need no outgoing area: with nothing in memory
+        they get no frame at all ('none'), and when their slots fit in the
+        target's red zone they address them below rsp ('red_zone'). Any other
+        function gets the rbp frame, with the shadow space and stack arguments
+        of its calls reserved once in the prologue.
+        """
+        slots = len(self.spilled_names(info)) + len(info['saved_registers'])
+        info['outgoing_space'] = 0
+        if not self.call_graph[func_name]:
+            if slots == 0:
+                info['frame'] = 'none'
+                return
+            if 8 * slots <= self.target['red_zone']:
+                info['frame'] = 'red_zone'
+                return
         
-        for line in tac_instructions:
-            if line.endswith(':'):
-                label = line.rstrip(':')
-                if label.startswith("FUNC "):
-                    func_name = label[5:]
-                    self.functions[func_name] = {
-                        'params': [],
-                        'locals': set(),
-                        'temps': set(),
-                        'start_line': tac_instructions.index(line)
-                    }
-                    current_func = func_name
-                    in_function = True
-                elif label.startswith("END_FUNC"):
-                    in_function = False
-                    current_func = None
-            elif in_function and current_func:
-                if " = " in line:
-                    dest_part = line.split(" = ", 1)[0].strip()
-                    if dest_part.startswith('t'):
-                        self.functions[current_func]['temps'].add(dest_part)
-                    elif dest_part not in ['eax', 'ebx', 'ecx', 'edx', 'esi', 'edi', 
-                                         'rax', 'rbx', 'rcx', 'rdx', 'rsi', 'rdi']:
-                        if not (dest_part in ['n', 'i', 'param1', 'param2', 'param3', 'param4']):
-                            self.functions[current_func]['locals'].add(dest_part)
+        info['frame'] = 'rbp'
+        if self.call_graph[func_name]:
+            register_count = len(self.target['argument_registers'])
+            stack_args = max((len(quad.args) - register_count for quad in quads
+                              if quad.kind == 'call' and quad.op != 'fmt.Println'), default=0)
+            outgoing = self.target['shadow_space'] + 8 * max(stack_args, 0)
+            info['outgoing_space'] = outgoing + outgoing % 16
+    
+    def find_folded_lines(self, cfg, live_out, line_of):
+        """Lines 't = a OP b' whose temp is only read once, by the line right after them.
+
+        Their expression becomes a subtree of that line's tree, so the
+        instruction selector can tile both together (a*4 + b as one lea, a
+        comparison and its IF_TRUE/IF_FALSE as cmp and jcc). Arithmetic folds
+        into arithmetic, comparisons and copies; comparisons fold into branches.
+        """
+        for block in cfg.blocks:
+            live = set(live_out[block.id])
+            live_after = {}
+            for quad in reversed(block.quads):
+                live_after[id(quad)] = set(live)
+                if quad.defines():
+                    live.discard(quad.defines())
+                live.update(quad.uses())
+            
+            for quad, consumer in zip(block.quads, block.quads[1:]):
+                if quad.kind != 'binop' or quad.op not in SELECTED_OPS \
+                        or not is_temp(quad.dest) or quad.dest in quad.args:
+                    continue
+                if quad.op in COMPARISON_OPS:
+                    fits = consumer.kind in ('if_true', 'if_false')
+                else:
+                    fits = consumer.kind == 'copy' or (consumer.kind == 'binop' and consumer.op in SELECTED_OPS)
+                if fits and consumer.args.count(quad.dest) == 1 \
+                        and (quad.dest not in live_after[id(consumer)] or consumer.defines() == quad.dest):
+                    self.folded_lines.add(line_of[id(quad)])
+    
+    def live_intervals(self, cfg, live_in, live_out, line_of):
+        """name -> [first line, last line] over which the name may hold a live value.
+
+        A single conservative interval per name: every block where the name is
+        live on entry or exit stretches it to that block's boundary.
+        """
+        intervals = {}
+        
+        def extend(name, line):
+            if name in intervals:
+                interval = intervals[name]
+                interval[0] = min(interval[0], line)
+                interval[1] = max(interval[1], line)
+            else:
+                intervals[name] = [line, line]
+        
+        for block in cfg.blocks:
+            if not block.quads:
+                continue
+            first, last = line_of[id(block.quads[0])], line_of[id(block.quads[-1])]
+            for name in live_in[block.id]:
+                extend(name, first)
+            for name in live_out[block.id]:
+                extend(name, last)
+            for quad in block.quads:
+                line = line_of[id(quad)]
+                for name in quad.uses():
+                    extend(name, line)
+                if quad.defines():
+                    extend(quad.defines(), line)
+        return intervals
+    
+    def linear_scan(self, info, intervals, call_lines, caller_saved=CALLER_SAVED_REGISTERS):
+        """Poletto-Sarkar linear scan over the function's locals and temps.
+
+        Intervals are visited by start line. A register is free again once
+        the interval holding it ends at or before the current start, since
+        every instruction reads its operands before writing its result. When
+        none is free, whichever interval ends last stays in (or goes to) its
+        stack slot. Values live across a call only get callee-saved registers.
+        """
+        candidates = [name for name in intervals if name in info['locals'] or name in info['temps']]
+        candidates.sort(key=lambda name: tuple(intervals[name]))
+        registers = info['registers']
+        callee_saved = self.target['callee_saved']
+        free = caller_saved + callee_saved
+        active = []
+        
+        for name in candidates:
+            start, end = intervals[name]
+            for other in [o for o in active if intervals[o][1] <= start]:
+                active.remove(other)
+                free.append(registers[other])
+            
+            crosses_call = any(start < line < end for line in call_lines)
+            allowed = callee_saved if crosses_call else caller_saved + callee_saved
+            choice = next((reg for reg in allowed if reg in free), None)
+            if choice:
+                free.remove(choice)
+                registers[name] = choice
+                active.append(name)
+                continue
+            
+            # spill the interval that ends last
+            victims = [o for o in active if registers[o] in allowed]
+            victim = max(victims, key=lambda o: intervals[o][1], default=None)
+            if victim and intervals[victim][1] > end:
+                registers[name] = registers.pop(victim)
+                active.remove(victim)
+                active.append(name)
+        
+        used = set(registers.values())
+        info['saved_registers'] = [reg for reg in callee_saved if reg in used]
     
     def generate_code(self, tac_instructions):
         """Segunda pasada: generar código NASM"""
-        for line in tac_instructions:
-            self.process_tac_line(line)
+        for index, line in enumerate(tac_instructions):
+            quad = parse_tac_line(line)
+            if index in self.folded_lines:
+                # emitted as part of the next line's tree
+                self.text_section.append(f"    ; {line}")
+                self.pending_tree = (quad.dest, self.expression_tree(quad))
+            elif self.current_function and (quad.kind in ('copy', 'if_true', 'if_false')
+                                            or (quad.kind == 'binop' and quad.op in SELECTED_OPS)):
+                self.process_selected_line(line, quad)
+            else:
+                self.process_tac_line(line)
+    
+    def process_selected_line(self, line, quad):
+        """Tile the tree of one copy, arithmetic/comparison line or branch with the instruction selector"""
+        self.text_section.append(f"    ; {line}")
+        if quad.kind in ('if_true', 'if_false'):
+            condition = self.operand_tree(quad.args[0])
+            if condition.op == 'CONST':
+                if (int(condition.value) != 0) == (quad.kind == 'if_true'):
+                    self.text_section.append(f"    jmp {quad.label}")
+                return
+            root = ExprNode('BRANCH_TRUE' if quad.kind == 'if_true' else 'BRANCH_FALSE', [condition], quad.label)
+        else:
+            dest_loc = self.get_var_location(quad.dest)
+            root = ExprNode('MOVE_MEM' if '[' in dest_loc else 'MOVE_REG',
+                            [self.expression_tree(quad)], self.sized(dest_loc))
+        
+        for instruction in self.selector.select(root):
+            self.text_section.append(f"    {instruction}")
+    
+    def expression_tree(self, quad):
+        """Tree of the value a copy or binop line computes, with constant operands folded"""
+        if quad.kind == 'copy':
+            return self.operand_tree(quad.args[0])
+        left, right = (self.operand_tree(arg) for arg in quad.args)
+        if left.op == 'CONST' and right.op == 'CONST':
+            return ExprNode('CONST', value=str(evaluate_binop(quad.op, int(left.value), int(right.value))))
+        return ExprNode(quad.op, [left, right])
+    
+    def operand_tree(self, operand):
+        if self.pending_tree and self.pending_tree[0] == operand:
+            _, tree = self.pending_tree
+            self.pending_tree = None
+            return tree
+        if is_int_literal(operand):
+            return ExprNode('CONST', value=operand)
+        location = self.get_var_location(operand)
+        if '[' in location:
+            return ExprNode('MEM', value=self.sized(location))
+        return ExprNode('REG', value=location)
     
     def build_nasm_code(self):
         nasm_code = []
@@ -137,8 +463,15 @@ class TACToNASM64:
         nasm_code.append("global main")
         nasm_code.append("extern printf, exit")
         nasm_code.append("")
+        # last stage: clean up what the line-by-line translation left behind
+        self.text_section = self.peephole.optimize(self.text_section)
         nasm_code.extend(self.text_section)
         
+        if self.target['object_format'] == 'elf64':
+            # no executable stack for the linked program
+            nasm_code.append("")
+            nasm_code.append("section .note.GNU-stack noalloc noexec nowrite progbits")
+        
         return "\n".join(nasm_code)
     
     def add_header(self):
@@ -166,6 +499,7 @@ class TACToNASM64:
             line = line.replace(" SUB ", " - ")
             line = line.replace(" MUL ", " * ")
             line = line.replace(" DIV ", " / ")
+            line = line.replace(" MOD ", " % ")
             line = line.replace(" LE ", " <= ")
             line = line.replace(" LT ", " < ")
             line = line.replace(" GE ", " >= ")
@@ -188,7 +522,7 @@ class TACToNASM64:
             self.process_label(line)
             return
         
-        call_pattern = r'^(t\d+)\s*=\s*CALL\s+(\w+(?:\.\w+)?)(?:\s+(.+))?$'
+        call_pattern = r'^(\w+)\s*=\s*CALL\s+(\w+(?:\.\w+)?)(?:\s+(.+))?$'
         match = re.match(call_pattern, line)
         if match:
             dest = match.group(1)
@@ -218,11 +552,13 @@ class TACToNASM64:
                 self.process_function_call(func_name, args, False, None)
             return
         
+        if line.startswith("PARAM "):
+            self.process_param(line)
+            return
+        
         # CONTROL
         control_instructions = {
             'GOTO ': self.process_goto,
-            'IF_TRUE ': self.process_if_true,
-            'IF_FALSE ': self.process_if_false,
             'RETURN': self.process_return,
             'END_FUNC': self.process_end_func,
         }
@@ -247,20 +583,23 @@ class TACToNASM64:
             func_name = label[5:]
             self.enter_function(func_name)
             self.text_section.append(f"{func_name}:")
+            info = self.functions.get(func_name, {})
             
-            self.text_section.append("    push rbp")
-            self.text_section.append("    mov rbp, rsp")
-            
-            # local variables space
-            local_space = self.calculate_local_space(func_name)
-            if local_space > 0:
-                self.text_section.append(f"    sub rsp, {local_space}")
-                self.stack_used = local_space
-                if local_space > self.max_stack_used:
-                    self.max_stack_used = local_space
+            if info.get('frame', 'rbp') == 'rbp':
+                self.text_section.append("    push rbp")
+                self.text_section.append("    mov rbp, rsp")
+                
+                # local variables space, then shadow space and stack arguments for calls
+                frame_size = self.calculate_local_space(func_name) + info.get('outgoing_space', self.target['shadow_space'])
+                if frame_size > 0:
+                    self.text_section.append(f"    sub rsp, {frame_size}")
+                    self.stack_used = frame_size
+                    if frame_size > self.max_stack_used:
+                        self.max_stack_used = frame_size
             
-            # Shadow space for calls
-            self.text_section.append("    sub rsp, 32")
+            # callee-saved registers handed out by the allocator
+            for reg, slot in self.saved_register_slots():
+                self.text_section.append(f"    mov {slot}, {REGISTER_64[reg]}")
             
         elif label.startswith("LABEL "):
             label_name = label[6:]
@@ -271,28 +610,40 @@ class TACToNASM64:
     def enter_function(self, func_name):
         self.current_function = func_name
         self.local_vars = {}
-        self.param_vars = {}
+        self.param_index = 0
         self.temp_count = 0
+    
+    def process_param(self, line):
+        """Home the next parameter from its argument register (or stack slot) into its location"""
+        param = line[6:].strip()
+        index = self.param_index
+        self.param_index += 1
         
-        # parameter offsets
-        # 1 : RCX -> [rbp+16]
-        # 2 : RDX -> [rbp+24]
-        # 3 : R8 -> [rbp+32]
-        # 4 : R9 -> [rbp+40]
-        param_offsets = [16, 24, 32, 40]
+        self.text_section.append(f"    ; {line}")
+        dest_loc = self.get_var_location(param)
+        registers = self.target['argument_registers']
+        if index < len(registers):
+            self.text_section.append(f"    mov {dest_loc}, {registers[index]}")
+            return
         
-        if func_name in self.functions:
-            self.param_vars['n'] = '[rbp+16]'  # 1
+        # past the return address (and the saved rbp) and the caller's shadow space
+        base = self.frame_base()
+        offset = (16 if base == 'rbp' else 8) + self.target['shadow_space'] + 8 * (index - len(registers))
+        if '[' in dest_loc:
+            self.text_section.append(f"    mov eax, [{base}+{offset}]")
+            self.text_section.append(f"    mov {dest_loc}, eax")
+        else:
+            self.text_section.append(f"    mov {dest_loc}, [{base}+{offset}]")
     
     def calculate_local_space(self, func_name):
         if func_name not in self.functions:
             return 0
         
-        local_count = len(self.functions[func_name]['locals'])
-        temp_count = len(self.functions[func_name]['temps'])
+        info = self.functions[func_name]
+        spilled = self.spilled_names(info)
         
         # 16 BYTES DE ALINEACIÓN
-        total_vars = local_count + temp_count
+        total_vars = len(spilled) + len(info.get('saved_registers', []))
         space_needed = total_vars * 8
         
         if space_needed % 16 != 0:
@@ -300,14 +651,42 @@ class TACToNASM64:
         
         return space_needed
     
+    def spilled_names(self, info):
+        """Locals and temps left without a register; each needs a frame slot"""
+        return (info.get('locals', set()) | info.get('temps', set())) - set(info.get('registers', {}))
+    
+    def frame_base(self):
+        """Register the frame slots of the current function are addressed from"""
+        info = self.functions.get(self.current_function, {})
+        return 'rbp' if info.get('frame', 'rbp') == 'rbp' else 'rsp'
+    
+    def saved_register_slots(self):
+        """(register, frame slot) for every callee-saved register the function uses.
+
+        The slots sit below the ones get_var_stack_offset hands out.
+        """
+        info = self.functions.get(self.current_function, {})
+        spilled = self.spilled_names(info)
+        return [(reg, f"[{self.frame_base()}{-8 * (len(spilled) + 1 + i):+d}]")
+                for i, reg in enumerate(info.get('saved_registers', []))]
+    
+    def emit_epilogue(self):
+        for reg, slot in self.saved_register_slots():
+            self.text_section.append(f"    mov {REGISTER_64[reg]}, {slot}")
+        if self.frame_base() == 'rbp':
+            self.text_section.append("    mov rsp, rbp")
+            self.text_section.append("    pop rbp")
+        self.text_section.append("    ret")
+    
+    def sized(self, location):
+        """Operand with an explicit size when it is memory; registers carry their own"""
+        return f"dword {location}" if '[' in location else location
+    
     def get_var_stack_offset(self, var_name):
-        if var_name in self.param_vars:
-            return self.param_vars[var_name]
-        
         if var_name not in self.local_vars:
             # NEW LOCAL VARIABLE
             offset = -8 - (len(self.local_vars) * 8)
-            self.local_vars[var_name] = f"[rbp{offset:+d}]"
+            self.local_vars[var_name] = f"[{self.frame_base()}{offset:+d}]"
         
         return self.local_vars[var_name]
     
@@ -315,40 +694,6 @@ class TACToNASM64:
         label = line[5:]  # After "GOTO "
         self.text_section.append(f"    jmp {label}")
     
-    def process_if_true(self, line):
-        parts = line.split()
-        if len(parts) >= 4 and parts[2] == "GOTO":
-            cond_var = parts[1]
-            label = parts[3]
-            
-            # LOCATION
-            if cond_var in self.local_vars:
-                cond_loc = self.local_vars[cond_var]
-            elif cond_var in self.param_vars:
-                cond_loc = self.param_vars[cond_var]
-            else:
-                cond_loc = f"[{cond_var}]"  # GLOBAL
-            
-            self.text_section.append(f"    cmp dword {cond_loc}, 0")
-            self.text_section.append(f"    jne {label}")
-    
-    def process_if_false(self, line):
-        parts = line.split()
-        if len(parts) >= 4 and parts[2] == "GOTO":
-            cond_var = parts[1]
-            label = parts[3]
-            
-            # LOCATION
-            if cond_var in self.local_vars:
-                cond_loc = self.local_vars[cond_var]
-            elif cond_var in self.param_vars:
-                cond_loc = self.param_vars[cond_var]
-            else:
-                cond_loc = f"[{cond_var}]"  # GLOBAL
-            
-            self.text_section.append(f"    cmp dword {cond_loc}, 0")
-            self.text_section.append(f"    je {label}")
-    
     def process_return(self, line):
         self.text_section.append(f"    ; {line}")
         
@@ -359,28 +704,20 @@ class TACToNASM64:
             if ret_val.isdigit() or (ret_val[0] == '-' and ret_val[1:].isdigit()):
                 self.text_section.append(f"    mov eax, {ret_val}")
             else:
-                # VAR LOCATION
-                if ret_val in self.local_vars:
-                    ret_loc = self.local_vars[ret_val]
-                elif ret_val in self.param_vars:
-                    ret_loc = self.param_vars[ret_val]
-                else:
-                    ret_loc = f"[{ret_val}]"  # Variable global
-                
+                ret_loc = self.get_var_location(ret_val)
                 self.text_section.append(f"    mov eax, {ret_loc}")
         else:
             self.text_section.append("    xor eax, eax")
         
-        self.text_section.append("    mov rsp, rbp")
-        self.text_section.append("    pop rbp")
-        self.text_section.append("    ret")
+        self.emit_epilogue()
     
     def process_end_func(self, line):
         self.text_section.append("    ; END_FUNC")
         
-        self.text_section.append("    mov rsp, rbp")
-        self.text_section.append("    pop rbp")
-        self.text_section.append("    ret")
+        # main falling off its end exits with 0, as a Go program does
+        if self.current_function == 'main':
+            self.text_section.append("    xor eax, eax")
+        self.emit_epilogue()
         
         self.current_function = None
     
@@ -412,37 +749,38 @@ class TACToNASM64:
         arg = args[0]
         self.text_section.append(f"    ; PRINTLN: {arg}") # DEBUG
         
-        # Shadow space (32 bytes)
-        self.text_section.append("    sub rsp, 32")
+        # printf(format, value): format pointer in the first argument register, value in the second
+        # (the shadow space is already reserved by the prologue)
+        format_reg = REGISTER_64[self.target['argument_registers'][0]]
+        value_reg = self.target['argument_registers'][1]
         
         # If argument is a known data label (string), pass string pointer and use fmt_string
         if arg in self.data_labels:
-            # load format in RCX, string pointer in RDX (Windows x64, printf(format, arg))
-            self.text_section.append(f"    lea rcx, [fmt_string]")
+            self.text_section.append(f"    lea {format_reg}, [fmt_string]")
             # use RIP-relative LEA for global label
-            self.text_section.append(f"    lea rdx, [{arg}]")
-            self.text_section.append("    call printf")
+            self.text_section.append(f"    lea {REGISTER_64[value_reg]}, [{arg}]")
         elif arg.isdigit() or (arg[0] == '-' and arg[1:].isdigit()):
             # integer literal
-            self.text_section.append(f"    mov edx, {arg}")
-            self.text_section.append("    lea rcx, [fmt_int]")
-            self.text_section.append("    call printf")
+            self.text_section.append(f"    mov {value_reg}, {arg}")
+            self.text_section.append(f"    lea {format_reg}, [fmt_int]")
         else:
             var_loc = self.get_var_location(arg)
-            # if location is memory, move into eax then to edx
-            if '[' in var_loc:
-                self.text_section.append(f"    mov eax, {var_loc}")
-                self.text_section.append(f"    mov edx, eax")
-            else:
-                self.text_section.append(f"    mov edx, {var_loc}")
-            self.text_section.append("    lea rcx, [fmt_int]")
-            self.text_section.append("    call printf")
-        
-        # STACK CLEANUP
-        self.text_section.append("    add rsp, 32")
+            self.text_section.append(f"    mov {value_reg}, {var_loc}")
+            self.text_section.append(f"    lea {format_reg}, [fmt_int]")
+        self.emit_library_call("printf")
         # DEBUG
         self.text_section.append("    ; Fin de println")
     
+    def emit_library_call(self, func_name):
+        """Call into the C library"""
+        if self.target['object_format'] == 'elf64':
+            # variadic callees read al as the number of vector registers used;
+            # going through the PLT keeps the executable position independent
+            self.text_section.append("    xor eax, eax")
+            self.text_section.append(f"    call {func_name} wrt ..plt")
+        else:
+            self.text_section.append(f"    call {func_name}")
+    
     def get_var_location(self, var_name):
         # Si es una expresión constante, calcularla
         cleaned_var = var_name.replace(' ', '')
@@ -459,10 +797,16 @@ class TACToNASM64:
                 pass
 
         if self.current_function:
+            registers = self.functions.get(self.current_function, {}).get('registers', {})
+            if var_name in registers:
+                return registers[var_name]
             if var_name in self.local_vars:
                 return self.local_vars[var_name]
-            elif var_name in self.param_vars:
-                return self.param_vars[var_name]
+            
+            # LOCALS AND TEMPS LIVE IN THE FRAME RESERVED BY calculate_local_space
+            info = self.functions.get(self.current_function)
+            if info and (var_name in info['locals'] or var_name in info['temps']):
+                return self.get_var_stack_offset(var_name)
         
         # GLOBAL VAR - solo crear si es un nombre válido
         if re.match(r'^[a-zA-Z_][a-zA-Z0-9_]*$', var_name):
@@ -478,41 +822,30 @@ class TACToNASM64:
     def process_function_call(self, func_name, args, has_dest, dest):
         self.text_section.append(f"    ; CALL {func_name}")
         
-        # UNPRESERVED REGISTER 
-        self.text_section.append("    push rcx")
-        self.text_section.append("    push rdx")
-        self.text_section.append("    push r8")
-        self.text_section.append("    push r9")
-        
-        # Windows x64 CONVENTION
-        for i, arg in enumerate(args[:4]):  
-            if i == 0:
-                reg = "rcx"
-            elif i == 1:
-                reg = "rdx"
-            elif i == 2:
-                reg = "r8"
-            elif i == 3:
-                reg = "r9"
-            
+        # The allocator never keeps a value in an argument register or, across
+        # a call, in a register the callee may clobber: nothing to save here
+        registers = self.target['argument_registers']
+        for reg, arg in zip(registers, args):
             if arg.isdigit() or (arg[0] == '-' and arg[1:].isdigit()):
                 self.text_section.append(f"    mov {reg}, {arg}")
             else:
                 var_loc = self.get_var_location(arg)
                 self.text_section.append(f"    mov {reg}, {var_loc}")
         
-        # SHADOW SPACE
-        self.text_section.append("    sub rsp, 32")
-        self.text_section.append(f"    call {func_name}")
-        
-        # STACJK CLEANUP
-        self.text_section.append("    add rsp, 32")
+        # STACK ARGUMENTS GO ABOVE THE SHADOW SPACE, BOTH RESERVED BY THE PROLOGUE
+        shadow_space = self.target['shadow_space']
+        for i, arg in enumerate(args[len(registers):]):
+            slot = f"[rsp+{shadow_space + 8 * i}]"
+            if arg.isdigit() or (arg[0] == '-' and arg[1:].isdigit()):
+                self.text_section.append(f"    mov dword {slot}, {arg}")
+            else:
+                var_loc = self.get_var_location(arg)
+                if '[' in var_loc:
+                    self.text_section.append(f"    mov eax, {var_loc}")
+                    var_loc = "eax"
+                self.text_section.append(f"    mov {slot}, {var_loc}")
         
-        # REGISTER RESTORE
-        self.text_section.append("    pop r9")
-        self.text_section.append("    pop r8")
-        self.text_section.append("    pop rdx")
-        self.text_section.append("    pop rcx")
+        self.text_section.append(f"    call {func_name}")
         
         if has_dest and dest:
             dest_loc = self.get_var_location(dest)
@@ -527,8 +860,8 @@ class TACToNASM64:
         
         dest_loc = self.get_var_location(dest)
         
-        operators = [' + ', ' - ', ' * ', ' <= ', ' < ', ' >= ', ' > ', ' == ', ' != ']
-        is_binary_op = any(op in expr for op in operators)
+        # DIV and MOD; every other operator is tiled by the instruction selector
+        is_binary_op = ' / ' in expr or ' % ' in expr
         
         if not is_binary_op:
             self.process_simple_assignment(dest_loc, expr.strip())
@@ -538,15 +871,20 @@ class TACToNASM64:
     def process_simple_assignment(self, dest_loc, src):
         """simple assignmnt  x = y"""
         if src.isdigit() or (src[0] == '-' and src[1:].isdigit()):
-            self.text_section.append(f"    mov dword {dest_loc}, {src}")
+            self.text_section.append(f"    mov {self.sized(dest_loc)}, {src}")
         else:
             src_loc = self.get_var_location(src)
-            self.text_section.append(f"    mov eax, {src_loc}")
-            self.text_section.append(f"    mov {dest_loc}, eax")
+            if src_loc == dest_loc:
+                return
+            if '[' not in src_loc or '[' not in dest_loc:
+                self.text_section.append(f"    mov {dest_loc}, {src_loc}")
+            else:
+                self.text_section.append(f"    mov eax, {src_loc}")
+                self.text_section.append(f"    mov {dest_loc}, eax")
     
     def process_binary_operation(self, dest_loc, expr):
-        """binary operation x = y op z"""
-        for op in [' <= ', ' < ', ' >= ', ' > ', ' == ', ' != ', ' + ', ' - ', ' * ', ' / ', ' % ']:
+        """binary operation x = y / z o x = y % z (the rest goes through the instruction selector)"""
+        for op in [' / ', ' % ']:
             if op in expr:
                 left, right = expr.split(op, 1)
                 left = left.strip()
@@ -556,45 +894,12 @@ class TACToNASM64:
                 # Si ambos operandos son constantes numéricas, calcular inmediatamente
                 if (left.isdigit() or (left[0] == '-' and left[1:].isdigit())) and \
                 (right.isdigit() or (right[0] == '-' and right[1:].isdigit())):
-                    try:
-                        left_val = int(left)
-                        right_val = int(right)
-                        result = 0
-                        if operator == '+':
-                            result = left_val + right_val
-                        elif operator == '-':
-                            result = left_val - right_val
-                        elif operator == '*':
-                            result = left_val * right_val
-                        elif operator == '/':
-                            if right_val != 0:
-                                result = left_val // right_val  # División entera
-                                result = int(result)
-                            else:
-                                result = 0
-                        elif operator == '%':
-                            if right_val != 0:
-                                result = left_val % right_val
-                            else:
-                                result = 0
-                        # Para comparaciones, resultado booleano
-                        elif operator == '==':
-                            result = 1 if left_val == right_val else 0
-                        elif operator == '!=':
-                            result = 1 if left_val != right_val else 0
-                        elif operator == '<':
-                            result = 1 if left_val < right_val else 0
-                        elif operator == '<=':
-                            result = 1 if left_val <= right_val else 0
-                        elif operator == '>':
-                            result = 1 if left_val > right_val else 0
-                        elif operator == '>=':
-                            result = 1 if left_val >= right_val else 0
-                        
-                        self.text_section.append(f"    mov dword {dest_loc}, {result}")
-                        return
-                    except:
-                        pass  # Si hay error, seguir con el método normal
+                    result = 0
+                    if int(right) != 0:
+                        quotient, remainder = truncated_division(int(left), int(right))
+                        result = quotient if operator == '/' else remainder
+                    self.text_section.append(f"    mov {self.sized(dest_loc)}, {result}")
+                    return
                 
                 # LEFT SIDE 
                 if left.isdigit() or (left[0] == '-' and left[1:].isdigit()):
@@ -603,20 +908,19 @@ class TACToNASM64:
                     left_loc = self.get_var_location(left)
                     self.text_section.append(f"    mov eax, {left_loc}")
                 
-                # PROCESS RIGHT SIDE BASED ON OPERATOR
-                if operator in ['+', '-', '*']:
-                    self.process_arithmetic_operation(operator, right)
-                elif operator in ['<=', '<', '>=', '>', '==', '!=']:
-                    self.process_comparison_operation(operator, right)
-                elif operator == '/':
+                if operator == '/':
                     self.process_division_operation(right)
-                elif operator == '%':
+                else:
                     self.process_modulo_operation(right)
                 
                 self.text_section.append(f"    mov {dest_loc}, eax")
                 break
     
     def process_modulo_operation(self, right):
+        if (right.isdigit() or (right[0] == '-' and right[1:].isdigit())) and int(right) != 0:
+            self.process_constant_division(int(right), remainder=True)
+            return
+        
         self.text_section.append("    cdq")  # Extiende EAX a EDX:EAX
         
         if right.isdigit() or (right[0] == '-' and right[1:].isdigit()):
@@ -630,26 +934,59 @@ class TACToNASM64:
         # El módulo queda en EDX después de IDIV
         self.text_section.append("    mov eax, edx")
 
-    def process_arithmetic_operation(self, operator, right):
-        """Procesa operación aritmética"""
-        if right.isdigit() or (right[0] == '-' and right[1:].isdigit()):
-            if operator == '+':
-                self.text_section.append(f"    add eax, {right}")
-            elif operator == '-':
-                self.text_section.append(f"    sub eax, {right}")
-            elif operator == '*':
-                self.text_section.append(f"    imul eax, {right}")
-        else:
-            right_loc = self.get_var_location(right)
-            if operator == '+':
-                self.text_section.append(f"    add eax, {right_loc}")
-            elif operator == '-':
-                self.text_section.append(f"    sub eax, {right_loc}")
-            elif operator == '*':
-                self.text_section.append(f"    imul eax, {right_loc}")
+    def process_constant_division(self, divisor, remainder=False):
+        """eax = eax / divisor (or eax % divisor) without idiv, truncating like Go"""
+        magnitude = abs(divisor)
+        
+        if magnitude == 1:
+            if remainder:
+                self.text_section.append("    xor eax, eax")
+            elif divisor < 0:
+                self.text_section.append("    neg eax")
+            return
+        
+        self.text_section.append("    mov ecx, eax")  # dividend
+        
+        if magnitude & (magnitude - 1) == 0:
+            # POWER OF TWO: bias negative dividends by 2^k - 1, then shift
+            k = magnitude.bit_length() - 1
+            self.text_section.append("    sar eax, 31")
+            self.text_section.append(f"    shr eax, {32 - k}")
+            self.text_section.append("    add eax, ecx")
+            if remainder:
+                self.text_section.append(f"    and eax, {-magnitude}")
+                self.text_section.append("    sub ecx, eax")
+                self.text_section.append("    mov eax, ecx")
+                return
+            self.text_section.append(f"    sar eax, {k}")
+            if divisor < 0:
+                self.text_section.append("    neg eax")
+            return
+        
+        # GENERAL CASE: multiply-high by the magic number
+        magic, shift = signed_division_magic(divisor)
+        self.text_section.append(f"    mov eax, {magic}")
+        self.text_section.append("    imul ecx")  # edx:eax = magic * dividend
+        if divisor > 0 and magic < 0:
+            self.text_section.append("    add edx, ecx")
+        elif divisor < 0 and magic > 0:
+            self.text_section.append("    sub edx, ecx")
+        if shift:
+            self.text_section.append(f"    sar edx, {shift}")
+        self.text_section.append("    mov eax, edx")
+        self.text_section.append("    shr eax, 31")
+        self.text_section.append("    add eax, edx")  # +1 for negative quotients
+        if remainder:
+            self.text_section.append(f"    imul eax, eax, {divisor}")
+            self.text_section.append("    sub ecx, eax")
+            self.text_section.append("    mov eax, ecx")
     
     def process_division_operation(self, right):
         """Procesa operación de división (más compleja)"""
+        if (right.isdigit() or (right[0] == '-' and right[1:].isdigit())) and int(right) != 0:
+            self.process_constant_division(int(right))
+            return
+        
         # Para división, necesitamos preparar EDX:EAX
         self.text_section.append("    cdq")  # Extiende EAX a EDX:EAX
         
@@ -660,52 +997,74 @@ class TACToNASM64:
             right_loc = self.get_var_location(right)
             self.text_section.append(f"    mov ecx, {right_loc}")
             self.text_section.append("    idiv ecx")
-    
-    def process_comparison_operation(self, operator, right):
-        """Procesa operación de comparación"""
-        cmp_label_true = f"cmp_true_{self.label_count}"
-        cmp_label_end = f"cmp_end_{self.label_count}"
-        self.label_count += 1
-        
-        # Comparar
-        if right.isdigit() or (right[0] == '-' and right[1:].isdigit()):
-            self.text_section.append(f"    cmp eax, {right}")
-        else:
-            right_loc = self.get_var_location(right)
-            self.text_section.append(f"    cmp eax, {right_loc}")
-        
-        # Salto condicional según operador
-        jump_instructions = {
-            '<=': 'jle',
-            '<': 'jl',
-            '>=': 'jge',
-            '>': 'jg',
-            '==': 'je',
-            '!=': 'jne'
-        }
-        
-        if operator in jump_instructions:
-            self.text_section.append(f"    {jump_instructions[operator]} {cmp_label_true}")
-        
-        self.text_section.append(f"    mov eax, 0")
-        self.text_section.append(f"    jmp {cmp_label_end}")
-        self.text_section.append(f"{cmp_label_true}:")
-        self.text_section.append(f"    mov eax, 1")
-        self.text_section.append(f"{cmp_label_end}:")
 
 
-def write_nasm64_file(tac_file_path, output_dir=None):
-    """Función principal para convertir TAC a NASM 64-bit y escribir archivo .asm"""
+def assemble_with_nasm(asm_path, obj_path, target_info, printer=print):
+    """Run nasm on asm_path; False (after reporting why) when it fails"""
+    result = subprocess.run(
+        ["nasm", "-f", target_info['object_format'], str(asm_path), "-o", str(obj_path)],
+        capture_output=True,
+        text=True,
+        timeout=30
+    )
+    if result.returncode != 0:
+        printer(f"Error in NASM assembling:")
+        if result.stderr:
+            printer(f"  Error: {result.stderr[:200]}")
+        return False
+    return True
+
+
+def compare_with_nasm(program, nasm_obj_path):
+    """Differences between the in-process encoding and the object nasm wrote"""
+    nasm_sections = read_elf_sections(nasm_obj_path)
+    differences = []
+    for name in ('.text', '.data'):
+        ours, theirs = bytes(program.sections[name]), nasm_sections.get(name, b'')
+        if ours == theirs:
+            continue
+        offset = next((i for i, (a, b) in enumerate(zip(ours, theirs)) if a != b), min(len(ours), len(theirs)))
+        line = ''
+        if name == '.text':
+            line = next((text for start, text in reversed(program.line_offsets) if start <= offset), '')
+        differences.append(f"{name}+0x{offset:x}: {line}".rstrip(': '))
+    return differences
+
+
+def write_nasm64_file(tac_file_path, output_dir=None, allocate_registers=True, target=DEFAULT_TARGET, report=None,
+                      assembler=None, toolchain=None, run=True, printer=print):
+    """Función principal para convertir TAC a NASM 64-bit y escribir archivo .asm
+
+    report, when given, is extended with the peephole statistics for the log.
+    assembler picks how the object file is made: 'internal' encodes it in
+    process (ELF64 targets only, the default there), 'nasm' runs nasm on the
+    .asm file and 'verify' does both and reports where the bytes differ.
+    toolchain (a Toolchain) gives the flags of the gcc link and records it.
+    With run=False the executable is only built, not executed. Progress
+    messages go to printer.
+    """
+    toolchain = toolchain or Toolchain()
     try:
-        converter = TACToNASM64()
+        converter = TACToNASM64(allocate_registers, target)
+        target_info = TARGETS[target]
+        if assembler is None:
+            assembler = 'internal' if target_info['object_format'] == 'elf64' else 'nasm'
+        if assembler not in ASSEMBLERS:
+            raise ValueError(f"Unknown assembler '{assembler}' (expected one of: {', '.join(ASSEMBLERS)})")
+        if assembler != 'nasm' and target_info['object_format'] != 'elf64':
+            printer(f"The internal assembler only writes ELF64 objects; using NASM for {target}")
+            assembler = 'nasm'
         
         # Convertir TAC a NASM
         nasm_code = converter.convert_tac_file(tac_file_path)
         
         if not nasm_code:
-            print("Error: Couldn't generate assembly code")
+            printer("Error: Couldn't generate assembly code")
             return None
         
+        if report is not None:
+            report.extend(converter.peephole.get_report())
+        
         # Determinar ruta de salida
         if output_dir is None:
             output_dir = Path(tac_file_path).parent
@@ -721,83 +1080,86 @@ def write_nasm64_file(tac_file_path, output_dir=None):
         with open(output_path, 'w', encoding='utf-8') as f:
             f.write(nasm_code)
         
-        print(f"ASM file generated")
+        printer(f"ASM file generated")
         
         try:
-            obj_path = output_dir / f"{output_name}.obj"
-            exe_path = output_dir / f"{output_name}.exe"
-            
-            print(f"\nAssembling with NASM...")
+            obj_path = output_dir / f"{output_name}{target_info['object_suffix']}"
+            exe_path = output_dir / f"{output_name}{target_info['executable_suffix']}"
             
-            # Ensamblar con NASM
-            result = subprocess.run(
-                ["nasm", "-f", "win64", str(output_path), "-o", str(obj_path)],
-                capture_output=True,
-                text=True,
-                shell=True,
-                timeout=30
-            )
-            
-            if result.returncode != 0:
-                print(f"Error in NASM assembling:")
-                if result.stderr:
-                    print(f"  Error: {result.stderr[:200]}")
-                return output_path
+            if assembler == 'nasm':
+                printer(f"\nAssembling with NASM...")
+                if not assemble_with_nasm(output_path, obj_path, target_info, printer):
+                    return output_path
+            else:
+                printer(f"\nAssembling in process...")
+                program = X86Assembler().assemble(nasm_code)
+                write_elf_object(program, obj_path, output_path.name)
+                if assembler == 'verify':
+                    # nasm's object only serves as the reference; ours is the one linked
+                    nasm_obj_path = output_dir / f"{output_name}_nasm{target_info['object_suffix']}"
+                    try:
+                        verified = assemble_with_nasm(output_path, nasm_obj_path, target_info, printer)
+                    except FileNotFoundError:
+                        printer("NASM not found, encoding left unverified")
+                        verified = False
+                    if verified:
+                        differences = compare_with_nasm(program, nasm_obj_path)
+                        for difference in differences:
+                            printer(f"  Encoding differs from NASM at {difference}")
+                        if not differences:
+                            printer("Encoding matches NASM")
             
-            print(f"Successful Assembling:")
+            printer(f"Successful Assembling:")
             
-            print(f"\nLinking with GCC...")
+            printer(f"\nLinking with GCC...")
             
             # Enlazar con GCC
-            result = subprocess.run(
-                ["gcc", str(obj_path), "-o", str(exe_path)],
-                capture_output=True,
-                text=True,
-                shell=True,
-                timeout=30
-            )
+            result = toolchain.gcc([obj_path], exe_path, capture_output=True, text=True, timeout=30)
             
             if result.returncode != 0:
-                print(f"Error linking GCC:")
+                printer(f"Error linking GCC:")
                 if result.stderr:
-                    print(f"  Error: {result.stderr[:200]}")
+                    printer(f"  Error: {result.stderr[:200]}")
                 return output_path
             
-            print(f"Successful Linking:")
+            printer(f"Successful Linking:")
             
             # Verificar que el ejecutable se creó
-            if exe_path.exists():                
+            if exe_path.exists() and run:
                 # Intentar ejecutar
-                print(f"\n--- EXECUTING {exe_path.name} ---")
+                printer(f"\n--- EXECUTING {exe_path.name} ---")
                 result = subprocess.run(
                     [str(exe_path)],
                     capture_output=True,
                     text=True,
                     timeout=5
                 )
-                print(f"Exit Code: {result.returncode}")
+                printer(f"Exit Code: {result.returncode}")
                 if result.stdout:
-                    print(f"Output: {result.stdout.strip()}")
+                    printer(f"Output: {result.stdout.strip()}")
                 if result.stderr:
-                    print(f"Error: {result.stderr.strip()}")
-            else:
-                print(f"The executable was not created.")
+                    printer(f"Error: {result.stderr.strip()}")
+            elif not exe_path.exists():
+                printer(f"The executable was not created.")
             
             return exe_path
             
         except subprocess.TimeoutExpired:
-            print("Timeout: NASM o GCC took too long to respond.")
+            printer("Timeout: NASM o GCC took too long to respond.")
+            return output_path
+        except EncodingError as e:
+            printer(f"Error in assembling: {e}")
             return output_path
         except FileNotFoundError as e:
-            print(f"Command not founf: {e}")
-            print("  Verify that NASM and GCC are installed and in your system PATH.")
+            printer(f"Command not founf: {e}")
+            printer("  Verify that NASM and GCC are installed and in your system PATH.")
             return output_path
         except Exception as e:
-            print(f"Unexpected error: {e}")
+            printer(f"Unexpected error: {e}")
             return output_path
             
     except Exception as e:
-        print(f"Error in write_nasm64_file: {e}")
+        printer(f"Error in write_nasm64_file: {e}")
         import traceback
         traceback.print_exc()
         return None
\ No newline at end of file
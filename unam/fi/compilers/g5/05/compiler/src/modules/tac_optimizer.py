@@ -0,0 +1,820 @@
+# modules/tac_optimizer.py
+from modules.tac_cfg import (TACProgram, ControlFlowGraph, BasicBlock, Quad,
+                             COMMUTATIVE_OPS, evaluate_binop, is_int_literal, is_name, is_temp)
+from modules.tac_ssa import SSAForm
+
+# Lattice of sparse conditional constant propagation; constants are plain ints
+TOP = "TOP"        # no value reaches the name yet
+BOTTOM = "BOTTOM"  # not a compile-time constant
+
+
+class TACOptimizer:
+    """Machine-independent optimizations over the TAC produced by TACGenerator.
+
+    Works per function on a ControlFlowGraph and returns TAC lines in the same
+    textual format, so every backend that reads TAC keeps working unchanged.
+    """
+
+    def __init__(self, printer=None):
+        self.printer = printer or (lambda msg: None)
+        self.stats = {}  # func_name -> {pass_name: count}
+
+    def optimize(self, tac_code):
+        program = TACProgram(tac_code)
+        self.stats = {}
+
+        for func in program.functions:
+            self.stats[func.name] = {}
+            cfg = ControlFlowGraph(func)
+
+            constants, folded = self.sparse_constant_propagation(cfg)
+            self.record(func.name, "constants_propagated", constants)
+            self.record(func.name, "branches_folded", folded)
+
+            eliminated = self.value_numbering(cfg)
+            self.record(func.name, "value_numbering", eliminated)
+
+            propagated = self.copy_propagation(cfg)
+            self.record(func.name, "copies_propagated", propagated)
+
+            unreachable, dead = self.dead_code_elimination(cfg)
+            self.record(func.name, "unreachable_removed", unreachable)
+            self.record(func.name, "dead_stores_removed", dead)
+
+            hoisted = self.loop_invariant_code_motion(cfg)
+            self.record(func.name, "loop_invariants_hoisted", hoisted)
+
+            reduced = self.strength_reduction(cfg)
+            self.record(func.name, "induction_vars_reduced", reduced)
+            if reduced:
+                self.record(func.name, "constants_propagated", self.sparse_constant_propagation(cfg)[0])
+                self.record(func.name, "copies_propagated", self.copy_propagation(cfg))
+                self.record(func.name, "dead_stores_removed", self.dead_code_elimination(cfg)[1])
+
+            coalesced, shared = self.coalesce(cfg)
+            self.record(func.name, "copies_coalesced", coalesced)
+            self.record(func.name, "temps_shared", shared)
+
+            removed = self.simplify_cfg(cfg)
+            self.record(func.name, "cfg_quads_removed", removed)
+
+            cfg.apply()
+
+        return program.to_lines()
+
+    def record(self, func_name, pass_name, count):
+        self.stats.setdefault(func_name, {})
+        self.stats[func_name][pass_name] = self.stats[func_name].get(pass_name, 0) + count
+        self.printer(f"[OPT] {func_name}: {pass_name} -> {count}")
+
+    def get_report(self):
+        """Summary lines for the compilation log"""
+        report = []
+        for func_name, passes in self.stats.items():
+            details = ", ".join(f"{name}={count}" for name, count in passes.items())
+            report.append(f"{func_name}: {details}")
+        return report
+
+    # --- SPARSE CONDITIONAL CONSTANT PROPAGATION ---
+
+    def sparse_constant_propagation(self, cfg):
+        """Wegman-Zadeck constant propagation on the SSA form of the function.
+
+        Values and reachable CFG edges are discovered together, so a branch on
+        a constant condition only makes one successor executable and the
+        definitions on the other side never pollute the phis below it.
+        Afterwards constant names are replaced by their literal, branches with
+        a constant condition become a GOTO or disappear, and never-executed
+        blocks are removed.
+        Returns (names found constant, branches folded).
+        """
+        ssa = SSAForm(cfg)
+        ssa.construct()
+        values, edges = self._propagate_constants(cfg)
+        result = self._fold_constants(cfg, values, edges)
+        ssa.destruct()
+        return result
+
+    def _propagate_constants(self, cfg):
+        defined = set()
+        uses = {}
+        for block in cfg.blocks:
+            for quad in block.quads:
+                if quad.defines():
+                    defined.add(quad.defines())
+                for name in quad.uses():
+                    uses.setdefault(name, []).append((block, quad))
+
+        values = {}
+        edges = set()
+        executable = set()
+        flow_work = [(None, cfg.entry)]
+        ssa_work = []
+
+        def value(operand):
+            if is_int_literal(operand):
+                return int(operand)
+            if operand in defined:
+                return values.get(operand, TOP)
+            return BOTTOM  # globals and string labels
+
+        def visit(block, quad):
+            if quad.kind == 'phi':
+                result = TOP
+                for source, arg in zip(quad.sources, quad.args):
+                    if (source, block) in edges:
+                        result = self._meet(result, value(arg))
+            elif quad.kind == 'copy':
+                result = value(quad.args[0])
+            elif quad.kind == 'binop':
+                left, right = value(quad.args[0]), value(quad.args[1])
+                if BOTTOM in (left, right):
+                    result = BOTTOM
+                elif TOP in (left, right):
+                    result = TOP
+                else:
+                    result = evaluate_binop(quad.op, left, right)
+                    if result is None:
+                        result = BOTTOM
+            elif quad.kind in ('if_true', 'if_false'):
+                condition = value(quad.args[0])
+                if condition == BOTTOM:
+                    flow_work.extend((block, succ) for succ in block.succs)
+                elif condition != TOP:
+                    flow_work.append((block, self._branch_target(cfg, block, quad, condition)))
+                return
+            elif quad.kind == 'goto':
+                flow_work.extend((block, succ) for succ in block.succs)
+                return
+            elif quad.defines():
+                result = BOTTOM
+            else:
+                return
+
+            if values.get(quad.dest, TOP) != result:
+                values[quad.dest] = result
+                ssa_work.extend(uses.get(quad.dest, []))
+
+        while flow_work or ssa_work:
+            if flow_work:
+                edge = flow_work.pop()
+                if edge in edges:
+                    continue
+                edges.add(edge)
+                block = edge[1]
+                first_visit = block not in executable
+                executable.add(block)
+                for quad in block.quads:
+                    if first_visit or quad.kind == 'phi':
+                        visit(block, quad)
+                if first_visit and block.terminator is None:
+                    flow_work.extend((block, succ) for succ in block.succs)
+            else:
+                block, quad = ssa_work.pop()
+                if block in executable:
+                    visit(block, quad)
+
+        return values, edges
+
+    def _meet(self, a, b):
+        if a == TOP:
+            return b
+        if b == TOP or a == b:
+            return a
+        return BOTTOM
+
+    def _branch_target(self, cfg, block, quad, condition):
+        """Successor a conditional jump takes when its condition is known"""
+        if (condition != 0) == (quad.kind == 'if_true'):
+            return cfg.label_to_block[quad.label]
+        return cfg.blocks[block.id + 1]
+
+    def _fold_constants(self, cfg, values, edges):
+        executable = {block for _, block in edges}
+        constants = {name: str(v) for name, v in values.items() if v not in (TOP, BOTTOM)}
+        folded = 0
+
+        blocks = []
+        for block in cfg.blocks:
+            if block not in executable:
+                continue
+            term = block.terminator
+            if term is not None and term.kind in ('if_true', 'if_false') and term.args[0] in constants:
+                target = self._branch_target(cfg, block, term, int(constants[term.args[0]]))
+                block.quads.pop()
+                if target is not cfg.blocks[block.id + 1]:
+                    block.quads.append(Quad('goto', label=term.label))
+                folded += 1
+
+            kept = []
+            for quad in block.quads:
+                if quad.kind == 'phi':
+                    live = [(s, a) for s, a in zip(quad.sources, quad.args) if (s, block) in edges]
+                    quad.sources = [s for s, _ in live]
+                    quad.args = [a for _, a in live]
+                if quad.defines() in constants and not quad.has_side_effects():
+                    continue
+                quad.replace_uses(constants)
+                kept.append(quad)
+            block.quads = kept
+            blocks.append(block)
+
+        cfg.blocks = blocks
+        cfg.rebuild_edges()
+        return len(constants), folded
+
+    # --- VALUE NUMBERING ---
+
+    def value_numbering(self, cfg):
+        """Value numbering over extended basic blocks.
+
+        Redundant binary operations become copies from the name that already
+        holds the value; later uses of a redundant temp are rewritten to that
+        name and the copy is dropped once the temp is no longer read.
+        Returns the number of eliminated computations.
+        """
+        roots, children = cfg.extended_basic_blocks()
+        self._vn_counter = 0
+        self._redundant_temps = set()
+        eliminated = 0
+
+        for root in roots:
+            state = {'var_vn': {}, 'expr_vn': {}, 'vn_names': {}, 'const_vn': {}}
+            eliminated += self._number_ebb(root, children, state)
+
+        # Copies left behind for temps that nobody reads any more
+        used = set()
+        for block in cfg.blocks:
+            for quad in block.quads:
+                used.update(quad.uses())
+        for block in cfg.blocks:
+            block.quads = [q for q in block.quads
+                           if not (q.kind == 'copy' and q.dest in self._redundant_temps and q.dest not in used)]
+
+        return eliminated
+
+    def _number_ebb(self, root, children, state):
+        # depth first with an explicit stack: a long chain of ifs makes the tree
+        # deeper than Python's recursion limit. Every child starts from a copy of
+        # the state its parent block left behind.
+        eliminated = 0
+        stack = [(root, state)]
+        while stack:
+            block, state = stack.pop()
+            eliminated += self._number_block(block, state)
+            for child in reversed(children[block.id]):
+                stack.append((child, self._copy_vn_state(state)))
+        return eliminated
+
+    def _copy_vn_state(self, state):
+        return {
+            'var_vn': dict(state['var_vn']),
+            'expr_vn': dict(state['expr_vn']),
+            'vn_names': {vn: list(names) for vn, names in state['vn_names'].items()},
+            'const_vn': dict(state['const_vn']),
+        }
+
+    def _number_block(self, block, state):
+        eliminated = 0
+        new_quads = []
+
+        for quad in block.quads:
+            # Rewrite reads of temps that were found redundant
+            mapping = {}
+            for name in quad.uses():
+                if name in self._redundant_temps:
+                    holder = self._holder(state, state['var_vn'].get(name), exclude=name)
+                    if holder:
+                        mapping[name] = holder
+            if mapping:
+                quad.replace_uses(mapping)
+
+            if quad.kind == 'binop':
+                left_vn = self._operand_vn(state, quad.args[0])
+                right_vn = self._operand_vn(state, quad.args[1])
+                if quad.op in COMMUTATIVE_OPS and right_vn < left_vn:
+                    left_vn, right_vn = right_vn, left_vn
+                key = (quad.op, left_vn, right_vn)
+
+                vn = state['expr_vn'].get(key)
+                holder = self._holder(state, vn, exclude=quad.dest) if vn is not None else None
+                if holder:
+                    quad = Quad('copy', dest=quad.dest, args=[holder])
+                    if is_temp(quad.dest):
+                        self._redundant_temps.add(quad.dest)
+                    eliminated += 1
+                else:
+                    vn = self._new_vn()
+                    state['expr_vn'][key] = vn
+                self._assign(state, quad.dest, vn)
+
+            elif quad.kind == 'copy':
+                self._assign(state, quad.dest, self._operand_vn(state, quad.args[0]))
+
+            elif quad.defines():
+                self._assign(state, quad.defines(), self._new_vn())
+
+            new_quads.append(quad)
+
+        block.quads = new_quads
+        return eliminated
+
+    def _new_vn(self):
+        self._vn_counter += 1
+        return self._vn_counter
+
+    def _operand_vn(self, state, operand):
+        if is_int_literal(operand):
+            table = state['const_vn']
+            if operand not in table:
+                table[operand] = self._new_vn()
+            return table[operand]
+        if operand not in state['var_vn']:
+            # value on entry to the EBB (parameter, or defined elsewhere)
+            self._assign(state, operand, self._new_vn())
+        return state['var_vn'][operand]
+
+    def _assign(self, state, name, vn):
+        state['var_vn'][name] = vn
+        state['vn_names'].setdefault(vn, []).append(name)
+
+    def _holder(self, state, vn, exclude=None):
+        """A name that still holds value number vn, if any"""
+        for name in state['vn_names'].get(vn, []):
+            if name != exclude and state['var_vn'].get(name) == vn:
+                return name
+        return None
+
+    # --- COPY PROPAGATION AND COALESCING ---
+
+    def copy_propagation(self, cfg):
+        """Replace reads of x by y wherever the copy 'x = y' reaches on every path.
+
+        Uses a forward available-copies analysis; y may be a name or an integer
+        literal (literals are not pushed into IF conditions, which the backends
+        expect to be names). Repeats until no read changes, so chains of copies
+        collapse. The copies themselves are left for dead code elimination.
+        Returns the number of rewritten operands.
+        """
+        propagated = 0
+        while True:
+            avail_in = self._available_copies(cfg)
+            changed = 0
+            for block in cfg.blocks:
+                avail = dict(avail_in[block.id])
+                for quad in block.quads:
+                    mapping = {}
+                    for name in quad.uses():
+                        src = avail.get(name)
+                        if src is None:
+                            continue
+                        if is_int_literal(src) and quad.kind in ('if_true', 'if_false'):
+                            continue
+                        mapping[name] = src
+                    if mapping:
+                        quad.replace_uses(mapping)
+                        changed += len(mapping)
+                    self._copy_transfer(avail, quad)
+            propagated += changed
+            if not changed:
+                return propagated
+
+    def _available_copies(self, cfg):
+        """Copies (dest -> src) available on entry to each block.
+
+        A predecessor whose out set has not been computed yet stands for
+        'every copy' and does not restrict the intersection.
+        """
+        avail_in = {block.id: {} for block in cfg.blocks}
+        avail_out = {}
+
+        changed = True
+        while changed:
+            changed = False
+            for block in cfg.blocks:
+                if block is not cfg.entry:
+                    incoming = None
+                    for pred in block.preds:
+                        out = avail_out.get(pred.id)
+                        if out is None:
+                            continue
+                        if incoming is None:
+                            incoming = dict(out)
+                        else:
+                            incoming = {d: s for d, s in incoming.items() if out.get(d) == s}
+                    if incoming is None:
+                        incoming = {}
+                    avail_in[block.id] = incoming
+                avail = dict(avail_in[block.id])
+                for quad in block.quads:
+                    self._copy_transfer(avail, quad)
+                if avail_out.get(block.id) != avail:
+                    avail_out[block.id] = avail
+                    changed = True
+        return avail_in
+
+    def _copy_transfer(self, avail, quad):
+        dest = quad.defines()
+        if not dest:
+            return
+        for d in [d for d, s in avail.items() if d == dest or s == dest]:
+            del avail[d]
+        if quad.kind == 'copy' and quad.args[0] != dest:
+            avail[dest] = quad.args[0]
+
+    def coalesce(self, cfg):
+        """Merge names that never hold different live values at the same time.
+
+        First every copy 'a = b' whose operands do not interfere is coalesced
+        (user variables win over temps, values live on entry keep their name)
+        and the resulting self-copies are removed. Then temps that do not
+        interfere with each other share one name, so the backend gives them
+        a single frame slot.
+        Returns (copies removed, temps merged into another temp).
+        """
+        live_in, live_out = cfg.liveness()
+        fixed = set(live_in[cfg.entry.id])
+        graph = cfg.interference_graph(live_out, fixed)
+
+        parent = {}
+
+        def find(name):
+            while parent.get(name, name) != name:
+                name = parent[name]
+            return name
+
+        def merge(keep, other):
+            parent[other] = keep
+            neighbours = graph.pop(other, set())
+            graph.setdefault(keep, set()).update(neighbours)
+            for n in neighbours:
+                graph[n].discard(other)
+                graph[n].add(keep)
+
+        for block in cfg.blocks:
+            for quad in block.quads:
+                if quad.kind != 'copy' or not is_name(quad.args[0]):
+                    continue
+                a, b = find(quad.dest), find(quad.args[0])
+                if a == b or b in graph.get(a, set()):
+                    continue
+                if a in fixed and b in fixed:
+                    continue
+                if b in fixed or (is_temp(a) and not is_temp(b)):
+                    a, b = b, a
+                if b in fixed:
+                    continue
+                merge(a, b)
+
+        coalesced = self._rename(cfg, {name: find(name) for name in parent})
+
+        # Share names between non-interfering temps
+        temps = sorted({find(n) for n in graph if is_temp(find(n))}, key=lambda t: int(t[1:]))
+        colours = []
+        renamed = {}
+        for temp in temps:
+            for colour in colours:
+                if colour not in graph.get(temp, set()):
+                    renamed[temp] = colour
+                    merge(colour, temp)
+                    break
+            else:
+                colours.append(temp)
+        self._rename(cfg, renamed)
+
+        return coalesced, len(renamed)
+
+    def _rename(self, cfg, mapping):
+        """Apply a name mapping everywhere and drop resulting self-copies"""
+        removed = 0
+        if not mapping:
+            return removed
+        for block in cfg.blocks:
+            kept = []
+            for quad in block.quads:
+                quad.replace_uses(mapping)
+                if quad.defines():
+                    quad.dest = mapping.get(quad.dest, quad.dest)
+                if quad.kind == 'copy' and quad.dest == quad.args[0]:
+                    removed += 1
+                    continue
+                kept.append(quad)
+            block.quads = kept
+        return removed
+
+    # --- LOOP INVARIANT CODE MOTION ---
+
+    def loop_invariant_code_motion(self, cfg):
+        """Hoist loop-invariant computations into a preheader of each natural loop.
+
+        A quad is invariant when it is pure (no CALL, no division that may
+        trap), it is the only definition of its destination inside the loop,
+        and its operands are literals, names not defined in the loop, or
+        results of invariant quads already hoisted. It is moved only if its
+        destination is not live on entry to the header and either its block
+        dominates every loop exit or the destination is dead after the loop.
+        Calls are never moved, so their side effects keep their order and
+        count. Inner loops are handled first.
+        Returns the number of hoisted quads.
+        """
+        hoisted = 0
+        done = set()
+        while True:
+            dom = cfg.dominators()
+            loops = [(h, body) for h, body in cfg.natural_loops(dom) if h.label not in done]
+            if not loops:
+                return hoisted
+            header, body = loops[0]
+            if header.label is None:
+                header.quads.insert(0, Quad('label', label=cfg.new_label("L")))
+            done.add(header.label)
+            hoisted += self._hoist_loop(cfg, header, body, dom)
+
+    def _hoist_loop(self, cfg, header, body, dom):
+        live_in, live_out = cfg.liveness()
+        loop_blocks = [b for b in cfg.blocks if b.id in body]
+
+        def_count = {}
+        for block in loop_blocks:
+            for quad in block.quads:
+                if quad.defines():
+                    def_count[quad.defines()] = def_count.get(quad.defines(), 0) + 1
+
+        exits = [(b, s) for b in loop_blocks for s in b.succs if s.id not in body]
+        invariant = []
+        hoisted_names = set()
+
+        changed = True
+        while changed:
+            changed = False
+            for block in loop_blocks:
+                for quad in block.quads:
+                    if quad in invariant or quad.kind not in ('binop', 'copy') or quad.has_side_effects():
+                        continue
+                    dest = quad.defines()
+                    if def_count.get(dest) != 1 or dest in live_in[header.id]:
+                        continue
+                    if not all(is_int_literal(a) or def_count.get(a, 0) == 0 or a in hoisted_names
+                               for a in quad.args):
+                        continue
+                    dominates_exits = all(block.id in dom[b.id] for b, _ in exits)
+                    dead_after = all(dest not in live_in[s.id] for _, s in exits)
+                    if not (dominates_exits or dead_after):
+                        continue
+                    invariant.append(quad)
+                    hoisted_names.add(dest)
+                    changed = True
+
+        if not invariant:
+            return 0
+
+        for block in loop_blocks:
+            block.quads = [q for q in block.quads if q not in invariant]
+
+        self._insert_preheader(cfg, header, body, invariant)
+        return len(invariant)
+
+    def _insert_preheader(self, cfg, header, body, quads):
+        """Put quads in a new block that every edge entering the loop goes through"""
+        pre_label = cfg.new_label(f"{header.label}_pre")
+        preheader = BasicBlock(-1, [Quad('label', label=pre_label)] + quads)
+        outside_preds = [p for p in header.preds if p.id not in body]
+        for pred in outside_preds:
+            term = pred.terminator
+            if term is not None and term.is_jump() and term.label == header.label:
+                term.label = pre_label
+
+        index = cfg.blocks.index(header)
+        previous = cfg.blocks[index - 1] if index > 0 else None
+        if previous is None or previous.id not in body:
+            cfg.blocks.insert(index, preheader)
+        else:
+            # the loop falls into its header; keep that path jump-free and
+            # let CFG simplification place the preheader after its predecessor
+            preheader.quads.append(Quad('goto', label=header.label))
+            last = cfg.blocks[-1]
+            if last.falls_through():
+                # the function ends by falling off its last block; jump over the preheader
+                end_label = cfg.new_label("L")
+                cfg.blocks.append(BasicBlock(-1, [Quad('goto', label=end_label)]))
+                cfg.blocks.append(preheader)
+                cfg.blocks.append(BasicBlock(-1, [Quad('label', label=end_label)]))
+            else:
+                cfg.blocks.append(preheader)
+        cfg.rebuild_edges()
+
+    # --- STRENGTH REDUCTION ---
+
+    def strength_reduction(self, cfg):
+        """Rewrite derived induction variables into additive updates.
+
+        A basic induction variable i has a single definition in the loop,
+        'i = i ADD c' or 'i = i SUB c' with c a literal. Every 't = i MUL k'
+        (k a literal) in that loop reads a new temp s instead; s is set to
+        'i MUL k' in the preheader and advanced by c*k right after i is.
+        Multiplication by constants that remains is lowered by the backend.
+        Returns the number of multiplications replaced.
+        """
+        reduced = 0
+        done = set()
+        while True:
+            loops = [(h, body) for h, body in cfg.natural_loops() if h.label not in done]
+            if not loops:
+                return reduced
+            header, body = loops[0]
+            if header.label is None:
+                header.quads.insert(0, Quad('label', label=cfg.new_label("L")))
+            done.add(header.label)
+            reduced += self._reduce_loop(cfg, header, body)
+
+    def _reduce_loop(self, cfg, header, body):
+        loop_blocks = [b for b in cfg.blocks if b.id in body]
+        def_count = {}
+        for block in loop_blocks:
+            for quad in block.quads:
+                if quad.defines():
+                    def_count[quad.defines()] = def_count.get(quad.defines(), 0) + 1
+
+        steps = {}  # basic induction variable -> increment per iteration
+        for block in loop_blocks:
+            for quad in block.quads:
+                step = self._induction_step(quad)
+                if step is not None and def_count.get(quad.dest) == 1:
+                    steps[quad.dest] = step
+
+        derived = {}  # (i, k) -> new temp
+        init = []
+        reduced = 0
+        for block in loop_blocks:
+            for index, quad in enumerate(block.quads):
+                if quad.kind != 'binop' or quad.op != 'MUL' or quad.dest in steps:
+                    continue
+                a, b = quad.args
+                if a in steps and is_int_literal(b):
+                    iv, factor = a, int(b)
+                elif b in steps and is_int_literal(a):
+                    iv, factor = b, int(a)
+                else:
+                    continue
+                if (iv, factor) not in derived:
+                    temp = cfg.new_temp_name()
+                    derived[(iv, factor)] = temp
+                    init.append(Quad('binop', dest=temp, op='MUL', args=[iv, str(factor)]))
+                block.quads[index] = Quad('copy', dest=quad.dest, args=[derived[(iv, factor)]])
+                reduced += 1
+
+        if not derived:
+            return 0
+
+        # advance every derived temp right after its induction variable
+        for block in loop_blocks:
+            new_quads = []
+            for quad in block.quads:
+                new_quads.append(quad)
+                if quad.kind == 'binop' and quad.dest in steps and self._induction_step(quad) is not None:
+                    for (iv, factor), temp in derived.items():
+                        if iv == quad.dest:
+                            new_quads.append(Quad('binop', dest=temp, op='ADD',
+                                                  args=[temp, str(steps[iv] * factor)]))
+            block.quads = new_quads
+
+        self._insert_preheader(cfg, header, body, init)
+        return reduced
+
+    def _induction_step(self, quad):
+        """Increment c when quad is 'i = i ADD c' / 'i = c ADD i' / 'i = i SUB c'"""
+        if quad.kind != 'binop':
+            return None
+        a, b = quad.args
+        if quad.op == 'ADD' and a == quad.dest and is_int_literal(b):
+            return int(b)
+        if quad.op == 'ADD' and b == quad.dest and is_int_literal(a):
+            return int(a)
+        if quad.op == 'SUB' and a == quad.dest and is_int_literal(b):
+            return -int(b)
+        return None
+
+    # --- DEAD CODE ---
+
+    def dead_code_elimination(self, cfg):
+        """Remove unreachable blocks and assignments whose result is never read.
+
+        Driven by the backward liveness of the CFG and repeated until nothing
+        changes, since deleting one dead store can make its operands dead.
+        Calls are kept for their side effects but lose an unused result.
+        Returns (unreachable quads removed, dead assignments removed).
+        """
+        unreachable = cfg.remove_unreachable_blocks()
+        dead = 0
+
+        changed = True
+        while changed:
+            changed = False
+            live_in, live_out = cfg.liveness()
+            for block in cfg.blocks:
+                live = set(live_out[block.id])
+                kept = []
+                for quad in reversed(block.quads):
+                    dest = quad.defines()
+                    if dest and dest not in live:
+                        if not quad.has_side_effects():
+                            dead += 1
+                            changed = True
+                            continue
+                        if quad.kind == 'call':
+                            quad.dest = None
+                    if dest:
+                        live.discard(dest)
+                    live.update(quad.uses())
+                    kept.append(quad)
+                block.quads = list(reversed(kept))
+
+        return unreachable, dead
+
+    # --- CFG SIMPLIFICATION ---
+
+    def simplify_cfg(self, cfg):
+        """Clean up the jump structure left by the if/for lowering.
+
+        Threads jumps through blocks that only jump elsewhere, turns
+        'IF c GOTO L1 / GOTO L2 / L1:' into a single inverted branch, moves a
+        block right after its only predecessor, drops jumps to the next block
+        and labels nobody jumps to (which merges straight-line blocks), and
+        finally removes blocks left unreachable.
+        Returns the number of quads removed.
+        """
+        removed = 0
+        changed = True
+        while changed:
+            changed = False
+
+            for block in cfg.blocks:
+                term = block.terminator
+                if term is not None and term.is_jump():
+                    target = self._thread_target(cfg, term.label)
+                    if target != term.label:
+                        term.label = target
+                        changed = True
+
+            blocks = cfg.blocks
+            for i in range(len(blocks) - 2):
+                term = blocks[i].terminator
+                middle = blocks[i + 1]
+                if (term is not None and term.kind in ('if_true', 'if_false')
+                        and len(middle.quads) == 1 and middle.quads[0].kind == 'goto'
+                        and blocks[i + 2].label == term.label):
+                    term.kind = 'if_false' if term.kind == 'if_true' else 'if_true'
+                    term.label = middle.quads[0].label
+                    middle.quads = []
+                    removed += 1
+                    changed = True
+
+            for i, block in enumerate(cfg.blocks):
+                term = block.terminator
+                if term is None or term.kind != 'goto':
+                    continue
+                target = cfg.label_to_block.get(term.label)
+                if (target is None or target is block or target is cfg.entry
+                        or target.preds != [block] or target.falls_through()
+                        or i + 1 < len(cfg.blocks) and cfg.blocks[i + 1] is target):
+                    continue
+                cfg.blocks.remove(target)
+                cfg.blocks.insert(cfg.blocks.index(block) + 1, target)
+                changed = True
+                break
+
+            for i, block in enumerate(cfg.blocks[:-1]):
+                term = block.terminator
+                if term is not None and term.is_jump() and term.label == cfg.blocks[i + 1].label:
+                    block.quads.pop()
+                    removed += 1
+                    changed = True
+
+            targets = {q.label for b in cfg.blocks for q in b.quads if q.is_jump()}
+            for block in cfg.blocks:
+                if block.label is not None and block.label not in targets:
+                    block.quads.pop(0)
+                    removed += 1
+                    changed = True
+
+            cfg.build(cfg.linearize())
+            removed += cfg.remove_unreachable_blocks()
+
+        return removed
+
+    def _thread_target(self, cfg, label):
+        """Final label reached from label through blocks that do nothing but jump"""
+        seen = {label}
+        while True:
+            block = cfg.label_to_block.get(label)
+            if block is None:
+                return label
+            body = [q for q in block.quads if q.kind != 'label']
+            if len(body) == 1 and body[0].kind == 'goto' and body[0].label not in seen:
+                label = body[0].label
+            elif not body and block.id + 1 < len(cfg.blocks) and cfg.blocks[block.id + 1].label not in (None, *seen):
+                # empty block: falls straight into the next labelled block
+                label = cfg.blocks[block.id + 1].label
+            else:
+                return label
+            seen.add(label)
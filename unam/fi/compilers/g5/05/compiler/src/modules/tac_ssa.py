@@ -0,0 +1,246 @@
+# modules/tac_ssa.py
+from modules.tac_cfg import BasicBlock, Quad, is_temp
+
+
+class SSAForm:
+    """Static single assignment form for one ControlFlowGraph.
+
+    construct() inserts pruned phis at the dominance frontiers of every
+    definition and renames each definition to a fresh version 'name.N'
+    (TACGenerator never produces dotted variables, so versions cannot clash
+    with source names). A name read before any definition, such as a
+    global, keeps its plain spelling as version 0.
+
+    destruct() turns phis into copies on the incoming edges and merges the
+    versions of every name back together wherever their live ranges do not
+    overlap, so the copies mostly disappear again.
+    """
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.origin = {}  # version -> original name
+        self.counter = {}
+
+    # --- CONSTRUCTION ---
+
+    def construct(self):
+        """Put the function into SSA form; returns the number of phis inserted"""
+        cfg = self.cfg
+        cfg.remove_unreachable_blocks()
+        if cfg.entry.preds:
+            # phis need every incoming value on an edge, including the one from the caller
+            cfg.blocks.insert(0, BasicBlock(0, []))
+            cfg.rebuild_edges()
+
+        idom = cfg.immediate_dominators()
+        frontiers = cfg.dominance_frontiers(idom)
+        live_in, _ = cfg.liveness()
+        inserted = self._insert_phis(frontiers, live_in)
+
+        children = {block.id: [] for block in cfg.blocks}
+        for block_id, parent in idom.items():
+            if parent is not None:
+                children[parent].append(cfg.blocks[block_id])
+        self._rename_blocks(cfg.entry, children, {})
+        return inserted
+
+    def _insert_phis(self, frontiers, live_in):
+        def_blocks = {}
+        for block in self.cfg.blocks:
+            for quad in block.quads:
+                if quad.defines():
+                    def_blocks.setdefault(quad.defines(), set()).add(block.id)
+
+        inserted = 0
+        for name, blocks in def_blocks.items():
+            has_phi = set()
+            work = list(blocks)
+            while work:
+                for block_id in frontiers[work.pop()]:
+                    # pruned SSA: no phi where the name is dead anyway
+                    if block_id in has_phi or name not in live_in[block_id]:
+                        continue
+                    block = self.cfg.blocks[block_id]
+                    phi = Quad('phi', dest=name, args=[name] * len(block.preds))
+                    phi.sources = list(block.preds)
+                    block.quads.insert(self._phi_position(block), phi)
+                    has_phi.add(block_id)
+                    inserted += 1
+                    if block_id not in blocks:
+                        work.append(block_id)
+        return inserted
+
+    def _phi_position(self, block):
+        index = 1 if block.label else 0
+        while index < len(block.quads) and block.quads[index].kind == 'phi':
+            index += 1
+        return index
+
+    def _rename_blocks(self, root, children, stacks):
+        # dominator tree order with an explicit stack, as in TACOptimizer._number_ebb:
+        # a long chain of ifs makes the tree deeper than Python's recursion limit.
+        # The names a block pushed come off once every block it dominates is done.
+        work = [root]
+        while work:
+            item = work.pop()
+            if isinstance(item, list):
+                for name in item:
+                    stacks[name].pop()
+                continue
+            work.append(self._rename_block(item, stacks))
+            work.extend(reversed(children[item.id]))
+
+    def _rename_block(self, block, stacks):
+        """Rename one block's quads and its successors' phi arguments; the names it pushed"""
+        pushed = []
+        for quad in block.quads:
+            if quad.kind != 'phi':
+                quad.replace_uses({name: self._current(stacks, name) for name in quad.uses()})
+            dest = quad.defines()
+            if dest:
+                version = self._new_version(dest)
+                stacks.setdefault(dest, []).append(version)
+                pushed.append(dest)
+                quad.dest = version
+
+        for succ in block.succs:
+            for quad in succ.quads:
+                if quad.kind != 'phi':
+                    continue
+                for index, source in enumerate(quad.sources):
+                    if source is block:
+                        quad.args[index] = self._current(stacks, self.origin.get(quad.dest, quad.dest))
+        return pushed
+
+    def _current(self, stacks, name):
+        versions = stacks.get(name)
+        return versions[-1] if versions else name
+
+    def _new_version(self, name):
+        self.counter[name] = self.counter.get(name, 0) + 1
+        version = f"{name}.{self.counter[name]}"
+        self.origin[version] = name
+        return version
+
+    # --- DESTRUCTION ---
+
+    def destruct(self):
+        """Leave SSA form; returns the number of copies that survive coalescing"""
+        cfg = self.cfg
+        edge_copies = []
+        for block in cfg.blocks:
+            phis = [q for q in block.quads if q.kind == 'phi']
+            if not phis:
+                continue
+            block.quads = [q for q in block.quads if q.kind != 'phi']
+            copies = {}
+            for phi in phis:
+                for source, arg in zip(phi.sources, phi.args):
+                    copies.setdefault(source, []).append((phi.dest, arg))
+            for source, pairs in copies.items():
+                edge_copies.append((source, block, self._sequentialize(pairs)))
+
+        # decide placement on the unsplit graph, then rebuild once
+        for source, block, quads in edge_copies:
+            if quads:
+                self._place_copies(source, block, quads)
+        cfg.rebuild_edges()
+
+        inserted = sum(len(quads) for _, _, quads in edge_copies)
+        return inserted - self._merge_versions()
+
+    def _sequentialize(self, pairs):
+        """Order the parallel copies of one edge, breaking cycles with a new version"""
+        pending = [(dest, src) for dest, src in pairs if dest != src]
+        quads = []
+        while pending:
+            for index, (dest, src) in enumerate(pending):
+                if all(other_src != dest for _, other_src in pending):
+                    quads.append(Quad('copy', dest=dest, args=[src]))
+                    pending.pop(index)
+                    break
+            else:
+                dest = pending[0][0]
+                saved = self._new_version(self.origin.get(dest, dest))
+                quads.append(Quad('copy', dest=saved, args=[dest]))
+                pending = [(d, saved if s == dest else s) for d, s in pending]
+        return quads
+
+    def _place_copies(self, source, block, quads):
+        cfg = self.cfg
+        term = source.terminator
+        if len(source.succs) == 1:
+            position = len(source.quads) - 1 if term is not None else len(source.quads)
+            source.quads[position:position] = quads
+        elif term is not None and term.label == block.label:
+            # critical edge taken by the jump: route it through a new block
+            label = cfg.new_label(f"{block.label}_ssa")
+            term.label = label
+            self._append_block([Quad('label', label=label)] + quads + [Quad('goto', label=block.label)])
+        else:
+            # critical fall-through edge: the new block sits between source and block
+            cfg.blocks.insert(cfg.blocks.index(source) + 1, BasicBlock(-1, quads))
+
+    def _append_block(self, quads):
+        blocks = self.cfg.blocks
+        last = blocks[-1]
+        if last.falls_through():
+            # the function used to end by falling off its last block; keep it that way
+            end_label = self.cfg.new_label("L")
+            blocks.append(BasicBlock(-1, [Quad('goto', label=end_label)]))
+            blocks.append(BasicBlock(-1, quads))
+            blocks.append(BasicBlock(-1, [Quad('label', label=end_label)]))
+        else:
+            blocks.append(BasicBlock(-1, quads))
+
+    def _merge_versions(self):
+        """Give non-interfering versions of a name their original spelling back"""
+        cfg = self.cfg
+        _, live_out = cfg.liveness()
+        graph = cfg.interference_graph(live_out)
+
+        used = {self.origin.get(name, name) for name in graph}
+        next_temp = max((int(name[1:]) for name in used if is_temp(name)), default=-1) + 1
+
+        def order(name):
+            original = self.origin.get(name, name)
+            return (original, 0 if name == original else int(name.rsplit('.', 1)[1]))
+
+        groups = {}  # original -> [(spelling, members)]
+        mapping = {}
+        for name in sorted(graph, key=order):
+            original = self.origin.get(name, name)
+            slots = groups.setdefault(original, [])
+            for spelling, members in slots:
+                if not members & graph[name]:
+                    members.add(name)
+                    break
+            else:
+                if not slots:
+                    spelling = original
+                elif is_temp(original):
+                    spelling = f"t{next_temp}"
+                    next_temp += 1
+                else:
+                    index = 1
+                    while f"{original}_{index}" in used:
+                        index += 1
+                    spelling = f"{original}_{index}"
+                used.add(spelling)
+                members = {name}
+                slots.append((spelling, members))
+            mapping[name] = spelling
+
+        removed = 0
+        for block in cfg.blocks:
+            kept = []
+            for quad in block.quads:
+                quad.replace_uses(mapping)
+                if quad.defines():
+                    quad.dest = mapping.get(quad.dest, quad.dest)
+                if quad.kind == 'copy' and quad.dest == quad.args[0]:
+                    removed += 1
+                    continue
+                kept.append(quad)
+            block.quads = kept
+        return removed
@@ -0,0 +1,327 @@
+# modules/tac_vm.py
+import ast
+from array import array
+
+from modules.tac_cfg import TACProgram, ControlFlowGraph, is_int_literal, is_name
+
+# Register-based bytecode for the TAC, run by VirtualMachine without any
+# toolchain. Every instruction is four ints, op a b c; a, b and c are
+# register numbers of the current frame (constants are preloaded into
+# registers of their own), instruction numbers for jumps, or table indices.
+OPCODES = [
+    'MOVE',                                    # a = b
+    'ADD', 'SUB', 'MUL', 'DIV', 'MOD',         # a = b op c, 32-bit wraparound
+    'LT', 'LE', 'GT', 'GE', 'EQ', 'NE',        # a = 1 if b op c else 0
+    'JMP',                                     # pc = a (an instruction number)
+    'JT', 'JF',                                # pc = b if a is (not) zero
+    'JLT', 'JLE', 'JGT', 'JGE', 'JEQ', 'JNE',  # pc = c if a op b
+    'CALL',                                    # a = functions[b](*call_args[c]); a < 0 drops it
+    'PRINT',                                   # fmt.Println(*call_args[a])
+    'RET',                                     # return a (0 when a < 0)
+]
+(MOVE, ADD, SUB, MUL, DIV, MOD, LT, LE, GT, GE, EQ, NE, JMP, JT, JF,
+ JLT, JLE, JGT, JGE, JEQ, JNE, CALL, PRINT, RET) = range(len(OPCODES))
+
+BINARY_OPCODES = {'ADD': ADD, 'SUB': SUB, 'MUL': MUL, 'DIV': DIV, 'MOD': MOD,
+                  'LT': LT, 'LE': LE, 'GT': GT, 'GE': GE, 'EQ': EQ, 'NE': NE}
+# compare-and-branch forms of a comparison and of its negation
+BRANCH_OPCODES = {'LT': JLT, 'LE': JLE, 'GT': JGT, 'GE': JGE, 'EQ': JEQ, 'NE': JNE}
+NEGATED_OPS = {'LT': 'GE', 'LE': 'GT', 'GT': 'LE', 'GE': 'LT', 'EQ': 'NE', 'NE': 'EQ'}
+# calls deeper than this are taken for runaway recursion (a native build's stack overflow)
+MAX_CALL_DEPTH = 1_000_000
+
+
+class VMError(RuntimeError):
+    pass
+
+
+class BytecodeFunction:
+    """Code of one function plus the initial contents of its frame"""
+
+    def __init__(self, name, param_count, register_names, constants):
+        self.name = name
+        self.param_count = param_count
+        self.register_names = register_names  # registers holding variables and temps
+        self.constants = constants            # constant pool, in the registers after them
+        self.code = array('i')
+
+    @property
+    def frame_template(self):
+        return [0] * len(self.register_names) + list(self.constants)
+
+    def emit(self, op, a=0, b=0, c=0):
+        self.code.extend((op, a, b, c))
+        return len(self.code) - 4
+
+
+class BytecodeProgram:
+    def __init__(self):
+        self.functions = []
+        self.function_index = {}
+        self.call_args = []  # argument register tuples of CALL and PRINT
+
+    def disassemble(self):
+        """Readable listing, for the build folder"""
+        lines = []
+        for function in self.functions:
+            lines.append(f"{function.name}: params={function.param_count} registers={len(function.register_names)} "
+                         f"constants={list(function.constants)!r}")
+            names = function.register_names + [f"k{index}" for index in range(len(function.constants))]
+            for pc in range(0, len(function.code), 4):
+                op, a, b, c = function.code[pc:pc + 4]
+                lines.append(f"  {pc // 4:04d} {OPCODES[op]:<5} {self.describe(op, a, b, c, names)}")
+        return lines
+
+    def describe(self, op, a, b, c, names):
+        if op in (CALL, PRINT):
+            args = ', '.join(names[r] for r in self.call_args[c if op == CALL else a])
+            if op == PRINT:
+                return args
+            dest = names[a] if a >= 0 else '_'
+            return f"{dest} = {self.functions[b].name}({args})"
+        if op == JMP:
+            return f"-> {a:04d}"
+        if op in (JT, JF):
+            return f"{names[a]} -> {b:04d}"
+        if JLT <= op <= JNE:
+            return f"{names[a]}, {names[b]} -> {c:04d}"
+        if op == RET:
+            return names[a] if a >= 0 else ''
+        if op == MOVE:
+            return f"{names[a]}, {names[b]}"
+        return f"{names[a]}, {names[b]}, {names[c]}"
+
+
+class BytecodeCompiler:
+    """TAC (optimized or not) to a BytecodeProgram"""
+
+    def compile(self, tac_code):
+        tac = TACProgram(tac_code)
+        self.strings = {quad.dest: self.string_value(quad.args[0]) for quad in tac.data}
+        program = BytecodeProgram()
+        for index, func in enumerate(tac.functions):
+            program.function_index[func.name] = index
+        for func in tac.functions:
+            program.functions.append(self.compile_function(func, program))
+        if 'main' not in program.function_index:
+            raise VMError("The program has no main function")
+        return program
+
+    def string_value(self, literal):
+        try:
+            return ast.literal_eval(literal)
+        except (ValueError, SyntaxError):
+            return literal.strip('"')
+
+    def compile_function(self, func, program):
+        params = [quad.dest for quad in func.quads if quad.kind == 'param']
+        defined = set(params) | {quad.defines() for quad in func.quads if quad.defines()}
+        names = list(params)
+        for quad in func.quads:
+            if quad.defines() and quad.defines() not in names:
+                names.append(quad.defines())
+
+        registers = {name: index for index, name in enumerate(names)}
+        constants = []
+        constant_registers = {}
+
+        def register(operand):
+            if operand in registers:
+                return registers[operand]
+            if is_int_literal(operand):
+                value = int(operand)
+            elif operand in self.strings:
+                value = self.strings[operand]
+            elif is_name(operand) and operand not in defined:
+                # a name no function defines reads as a zeroed global, as in the NASM backend
+                value = 0
+            else:
+                raise VMError(f"Unknown operand '{operand}' in {func.name}")
+            key = (type(value), value)
+            if key not in constant_registers:
+                constant_registers[key] = len(names) + len(constants)
+                constants.append(value)
+            return constant_registers[key]
+
+        function = BytecodeFunction(func.name, len(params), names, constants)
+        fused = self.fused_comparisons(func)
+        labels = {}
+        jumps = []  # (position of the target field, label)
+
+        quads = func.quads
+        index = 0
+        while index < len(quads):
+            quad = quads[index]
+            kind = quad.kind
+            if kind == 'label':
+                labels[quad.label] = len(function.code) // 4
+            elif kind == 'param':
+                pass
+            elif kind == 'copy':
+                function.emit(MOVE, register(quad.dest), register(quad.args[0]))
+            elif kind == 'binop' and id(quad) in fused:
+                branch = quads[index + 1]
+                op = quad.op if branch.kind == 'if_true' else NEGATED_OPS[quad.op]
+                position = function.emit(BRANCH_OPCODES[op], register(quad.args[0]), register(quad.args[1]))
+                jumps.append((position + 3, branch.label))
+                index += 1
+            elif kind == 'binop':
+                function.emit(BINARY_OPCODES[quad.op], register(quad.dest),
+                              register(quad.args[0]), register(quad.args[1]))
+            elif kind == 'goto':
+                position = function.emit(JMP)
+                jumps.append((position + 1, quad.label))
+            elif kind in ('if_true', 'if_false'):
+                position = function.emit(JT if kind == 'if_true' else JF, register(quad.args[0]))
+                jumps.append((position + 2, quad.label))
+            elif kind == 'call':
+                args = tuple(register(arg) for arg in quad.args)
+                program.call_args.append(args)
+                if quad.op == 'fmt.Println':
+                    function.emit(PRINT, len(program.call_args) - 1)
+                    if quad.dest:
+                        function.emit(MOVE, register(quad.dest), register('0'))
+                elif quad.op in program.function_index:
+                    callee = program.function_index[quad.op]
+                    dest = register(quad.dest) if quad.dest else -1
+                    function.emit(CALL, dest, callee, len(program.call_args) - 1)
+                else:
+                    raise VMError(f"Call to unknown function '{quad.op}' in {func.name}")
+            elif kind == 'return':
+                function.emit(RET, register(quad.args[0]) if quad.args else -1)
+            else:
+                raise VMError(f"Unsupported TAC line in {func.name}: {quad.to_tac()}")
+            index += 1
+        function.emit(RET, -1)
+
+        for position, label in jumps:
+            if label not in labels:
+                raise VMError(f"Undefined label '{label}' in {func.name}")
+            function.code[position] = labels[label]
+        return function
+
+    def fused_comparisons(self, func):
+        """ids of the comparisons whose 0/1 value only feeds the IF_TRUE/IF_FALSE after them"""
+        cfg = ControlFlowGraph(func)
+        _, live_out = cfg.liveness()
+        fused = set()
+        for block in cfg.blocks:
+            quads = block.quads
+            if len(quads) >= 2:
+                compare, branch = quads[-2], quads[-1]
+                if compare.kind == 'binop' and compare.op in BRANCH_OPCODES \
+                        and branch.kind in ('if_true', 'if_false') and branch.args == [compare.dest] \
+                        and compare.dest not in compare.args and compare.dest not in live_out[block.id]:
+                    fused.add(id(compare))
+        return fused
+
+
+class VirtualMachine:
+    """Interpreter loop for a BytecodeProgram; output goes to write()"""
+
+    def __init__(self, program, write=None):
+        self.program = program
+        self.output = []
+        self.write = write or self.output.append
+        # decoded once into a tuple per instruction; unpacking one is cheaper
+        # than slicing or indexing the array on every step
+        self.code = [list(zip(*[iter(function.code)] * 4)) for function in program.functions]
+        self.templates = [function.frame_template for function in program.functions]
+
+    def run(self):
+        """Run main; returns its exit code"""
+        return self.execute(self.program.function_index['main'], ())
+
+    def execute(self, function_index, args):
+        """Run one function to its RET. Calls it makes are frames of this same
+        loop, not Python calls, so Python's recursion limit does not bound them."""
+        code = self.code[function_index]
+        regs = self.templates[function_index][:]
+        regs[:len(args)] = args
+        call_args = self.program.call_args
+        codes, templates = self.code, self.templates
+        frames = []  # (code, regs, pc, destination register, function index) of every caller
+        pc = 0
+        while True:
+            op, a, b, c = code[pc]
+            pc += 1
+            if op == MOVE:
+                regs[a] = regs[b]
+            elif op == ADD:
+                regs[a] = ((regs[b] + regs[c] + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+            elif op == SUB:
+                regs[a] = ((regs[b] - regs[c] + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+            elif op == JLT:
+                if regs[a] < regs[b]:
+                    pc = c
+            elif op == JGE:
+                if regs[a] >= regs[b]:
+                    pc = c
+            elif op == JMP:
+                pc = a
+            elif op == JLE:
+                if regs[a] <= regs[b]:
+                    pc = c
+            elif op == JGT:
+                if regs[a] > regs[b]:
+                    pc = c
+            elif op == JEQ:
+                if regs[a] == regs[b]:
+                    pc = c
+            elif op == JNE:
+                if regs[a] != regs[b]:
+                    pc = c
+            elif op == MUL:
+                regs[a] = ((regs[b] * regs[c] + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+            elif op == JF:
+                if not regs[a]:
+                    pc = b
+            elif op == JT:
+                if regs[a]:
+                    pc = b
+            elif op == CALL:
+                if len(frames) >= MAX_CALL_DEPTH:
+                    raise VMError(f"Call depth above {MAX_CALL_DEPTH} in {self.program.functions[b].name}")
+                frames.append((code, regs, pc, a, function_index))
+                args = [regs[r] for r in call_args[c]]
+                function_index, code, regs, pc = b, codes[b], templates[b][:], 0
+                regs[:len(args)] = args
+            elif op == RET:
+                result = regs[a] if a >= 0 else 0
+                if not frames:
+                    return result
+                code, regs, pc, a, function_index = frames.pop()
+                if a >= 0:
+                    regs[a] = result
+            elif op == DIV or op == MOD:
+                left, right = regs[b], regs[c]
+                if right == 0:
+                    raise VMError("integer divide by zero")
+                quotient = abs(left) // abs(right)
+                if (left < 0) != (right < 0):
+                    quotient = -quotient
+                value = quotient if op == DIV else left - quotient * right
+                regs[a] = ((value + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+            elif op == LT:
+                regs[a] = 1 if regs[b] < regs[c] else 0
+            elif op == LE:
+                regs[a] = 1 if regs[b] <= regs[c] else 0
+            elif op == GT:
+                regs[a] = 1 if regs[b] > regs[c] else 0
+            elif op == GE:
+                regs[a] = 1 if regs[b] >= regs[c] else 0
+            elif op == EQ:
+                regs[a] = 1 if regs[b] == regs[c] else 0
+            elif op == NE:
+                regs[a] = 1 if regs[b] != regs[c] else 0
+            elif op == PRINT:
+                self.write(' '.join(str(regs[r]) for r in call_args[a]))
+            else:
+                raise VMError(f"Bad opcode {op} in {self.program.functions[function_index].name}")
+
+
+def run_tac_vm(tac_code, write=None):
+    """Compile TAC to bytecode and run it; returns (output lines, exit code)"""
+    vm = VirtualMachine(BytecodeCompiler().compile(tac_code), write)
+    exit_code = vm.run()
+    return vm.output, exit_code
@@ -0,0 +1,118 @@
+# modules/toolchain.py
+import shlex
+import subprocess
+import tempfile
+from contextlib import contextmanager
+
+# Flags for the two gcc runs of a build: compiling the generated C and linking
+# the NASM object. Both get the same optimization level, -march, LTO and extra
+# flags, and every command is kept so the log shows exactly what was run.
+
+OPT_LEVELS = ('0', '1', '2', '3', 's', 'fast', 'g')
+
+
+def check_opt_level(level):
+    if level not in OPT_LEVELS:
+        raise ValueError(f"Unknown optimization level '-O{level}' (expected one of: "
+                         f"{', '.join('-O' + level for level in OPT_LEVELS)})")
+    return level
+
+
+def is_toolchain_arg(arg):
+    return (arg.startswith("-O") or arg.startswith("--march=") or arg == "--lto"
+            or arg.startswith("--cflags="))
+
+
+class Toolchain:
+    def __init__(self, opt_level=None, march=None, lto=False, cflags=None):
+        self.opt_level = None if opt_level is None else check_opt_level(opt_level)
+        self.march = march
+        self.lto = lto
+        self.cflags = list(cflags or [])
+        self.commands = []  # every gcc command line run, for the log
+
+    def parse_arg(self, arg):
+        """Take a command line argument if it is a toolchain flag; True when it was"""
+        if not is_toolchain_arg(arg):
+            return False
+        if arg.startswith("-O"):
+            self.opt_level = check_opt_level(arg[2:] or '1')
+        elif arg.startswith("--march="):
+            self.march = arg[len("--march="):]
+        elif arg == "--lto":
+            self.lto = True
+        else:
+            self.cflags += shlex.split(arg[len("--cflags="):])
+        return True
+
+    def flags(self):
+        flags = []
+        if self.opt_level is not None:
+            flags.append(f"-O{self.opt_level}")
+        if self.march:
+            flags.append(f"-march={self.march}")
+        if self.lto:
+            flags.append("-flto")
+        return flags + self.cflags
+
+    def gcc_command(self, inputs, output):
+        return ["gcc", *self.flags(), *[str(path) for path in inputs], "-o", str(output)]
+
+    def gcc(self, inputs, output, **kwargs):
+        """Run gcc on inputs (C sources or objects) with these flags"""
+        command = self.gcc_command(inputs, output)
+        self.commands.append(shlex.join(command))
+        return subprocess.run(command, **kwargs)
+
+    @contextmanager
+    def gcc_stdin(self, output, language='c', timeout=None):
+        """Run gcc on source written to the yielded stream (gcc -x c -), so no file is needed.
+
+        Raises subprocess.CalledProcessError, with gcc's messages as stderr, when
+        gcc fails, also when it exits before reading all of the source (a bad flag,
+        say), and subprocess.TimeoutExpired when it is still running timeout
+        seconds after the stream is closed.
+        """
+        command = ["gcc", *self.flags(), "-x", language, "-", "-o", str(output)]
+        self.commands.append(shlex.join(command))
+        # gcc's messages go to a file: a full stderr pipe would block it while we still write
+        with tempfile.TemporaryFile(mode="w+") as errors:
+            process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=errors, text=True)
+            broken_pipe = None
+            try:
+                yield process.stdin
+                process.stdin.close()
+            except BrokenPipeError as e:
+                # gcc already exited; its exit status and messages tell why
+                broken_pipe = e
+                try:
+                    process.stdin.close()
+                except BrokenPipeError:
+                    pass
+            except BaseException:
+                process.kill()
+                process.wait()
+                raise
+            try:
+                returncode = process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+                raise
+            errors.seek(0)
+            if returncode != 0:
+                raise subprocess.CalledProcessError(returncode, command, stderr=errors.read())
+            if broken_pipe is not None:
+                raise broken_pipe
+
+    def version(self):
+        try:
+            result = subprocess.run(["gcc", "--version"], capture_output=True, text=True, timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            return "gcc not found"
+        return result.stdout.splitlines()[0] if result.stdout else "unknown"
+
+    def get_report(self):
+        lines = [f"Compiler: {self.version()}", f"Flags: {' '.join(self.flags()) or '(none)'}"]
+        lines += [f"Command: {command}" for command in self.commands]
+        return lines
@@ -1,5 +1,4 @@
 # modules/utilities.py (modificado)
-from nltk import Tree as NLTKTree
 from pathlib import Path
 import re
 import os
@@ -69,6 +68,8 @@ def tokens_to_file(category, token_count, source_file):
     return out_path
 
 def to_nltk_tree(node):
+    from nltk import Tree as NLTKTree  # imported on use: nltk alone is most of the startup time
+
     # If it's already an NLTK tree, return it
     if isinstance(node, NLTKTree):
         return node
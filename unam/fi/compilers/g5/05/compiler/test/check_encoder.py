@@ -0,0 +1,261 @@
+# test/check_encoder.py
+import struct
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from modules.nasm_encoder import X86Assembler, R_X86_64_PC32, R_X86_64_PLT32
+from modules.elf_object import build_elf_object, EM_X86_64, ET_REL, STT_SECTION
+
+# Checks the internal assembler (modules/nasm_encoder.py, modules/elf_object.py)
+# without nasm: every instruction form TACToNASM64 emits, jumps on both sides
+# of the rel8/rel32 boundary and the relocations of an object, against bytes
+# taken from an independent assembler. The expected encodings are the ones
+# nasm picks (short immediates, the eax forms of the ALU ops, shl by 1 as D1).
+#
+#   python test/check_encoder.py
+#
+# --assembler=verify checks whole programs against nasm where it is installed.
+
+INSTRUCTIONS = [
+    # mov: immediates, registers (REX.R/REX.B for r8-r15, REX.W for the 64-bit saves),
+    # rbp-based slots with disp8 and disp32, rsp and r12 bases (SIB), rbp and r13 bases (disp8 0)
+    ("mov eax, 0",                  "B8 00 00 00 00"),
+    ("mov r10d, 5",                 "41 BA 05 00 00 00"),
+    ("mov eax, -1",                 "B8 FF FF FF FF"),
+    ("mov ecx, eax",                "89 C1"),
+    ("mov r9d, r10d",               "45 89 D1"),
+    ("mov edi, r8d",                "44 89 C7"),
+    ("mov eax, dword [rbp-8]",      "8B 45 F8"),
+    ("mov eax, [rbp-16]",           "8B 45 F0"),
+    ("mov r11d, dword [rbp-200]",   "44 8B 9D 38 FF FF FF"),
+    ("mov r12d, dword [rbp+16]",    "44 8B 65 10"),
+    ("mov dword [rbp-16], eax",     "89 45 F0"),
+    ("mov dword [rbp-16], 0",       "C7 45 F0 00 00 00 00"),
+    ("mov dword [rbp-300], -5",     "C7 85 D4 FE FF FF FB FF FF FF"),
+    ("mov [rbp-8], ecx",            "89 4D F8"),
+    ("mov [rbp-8], rbx",            "48 89 5D F8"),
+    ("mov rbx, [rbp-8]",            "48 8B 5D F8"),
+    ("mov [rbp-16], r12",           "4C 89 65 F0"),
+    ("mov r15, [rbp-48]",           "4C 8B 7D D0"),
+    ("mov dword [rsp+32], eax",     "89 44 24 20"),
+    ("mov dword [rsp+40], r9d",     "44 89 4C 24 28"),
+    ("mov eax, dword [rsp]",        "8B 04 24"),
+    ("mov eax, dword [r12]",        "41 8B 04 24"),
+    ("mov eax, dword [r13]",        "41 8B 45 00"),
+    ("mov eax, dword [rbp]",        "8B 45 00"),
+    ("mov rbp, rsp",                "48 89 E5"),
+    ("mov rsp, rbp",                "48 89 EC"),
+
+    # ALU ops: imm8 (83), imm32 (81) and the short eax forms (05, 3D), both directions
+    ("add eax, 7",                  "83 C0 07"),
+    ("add eax, 1000",               "05 E8 03 00 00"),
+    ("add ecx, 1000",               "81 C1 E8 03 00 00"),
+    ("add r10d, ebx",               "41 01 DA"),
+    ("add eax, dword [rbp-24]",     "03 45 E8"),
+    ("add dword [rbp-16], eax",     "01 45 F0"),
+    ("add dword [rbp-8], 3",        "83 45 F8 03"),
+    ("sub rsp, 64",                 "48 83 EC 40"),
+    ("sub rsp, 256",                "48 81 EC 00 01 00 00"),
+    ("sub eax, 5",                  "83 E8 05"),
+    ("sub ecx, eax",                "29 C1"),
+    ("sub r8d, r15d",               "45 29 F8"),
+    ("sub eax, dword [rbp-8]",      "2B 45 F8"),
+    ("sub dword [rbp-8], eax",      "29 45 F8"),
+    ("sub dword [rbp-88], 1000",    "81 6D A8 E8 03 00 00"),
+    ("cmp eax, dword [rbp-8]",      "3B 45 F8"),
+    ("cmp r10d, 1",                 "41 83 FA 01"),
+    ("cmp r9d, r10d",               "45 39 D1"),
+    ("cmp dword [rbp-8], 0",        "83 7D F8 00"),
+    ("cmp eax, 100000",             "3D A0 86 01 00"),
+    ("xor eax, eax",                "31 C0"),
+    ("xor r8d, r8d",                "45 31 C0"),
+    ("test ebx, ebx",               "85 DB"),
+    ("test r11d, r11d",             "45 85 DB"),
+
+    # inc, dec, neg
+    ("inc r9d",                     "41 FF C1"),
+    ("dec eax",                     "FF C8"),
+    ("inc dword [rbp-32]",          "FF 45 E0"),
+    ("dec dword [rbp-80]",          "FF 4D B0"),
+    ("neg eax",                     "F7 D8"),
+    ("neg r8d",                     "41 F7 D8"),
+
+    # division and multiplication
+    ("idiv ecx",                    "F7 F9"),
+    ("idiv r10d",                   "41 F7 FA"),
+    ("imul ecx",                    "F7 E9"),
+    ("imul esi, r8d",               "41 0F AF F0"),
+    ("imul eax, dword [rbp-40]",    "0F AF 45 D8"),
+    ("imul eax, eax, 1000000",      "69 C0 40 42 0F 00"),
+    ("imul eax, dword [rbp-8], 1",  "6B 45 F8 01"),
+    ("imul r9d, r9d, 3",            "45 6B C9 03"),
+    ("cdq",                         "99"),
+
+    # shifts, by 1 (D1) and by an immediate (C1)
+    ("shl eax, 2",                  "C1 E0 02"),
+    ("shl eax, 1",                  "D1 E0"),
+    ("shr eax, 31",                 "C1 E8 1F"),
+    ("sar edx, 18",                 "C1 FA 12"),
+    ("shl dword [rbp-88], 1",       "D1 65 A8"),
+    ("sar r11d, 1",                 "41 D1 FB"),
+
+    # lea with base, index and scale
+    ("lea r10d, [rbx-1]",           "44 8D 53 FF"),
+    ("lea eax, [rcx+rdx]",          "8D 04 11"),
+    ("lea r8d, [r9+r10*4]",         "47 8D 04 91"),
+    ("lea eax, [rax+rax*2]",        "8D 04 40"),
+
+    # setcc and the movzx after it
+    ("sete al",                     "0F 94 C0"),
+    ("setne al",                    "0F 95 C0"),
+    ("setl al",                     "0F 9C C0"),
+    ("setle al",                    "0F 9E C0"),
+    ("setg al",                     "0F 9F C0"),
+    ("setge al",                    "0F 9D C0"),
+    ("movzx eax, al",               "0F B6 C0"),
+
+    # frame
+    ("push rbp",                    "55"),
+    ("pop rbp",                     "5D"),
+    ("push rbx",                    "53"),
+    ("push r12",                    "41 54"),
+    ("pop r15",                     "41 5F"),
+    ("ret",                         "C3"),
+]
+
+
+def pad(count):
+    """count one-byte instructions (cdq, 99) to put a jump target out of short range"""
+    return "    cdq\n" * count, "99 " * count
+
+
+def branch_cases():
+    """(source, expected .text): every jump starts short and is widened only when needed"""
+    cases = [
+        ("L:\n    jmp L", "EB FE"),
+        ("    jmp L\nL:", "EB 00"),
+        ("    call f\nf:\n    ret", "E8 00 00 00 00 C3"),
+    ]
+    code, data = pad(126)
+    cases.append((f"L:\n{code}    jmp L", f"{data}EB 80"))           # -128: still rel8
+    code, data = pad(127)
+    cases.append((f"L:\n{code}    jmp L", f"{data}E9 7C FF FF FF"))  # -129 as rel8, so rel32
+    cases.append((f"    jmp L\n{code}L:", f"EB 7F {data}"))           # +127: still rel8
+    code, data = pad(128)
+    cases.append((f"    jmp L\n{code}L:", f"E9 80 00 00 00 {data}"))
+    code, data = pad(130)
+    for condition, number in (('e', 4), ('ne', 5), ('l', 12), ('le', 14), ('g', 15), ('ge', 13)):
+        cases.append((f"    j{condition} L\nL:", f"{0x70 + number:02X} 00"))
+        cases.append((f"L:\n{code}    j{condition} L", f"{data}0F {0x80 + number:02X} 78 FF FF FF"))
+    return cases
+
+
+# lea of .data and a .bss load (rip-relative), calls to externs with and without
+# wrt ..plt and a call to a local label, which nasm resolves without a relocation
+PROGRAM = """default rel
+section .data
+    pad db 1, 2, 3
+    fmt_int db "%d", 10, 0
+section .bss
+    counter resd 1
+section .text
+global main
+extern printf, exit
+main:
+    lea rdi, [fmt_int]
+    mov eax, dword [counter]
+    call printf wrt ..plt
+    call exit
+    call main
+    ret
+section .note.GNU-stack noalloc noexec nowrite progbits
+"""
+PROGRAM_TEXT = ("48 8D 3D 00 00 00 00  8B 05 00 00 00 00  E8 00 00 00 00  E8 00 00 00 00"
+                "  E8 E4 FF FF FF  C3")
+# (offset, symbol, type, addend); local data goes through its section symbol
+PROGRAM_RELOCATIONS = [
+    (0x03, '.data', R_X86_64_PC32, -1),
+    (0x09, '.bss', R_X86_64_PC32, -4),
+    (0x0E, 'printf', R_X86_64_PLT32, -4),
+    (0x13, 'exit', R_X86_64_PC32, -4),
+]
+
+
+def text_of(source):
+    return bytes(X86Assembler().assemble("section .text\n" + source).sections['.text'])
+
+
+def hex_bytes(data):
+    return ' '.join(f"{byte:02X}" for byte in data)
+
+
+def elf_sections(data):
+    """[(name, type, contents, link)] of an ELF64 object, in header order"""
+    section_headers_offset, = struct.unpack_from('<Q', data, 0x28)
+    count, names_index = struct.unpack_from('<HH', data, 0x3C)
+    headers = [struct.unpack_from('<IIQQQQIIQQ', data, section_headers_offset + 64 * index)
+               for index in range(count)]
+    names = data[headers[names_index][4]:]
+    return [(names[name:names.index(b'\0', name)].decode(), kind, data[offset:offset + size], link)
+            for name, kind, _, _, offset, size, link, *_ in headers]
+
+
+def elf_relocations(data):
+    sections = elf_sections(data)
+    by_name = {name: (contents, link) for name, _, contents, link in sections}
+    symtab, strtab_index = by_name['.symtab']
+    strtab = sections[strtab_index][2]
+    symbols = []
+    for position in range(0, len(symtab), 24):
+        name, info, _, shndx = struct.unpack_from('<IBBH', symtab, position)
+        if info & 0xF == STT_SECTION:
+            symbols.append(sections[shndx][0])
+        else:
+            symbols.append(strtab[name:strtab.index(b'\0', name)].decode())
+    rela = by_name['.rela.text'][0]
+    return [(offset, symbols[info >> 32], info & 0xFFFFFFFF, addend)
+            for offset, info, addend in struct.iter_unpack('<QQq', rela)]
+
+
+def check_program(failures):
+    program = X86Assembler().assemble(PROGRAM)
+    data = build_elf_object(program, 'check.asm')
+    kind, machine = struct.unpack_from('<HH', data, 0x10)
+    if data[:5] != b'\x7fELF\x02' or (kind, machine) != (ET_REL, EM_X86_64):
+        failures.append("object: not a relocatable x86-64 ELF64 file")
+    text = {name: contents for name, _, contents, _ in elf_sections(data)}['.text']
+    if hex_bytes(text) != ' '.join(PROGRAM_TEXT.split()):
+        failures.append(f"object .text: {hex_bytes(text)}, expected {' '.join(PROGRAM_TEXT.split())}")
+    relocations = elf_relocations(data)
+    if relocations != PROGRAM_RELOCATIONS:
+        failures.append(f"object relocations: {relocations}, expected {PROGRAM_RELOCATIONS}")
+
+
+def main():
+    failures = []
+    for line, expected in INSTRUCTIONS:
+        actual = hex_bytes(text_of(f"    {line}"))
+        if actual != expected:
+            failures.append(f"'{line}': {actual}, expected {expected}")
+    cases = branch_cases()
+    for source, expected in cases:
+        actual = hex_bytes(text_of(source))
+        if actual != ' '.join(expected.split()):
+            jump = next(line.strip() for line in source.split('\n') if line.strip().startswith(('j', 'call')))
+            failures.append(f"'{jump}' ({source.count('cdq')} bytes apart): {actual}, expected {expected.strip()}")
+    check_program(failures)
+
+    for failure in failures:
+        print(f"✗ {failure}")
+    checks = len(INSTRUCTIONS) + len(cases) + 1
+    if failures:
+        print(f"{len(failures)} mismatches in {checks} encoder checks")
+        return 1
+    print(f"All {checks} encoder checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,14 @@
+package main
+
+import "fmt"
+
+func sum(n int) int {
+	if (n == 0) {
+		return 0
+	}
+	return n + sum(n - 1)
+}
+
+func main() {
+	fmt.Println(sum(5000)) // Output: 12502500
+}
@@ -0,0 +1,20 @@
+package main
+
+import "fmt"
+
+func main() {
+	total := 0
+	for k := 0; k < 1000000; k++ {
+		n2 := 0
+		n1 := 1
+		for i := 2; i <= 40; i++ {
+			temp := n1
+			n1 = n1 + n2
+			n1 = n1 % 1000000
+			n2 = temp
+		}
+		total = total + n1
+		total = total % 1000003
+	}
+	fmt.Println(total) // Output: 997541
+}
@@ -0,0 +1,16 @@
+package main
+
+import "fmt"
+
+func f(p int) int {
+	if (p < 2) {
+		return p
+	}
+	return 11
+}
+
+func main() {
+	a := f(5)
+	fmt.Println(a > 3 && a != 4) // Output: 1
+	fmt.Println(a)               // Output: 11
+}
@@ -0,0 +1,36 @@
+# test/long_if_chain.py
+import sys
+from pathlib import Path
+
+# Writes a Go program that is one long chain of sequential ifs, for passes
+# that walk the dominator tree or the extended basic blocks: each if nests
+# the rest of the chain one level deeper, so a recursive walk runs out of
+# Python's recursion limit at about 500 of them.
+#
+#   python test/long_if_chain.py [count] [output.go]
+#   python src/main.py build/long_if_chain.go
+#
+# The program prints count + 3 on every backend.
+
+DEFAULT_COUNT = 500
+DEFAULT_OUTPUT = Path(__file__).resolve().parent.parent / "build" / "long_if_chain.go"
+
+
+def long_if_chain(count):
+    lines = ["package main", "", 'import "fmt"', "", "func main() {", "\tx := 3"]
+    for i in range(count):
+        lines += [f"\tif (x > {i}) {{", "\t\tx = x + 1", "\t}"]
+    lines += [f"\tfmt.Println(x) // Output: {count + 3}", "}"]
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT
+    output = Path(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_OUTPUT
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(long_if_chain(count), encoding="utf-8")
+    print(f"{count} ifs written to {output}")
+
+
+if __name__ == "__main__":
+    main()
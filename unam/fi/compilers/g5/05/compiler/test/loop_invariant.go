@@ -0,0 +1,19 @@
+package main
+
+import "fmt"
+
+func work(n int) int {
+	a := n / 3
+	b := n % 7
+	s := 0
+	for i := 0; i < n; i++ {
+		k := a * b + a / 3
+		s = s + k + i
+		s = s % 1000000
+	}
+	return s
+}
+
+func main() {
+	fmt.Println(work(50000000))
+}
@@ -0,0 +1,29 @@
+package main
+
+import "fmt"
+
+func weigh(a int, b int, c int, d int, e int, f int) int {
+	return a*1 + b*2 + c*3 + d*4 + e*5 + f*6
+}
+
+func spread(a int, b int, c int, d int, e int, f int) int {
+	g := a + b
+	h := b - c
+	i := c * d
+	j := d - e
+	k := e + f
+	l := f * a
+	m := g + h
+	n := i - j
+	o := k + l
+	p := weigh(g, h, i, j, k, l)
+	q := weigh(f, e, d, c, b, a)
+	return a + b + c + d + e + f + g + h + i + j + k + l + m + n + o + p - q
+}
+
+func main() {
+	fmt.Println(weigh(1, 2, 3, 4, 5, 6))         // Output: 91
+	fmt.Println(weigh(6, 5, 4, 3, 2, 1))         // Output: 56
+	fmt.Println(spread(1, 2, 3, 4, 5, 6))        // Output: 151
+	fmt.Println(spread(9, -3, 7, 2, 11, -4))     // Output: -296
+}